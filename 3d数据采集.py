@@ -1,31 +1,20 @@
-import time
-import random
-import pandas as pd
-import os
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, ElementNotInteractableException, \
-    StaleElementReferenceException
-from openpyxl.styles import Alignment
-
-# 初始化浏览器
-options = webdriver.ChromeOptions()
-options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124')
-options.add_argument('--disable-blink-features=AutomationControlled')
-options.add_experimental_option('excludeSwitches', ['enable-automation'])
-options.add_experimental_option('useAutomationExtension', False)
-
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-    "source": """Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"""
-})
+import argparse
+from lottery import checkpoint, http_backend, metrics, network_capture, pipeline, resource_filter, store
+from lottery.backfill import run_sharded, split_period_range
+from lottery.browser_session import create_driver
+from lottery.pacing import click_when_ready, pacer_for, wait_until
+from lottery.table_extract import fetch_table_rows, min_period, parse_3d_rows, preview_rows
+
+# 站点访问节奏，同一进程内各彩种、各分片共用
+pacer = pacer_for("www.zhcw.com")
 
 def get_latest_period(driver):
     """获取页面上的最新期号"""
+    # selenium 只在真正操作浏览器时才导入，定时运行探测到没有新数据时不必加载
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     try:
         period_element = WebDriverWait(driver, 30).until(
             EC.visibility_of_element_located((By.XPATH, "//table/tbody/tr[1]/td[1]"))
@@ -41,21 +30,18 @@ def get_latest_period(driver):
         return None
 
 def get_existing_max_period():
-    """获取现有 Excel 文件中的最大期号"""
-    if os.path.exists("3D历史数据.xlsx"):
-        try:
-            df = pd.read_excel("3D历史数据.xlsx")
-            return df["期号"].max() if not df.empty else None
-        except Exception as e:
-            print(f"读取现有文件失败: {e}")
-    return None
+    """获取已保存数据中的最大期号"""
+    return store.get_max_period("3d")
 
-def reset_query_page(retry_count=3):
+def reset_query_page(driver, retry_count=3):
     """重置查询页面状态"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     for attempt in range(retry_count):
         try:
             driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
             custom_query_button = WebDriverWait(driver, 30).until(
                 EC.element_to_be_clickable((By.XPATH, "//strong[@class='N-t' and text()='自定义查询']"))
             )
@@ -72,17 +58,22 @@ def reset_query_page(retry_count=3):
             print(f"第 {attempt + 1} 次重置失败: {e}")
             if attempt < retry_count - 1:
                 print("刷新页面并重试...")
+                pacer.failure()
+                metrics.record_retry(e)
+                pacer.wait()
                 driver.refresh()
-                time.sleep(random.uniform(2, 4))
             else:
                 raise
 
-def query_period_range(start_period, end_period, retry_count=3):
+def query_period_range(driver, start_period, end_period, retry_count=3):
     """查询指定期号范围"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     for attempt in range(retry_count):
         try:
             driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
 
             start_input = WebDriverWait(driver, 30).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, "input.stcount"))
@@ -94,12 +85,10 @@ def query_period_range(start_period, end_period, retry_count=3):
             driver.execute_script("arguments[0].value = '';", start_input)
             start_input.send_keys(str(start_period))
             print(f"已输入起始期号: {start_period}")
-            time.sleep(random.uniform(1, 2))
 
             driver.execute_script("arguments[0].value = '';", end_input)
             end_input.send_keys(str(end_period))
             print(f"已输入结束期号: {end_period}")
-            time.sleep(random.uniform(1, 2))
 
             start_query_button = WebDriverWait(driver, 30).until(
                 EC.element_to_be_clickable(
@@ -107,185 +96,267 @@ def query_period_range(start_period, end_period, retry_count=3):
             )
             print(
                 f"‘开始查询’按钮状态: 显示={start_query_button.is_displayed()}, 启用={start_query_button.is_enabled()}")
+            old_rows = driver.find_elements(By.XPATH, "//table//tr[td]")
+            # 丢掉打开页面时最新开奖表格的接口响应，第一页只认这次查询的结果
+            network_capture.expect_response(driver)
+            pacer.wait()
             driver.execute_script("arguments[0].click();", start_query_button)
             print("已通过 JavaScript 点击‘开始查询’")
 
-            WebDriverWait(driver, 60).until(
-                EC.presence_of_element_located((By.XPATH, "//table//tr"))
-            )
+            # 页面上原本就有最新开奖表格，要等旧表格失效后新结果才算加载完成
+            if old_rows:
+                wait_until(driver, pacer, EC.staleness_of(old_rows[0]), 60)
+            wait_until(driver, pacer, EC.presence_of_element_located((By.XPATH, "//table//tr")), 60)
             print("查询结果已加载")
             return True
         except Exception as e:
             print(f"第 {attempt + 1} 次查询失败: {e}")
             if attempt < retry_count - 1:
-                reset_query_page()
-                time.sleep(random.uniform(2, 4))
+                pacer.failure()
+                metrics.record_retry(e)
+                reset_query_page(driver)
             else:
                 raise
 
-def append_to_excel(data):
-    """将数据追加到 Excel，确保格式清晰，最新期号在顶部"""
-    if not data:
-        return False
-    try:
-        df_new = pd.DataFrame(data, columns=["期号", "号码1", "号码2", "号码3"])
-        df_new["期号"] = df_new["期号"].astype(int)
-
-        if os.path.exists("3D历史数据.xlsx"):
-            df_existing = pd.read_excel("3D历史数据.xlsx")
-            df_combined = pd.concat([df_new, df_existing]).drop_duplicates(subset=["期号"]).sort_values(by="期号",
-                                                                                                        ascending=False)
-        else:
-            df_combined = df_new.sort_values(by="期号", ascending=False)
-
-        # 保存到 Excel，设置宽松的列宽和居中对齐
-        with pd.ExcelWriter("3D历史数据.xlsx", engine='openpyxl') as writer:
-            df_combined.to_excel(writer, index=False, sheet_name='Sheet1')
-            worksheet = writer.sheets['Sheet1']
-
-            # 设置列宽
-            column_widths = {
-                "期号": 12,
-                "号码1": 10, "号码2": 10, "号码3": 10,
-            }
-            for col_name, width in column_widths.items():
-                col_idx = df_combined.columns.get_loc(col_name) + 1
-                worksheet.column_dimensions[chr(65 + col_idx - 1)].width = width
-
-            # 设置居中对齐
-            for row in worksheet.rows:
-                for cell in row:
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-
-        return True
-    except Exception as e:
-        print(f"保存数据失败: {e}")
-        return False
+def iter_result_pages(driver, start_period, max_pages=500):
+    """取页生成器：在已查询出结果的页面上逐页返回 (页码, 接口响应或表格行)，翻到含起始期号的一页为止
 
-try:
-    driver.get("https://www.zhcw.com:8443/kjxx/3d/")
-    print("页面已加载")
-    time.sleep(3)
+    捕获到数据接口的响应时直接返回响应 JSON，不必等表格重新渲染；捕获不到才等旧表格失效后读取表格
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
 
-    latest_period = get_latest_period(driver)
-    if latest_period is None:
-        raise Exception("无法获取最新期号")
-
-    existing_max = get_existing_max_period()
-    start_period = existing_max + 1 if existing_max else 2003001
-
-    if start_period > latest_period:
-        print("没有新数据需要追加")
-        driver.quit()
-        exit()
-
-    print(f"检测到最新期号: {latest_period}")
-    print(f"现有数据最新期号: {existing_max if existing_max else '无'}")
-    print(f"将从 {start_period} 期开始追加")
-
-    reset_query_page()
-    query_period_range(start_period, latest_period)
-
-    data = []
     current_page = 1
-    max_records = 10000
-
-    while len(data) < max_records:
+    old_row = None
+    while current_page <= max_pages:
         print(f"正在爬取第 {current_page} 页...")
-        try:
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.XPATH, "//table//tr"))
-            )
-            table = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "table"))
-            )
-            print(f"表格内容（前500字符）: {table.text[:500]}")
-
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            print(f"找到 {len(rows)} 行数据")
-
-            for _ in range(3):  # 重试3次以处理陈旧元素
+        payload = network_capture.wait_payload(driver, "3d")
+        if payload is not None:
+            raw, oldest = payload, network_capture.payload_min_period("3d", payload)
+            print(f"从数据接口响应取得第 {current_page} 页")
+        else:
+            try:
+                if old_row is not None:
+                    # 翻页后以旧表格行失效作为新页面就绪的信号
+                    wait_until(driver, pacer, EC.staleness_of(old_row))
+                WebDriverWait(driver, 30).until(
+                    EC.presence_of_element_located((By.XPATH, "//table//tr"))
+                )
+                table_rows = fetch_table_rows(driver, "table")
+            except TimeoutException:
+                print("表格加载超时，跳过当前页")
+                return
+            print(f"表格内容（前5行）: {preview_rows(table_rows)}")
+            print(f"找到 {len(table_rows)} 行数据")
+            raw, oldest = table_rows, min_period(table_rows)
+        resource_filter.record_page(driver, "zhcw", "flip")
+        yield current_page, raw
+
+        if oldest is not None and oldest <= start_period:
+            print("已到达目标起始期号，停止抓取")
+            return
+
+        with metrics.phase("page_flip"):
+            if payload is not None and old_row is not None:
+                # 接口响应比表格渲染先到，等上一次翻页的旧表格失效后再点，免得点到即将被替换的分页链接
                 try:
-                    for row in rows:
-                        cols = row.find_elements(By.TAG_NAME, "td")
-                        if len(cols) < 4:
-                            continue
-
-                        period = cols[0].text.strip()
-                        if not period.startswith("20"):
-                            continue
-
-                        try:
-                            period_int = int(period)
-                            if period_int < start_period or period_int > latest_period:
-                                continue
-                        except ValueError:
-                            continue
-
-                        numbers = []
-                        number_spans = cols[2].find_elements(By.CLASS_NAME, "jqh")
-                        if number_spans:
-                            numbers = [span.text.strip() for span in number_spans]
-                        else:
-                            number_text = cols[2].text.strip().replace("\n", "")
-                            numbers = [number_text[i:i + 1] for i in range(0, len(number_text), 1) if
-                                       i + 1 <= len(number_text)]
-
-                        if len(numbers) == 3:
-                            data.append([period] + numbers)
-                    break
-                except StaleElementReferenceException:
-                    print("遇到陈旧元素引用，重新定位表格...")
-                    table = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "table"))
-                    )
-                    rows = table.find_elements(By.TAG_NAME, "tr")
-
-            print(f"当前已抓取 {len(data)} 条记录")
-
-            if data and int(data[-1][0]) <= start_period:
-                print("已到达目标起始期号，停止抓取")
-                break
-
+                    wait_until(driver, pacer, EC.staleness_of(old_row))
+                except TimeoutException:
+                    print("页面没有随接口响应更新，停止抓取")
+                    return
+            old_row = driver.find_element(By.XPATH, "//table//tr[td]")
+            network_capture.expect_response(driver)
             try:
                 current_page += 1
-                page_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, f"//a[@title='{current_page}']"))
-                )
-                page_button.click()
+                click_when_ready(driver, pacer, (By.XPATH, f"//a[@title='{current_page}']"))
                 print(f"成功翻页到第 {current_page} 页")
-                time.sleep(random.uniform(3, 5))
-                WebDriverWait(driver, 10).until(EC.staleness_of(page_button))
             except TimeoutException:
                 try:
-                    next_button = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), '下一页')]"))
-                    )
-                    if "disabled" in next_button.get_attribute("class"):
+                    if not click_when_ready(driver, pacer, (By.XPATH, "//a[contains(text(), '下一页')]"),
+                                            skip_disabled=True):
                         print("已到最后一页")
-                        break
-                    next_button.click()
+                        return
                     print("成功翻页到下一页")
-                    time.sleep(random.uniform(3, 5))
-                    WebDriverWait(driver, 10).until(EC.staleness_of(next_button))
                 except TimeoutException:
                     print("无法翻页，停止抓取")
-                    break
+                    return
+
+def scrape_pages(driver, start_period, end_period, progress):
+    """在已查询出结果的页面上逐页抓取 [start_period, end_period] 范围内的数据
+
+    取页、解析、写入断点组成流水线，解析和写入当前页时下一页已经在加载；返回本次抓到的条数
+    """
+    pages = iter_result_pages(driver, start_period)
+    return pipeline.run("3d", pages,
+                        lambda raw: network_capture.parse_page("3d", raw, parse_3d_rows, start_period, end_period),
+                        start_period, end_period, progress)
+
+def scrape_shard(start_period, end_period, driver=None):
+    """在独立的无头浏览器里查询并抓取一个期号分片，断点按分片单独记录
+
+    传入 driver 时在其中查询（补抓缺失期号时复用同一个浏览器），不关闭
+    """
+    progress = checkpoint.Checkpoint("3d", start_period, end_period, name=f"shard{start_period}")
+    remaining_end = progress.remaining_end()
+    if remaining_end is None:
+        return progress.sorted_rows()
+
+    own_driver = driver is None
+    if own_driver:
+        driver = create_driver(headless=True)
+    resource_filter.apply(driver, "zhcw")
+    try:
+        pacer.wait()
+        with metrics.phase("page_load"):
+            driver.get("https://www.zhcw.com:8443/kjxx/3d/")
+        resource_filter.record_page(driver, "zhcw", "load")
+        with metrics.phase("query"):
+            reset_query_page(driver)
+            query_period_range(driver, start_period, remaining_end)
+        scrape_pages(driver, start_period, remaining_end, progress)
+        return progress.sorted_rows()
+    finally:
+        if own_driver:
+            driver.quit()
+
+@metrics.instrumented("3d", "browser")
+def run_browser(session=None, shards=1, probe=True):
+    """用浏览器抓取开奖页面；传入共享会话时借用其中的标签页，不关闭浏览器
+
+    shards 大于 1 且期号范围跨年时，按年份分片，在多个无头浏览器中并发回填
+
+    probe 为 True 时先用数据接口查一次最新期号，没有新数据就不启动浏览器
+
+    返回追加的记录数，出错时返回 None
+    """
+    if probe and http_backend.probe_new_draws("3d") is False:
+        print("没有新数据需要追加")
+        return 0
 
-        except TimeoutException:
-            print("表格加载超时，跳过当前页")
-            break
+    driver = session.tab("3D") if session else create_driver()
+    resource_filter.apply(driver, "zhcw")
+    try:
+        pacer.wait()
+        with metrics.phase("page_load"):
+            driver.get("https://www.zhcw.com:8443/kjxx/3d/")
+        resource_filter.record_page(driver, "zhcw", "load")
+        print("页面已加载")
+
+        latest_period = get_latest_period(driver)
+        if latest_period is None:
+            raise Exception("无法获取最新期号")
+
+        existing_max = get_existing_max_period()
+        start_period = existing_max + 1 if existing_max else 2003001
+
+        if start_period > latest_period:
+            print("没有新数据需要追加")
+            return 0
+
+        print(f"检测到最新期号: {latest_period}")
+        print(f"现有数据最新期号: {existing_max if existing_max else '无'}")
+        print(f"将从 {start_period} 期开始追加")
+
+        ranges = split_period_range(start_period, latest_period, shards)
+        if len(ranges) > 1:
+            data = run_sharded(scrape_shard, start_period, latest_period, shards)
+            count, batches = len(data), [data]
+        else:
+            # 逐页写入断点，出错后重新运行只需抓取断点之前还没抓到的部分
+            progress = checkpoint.Checkpoint("3d", start_period, latest_period)
+            remaining_end = progress.remaining_end()
+            if remaining_end is not None:
+                with metrics.phase("query"):
+                    reset_query_page(driver)
+                    query_period_range(driver, start_period, remaining_end)
+                scrape_pages(driver, start_period, remaining_end, progress)
+            count, batches = progress.count, progress.iter_batches()
+
+        if count:
+            saved = store.save_batches("3d", batches)
+            if saved is not None:
+                checkpoint.discard("3d")
+            print(f"✅ 成功追加 {saved} 条记录" if saved is not None else "❌ 数据保存失败")
+            return saved
+        else:
+            print("没有新数据需要追加")
+            return 0
 
-    if data:
-        success = append_to_excel(data)
-        print(f"✅ 成功追加 {len(data)} 条记录" if success else "❌ 数据保存失败")
+    except Exception as e:
+        print(f"程序出错: {e}")
+        print("当前页面源代码片段（前2000字符）:")
+        print(driver.page_source[:2000])
+    finally:
+        if session is None:
+            driver.quit()
+            print("浏览器已关闭")
+
+@metrics.instrumented("3d", "http")
+def run_http(base_url=None, record_dir=None, session=None):
+    """不启动浏览器，直接请求开奖数据接口，返回追加的记录数，出错时返回 None
+
+    传入 session 时借用这个已建立的连接（例如常驻调度保持的连接），不关闭
+    """
+    own_session = session is None
+    if own_session:
+        session = http_backend.create_session(base_url, record_dir)
+    try:
+        latest_period = http_backend.get_latest_period(session, "3d")
+        if latest_period is None:
+            raise Exception("无法获取最新期号")
+
+        existing_max = get_existing_max_period()
+        start_period = existing_max + 1 if existing_max else 2003001
+
+        print(f"检测到最新期号: {latest_period}")
+        print(f"现有数据最新期号: {existing_max if existing_max else '无'}")
+        if start_period > latest_period:
+            print("没有新数据需要追加")
+            return 0
+        print(f"将从 {start_period} 期开始追加")
+
+        progress = checkpoint.Checkpoint("3d", start_period, latest_period)
+        remaining_end = progress.remaining_end()
+        if remaining_end is not None:
+            pages = http_backend.iter_pages(session, "3d", start_period, remaining_end)
+            pipeline.run("3d", pages, lambda payload: http_backend.parse_payload("3d", payload)[0],
+                         start_period, remaining_end, progress)
+        if progress.count:
+            saved = store.save_batches("3d", progress.iter_batches())
+            if saved is not None:
+                checkpoint.discard("3d")
+            print(f"✅ 成功追加 {saved} 条记录" if saved is not None else "❌ 数据保存失败")
+            return saved
+        else:
+            print("没有新数据需要追加")
+            return 0
+    except Exception as e:
+        print(f"程序出错: {e}")
+    finally:
+        if own_session:
+            session.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="抓取3D历史开奖数据")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser",
+                        help="抓取方式：browser 用浏览器渲染页面，http 直接请求数据接口")
+    parser.add_argument("--base-url", help="http 后端的接口地址，指向本地回放服务器时可离线运行")
+    parser.add_argument("--record", help="http 后端把每个响应录制到该目录")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="浏览器方式回填时按年份分成几段并发抓取，默认 1（不分片）")
+    parser.add_argument("--no-block", action="store_true",
+                        help="浏览器不拦截图片、样式表等资源，加载完整页面并记录为省流量统计的基线")
+    parser.add_argument("--no-capture", action="store_true",
+                        help="浏览器不捕获数据接口的响应，每页都等表格渲染后解析页面")
+    parser.add_argument("--export", action="store_true", help="保存后从数据库重新导出 Excel")
+    args = parser.parse_args()
+    resource_filter.ENABLED = not args.no_block
+    network_capture.ENABLED = not args.no_capture
+    store.EXPORT_EXCEL = args.export
+
+    if args.backend == "http":
+        run_http(args.base_url, args.record)
     else:
-        print("没有新数据需要追加")
-
-except Exception as e:
-    print(f"程序出错: {e}")
-    print("当前页面源代码片段（前2000字符）:")
-    print(driver.page_source[:2000])
-finally:
-    driver.quit()
-    print("浏览器已关闭")
\ No newline at end of file
+        run_browser(shards=args.shards)
@@ -0,0 +1 @@
+"""各彩种采集脚本共用的工具模块"""
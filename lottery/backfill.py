@@ -0,0 +1,59 @@
+"""分片回填：把期号范围拆成多段，在多个浏览器里同时按期号查询，再按期号去重合并
+
+期号由“年份 + 当年序号”组成（2003001、24001），按年份切分可以保证每段都是
+网站能接受的合法期号范围。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from lottery import metrics
+
+# 全局礼貌上限：同一进程内所有彩种加起来，最多同时开这么多个分片浏览器
+MAX_CONCURRENT_SHARDS = 4
+
+_shard_slots = threading.BoundedSemaphore(MAX_CONCURRENT_SHARDS)
+
+
+def split_period_range(start_period, end_period, shards):
+    """按年份把 [start_period, end_period] 切成至多 shards 段，返回 [(起, 止), ...]，较新的在前"""
+    first_year, last_year = start_period // 1000, end_period // 1000
+    years = list(range(first_year, last_year + 1))
+    shards = max(1, min(shards, len(years)))
+
+    ranges = []
+    size, extra = divmod(len(years), shards)
+    index = 0
+    for i in range(shards):
+        chunk = years[index:index + size + (1 if i < extra else 0)]
+        index += len(chunk)
+        ranges.append((max(start_period, chunk[0] * 1000 + 1), min(end_period, chunk[-1] * 1000 + 999)))
+    return ranges[::-1]
+
+
+def run_sharded(scrape_shard, start_period, end_period, shards):
+    """并发执行 scrape_shard(起, 止)，合并结果并按期号去重，最新期号在前
+
+    任何一个分片出错都会抛出异常，避免把不完整的数据当成完整回填保存。
+    """
+    ranges = split_period_range(start_period, end_period, shards)
+    print(f"分片回填: {len(ranges)} 段 {ranges}")
+
+    run = metrics.current()
+
+    def run_one(shard_range):
+        metrics.bind(run)
+        with _shard_slots:
+            print(f"开始抓取分片 {shard_range[0]} - {shard_range[1]}")
+            return scrape_shard(*shard_range)
+
+    merged = {}
+    with ThreadPoolExecutor(max_workers=min(len(ranges), MAX_CONCURRENT_SHARDS)) as pool:
+        futures = {pool.submit(run_one, shard_range): shard_range for shard_range in ranges}
+        for future in as_completed(futures):
+            shard_range = futures[future]
+            rows = future.result()
+            print(f"分片 {shard_range[0]} - {shard_range[1]} 完成，抓取 {len(rows)} 条记录")
+            for row in rows:
+                merged.setdefault(row[0], row)
+
+    return [merged[period] for period in sorted(merged, key=int, reverse=True)]
@@ -0,0 +1,139 @@
+"""选号策略回测：把单式、复式、胆拖策略展开成具体的注，按奖级规则对全部历史开奖计奖
+
+策略用字典描述（也可以写成 JSON 文件交给命令行）：
+
+    {"name": "固定一注", "red": [1, 5, 9, 12, 20, 33], "blue": [7]}
+    {"name": "红球复式", "red": [1, 5, 9, 12, 20, 28, 33], "blue": [7, 16]}
+    {"name": "红球胆拖", "red_dan": [5, 9], "red": [1, 12, 20, 28, 33], "blue": [7]}
+    {"name": "多注", "tickets": [[1, 2, 3, 4, 5, 6, 7], [8, 9, 10, 11, 12, 13, 14]]}
+
+red/blue 为拖码（没有胆码时就是全部号码），red_dan/blue_dan 为胆码；tickets 里每注
+依次写前区和后区号码。每个策略假设每期都按展开后的全部注数投注，每注 2 元。
+
+多个策略交给进程池并行计算，开奖数据在每个工作进程启动时只传一次，之后只读
+共用；每个策略在进程内用 lottery.matching 的位掩码索引批量计奖。
+
+    python -m lottery.backtest ssq 策略.json --workers 4 --start 2020001
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
+
+import numpy as np
+
+from lottery.drawtable import DrawTable
+from lottery.games import GAMES
+from lottery.matching import PRIZE_TIERS, TIER_NAMES, MatchIndex
+
+TICKET_PRICE = 2
+
+# 各奖级单注奖金（元）。一、二等奖为浮动奖，这里用估计值，可通过 prizes 参数覆盖
+PRIZE_AMOUNTS = {
+    "ssq": [0, 5000000, 150000, 3000, 200, 10, 5],
+    "dlt": [0, 10000000, 200000, 10000, 3000, 300, 200, 100, 15, 5],
+}
+
+_worker_index = None
+_worker_prizes = None
+
+
+def zone_combinations(dan, tuo, count):
+    """胆码全选、拖码补足 count 个，返回全部组合；没有胆码且拖码正好 count 个时就是单式"""
+    dan, tuo = sorted(set(dan)), sorted(set(tuo) - set(dan))
+    if len(dan) > count or len(dan) == count and tuo:
+        raise ValueError(f"胆码 {dan} 不能多于 {count - 1} 个")
+    if len(dan) + len(tuo) < count:
+        raise ValueError(f"号码不足 {count} 个: 胆码 {dan} 拖码 {tuo}")
+    return [sorted(dan + list(rest)) for rest in combinations(tuo, count - len(dan))]
+
+
+def expand(game, spec):
+    """把策略展开成 (前区矩阵, 后区矩阵)，每行一注"""
+    if game not in PRIZE_TIERS:
+        raise ValueError(f"{GAMES[game]['name']}不支持策略回测")
+    red_count, blue_count = GAMES[game]["red_count"], GAMES[game]["blue_count"]
+    if "tickets" in spec:
+        tickets = np.array(spec["tickets"], dtype=np.uint8).reshape(-1, red_count + blue_count)
+        return tickets[:, :red_count], tickets[:, red_count:]
+
+    red_sets = zone_combinations(spec.get("red_dan", []), spec.get("red", []), red_count)
+    blue_sets = zone_combinations(spec.get("blue_dan", []), spec.get("blue", []), blue_count)
+    pairs = list(product(red_sets, blue_sets))
+    reds = np.array([reds for reds, _ in pairs], dtype=np.uint8)
+    blues = np.array([blues for _, blues in pairs], dtype=np.uint8)
+    return reds, blues
+
+
+def _init_worker(game, periods, numbers, prizes):
+    """工作进程初始化：建立一次对奖索引，之后各策略共用"""
+    global _worker_index, _worker_prizes
+    _worker_index = MatchIndex(DrawTable(game, periods, numbers))
+    _worker_prizes = prizes
+
+
+def score(index, spec, prizes):
+    """对一个策略计奖，返回结果字典"""
+    reds, blues = expand(index.game, spec)
+    hits = index.tier_summary(reds, blues, workers=1).sum(axis=0)
+    periods = len(index.table)
+    cost = len(reds) * periods * TICKET_PRICE
+    prize = int(np.dot(hits, prizes))
+    result = {
+        "策略": spec.get("name", ""),
+        "注数": len(reds),
+        "期数": periods,
+        "投入": cost,
+        "奖金": prize,
+        "回报率": (prize - cost) / cost if cost else 0.0,
+    }
+    for tier, name in enumerate(TIER_NAMES[index.game][1:], 1):
+        result[name] = int(hits[tier])
+    return result
+
+
+def _score_in_worker(spec):
+    """工作进程内计奖，使用初始化时建立的索引"""
+    return score(_worker_index, spec, _worker_prizes)
+
+
+def run_backtest(game, strategies, table=None, start_period=None, end_period=None, workers=None, prizes=None):
+    """回测一组策略，返回每个策略的结果字典列表（顺序与 strategies 一致）
+
+    workers 为进程数，默认等于 CPU 核数；只有一个策略或 workers=1 时在当前进程计算。
+    """
+    if table is None:
+        table = DrawTable.load(game)
+    table = table.between(start_period, end_period)
+    prizes = np.array(prizes or PRIZE_AMOUNTS[game], dtype=np.int64)
+    workers = min(workers or os.cpu_count(), len(strategies))
+    if workers <= 1:
+        index = MatchIndex(table)
+        return [score(index, spec, prizes) for spec in strategies]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(game, table.periods, table.numbers, prizes)) as pool:
+        chunksize = max(1, len(strategies) // (workers * 4))
+        return list(pool.map(_score_in_worker, strategies, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="双色球、大乐透选号策略回测")
+    parser.add_argument("game", choices=sorted(PRIZE_TIERS), help="彩种")
+    parser.add_argument("strategies", help="策略 JSON 文件（策略字典的列表）")
+    parser.add_argument("--start", type=int, help="起始期号")
+    parser.add_argument("--end", type=int, help="结束期号")
+    parser.add_argument("--workers", type=int, help="进程数，默认等于 CPU 核数")
+    parser.add_argument("--output", help="把结果另存为 CSV")
+    args = parser.parse_args()
+
+    with open(args.strategies, encoding="utf-8") as f:
+        strategies = json.load(f)
+    df = pd.DataFrame(run_backtest(args.game, strategies, start_period=args.start, end_period=args.end,
+                                   workers=args.workers))
+    print(df.to_string(index=False))
+    if args.output:
+        df.to_csv(args.output, index=False, encoding="utf-8-sig")
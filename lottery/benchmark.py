@@ -0,0 +1,399 @@
+"""离线性能基准：用本地替身服务器回放开奖页面快照和数据接口，不访问真实网站
+
+    python -m lottery.benchmark                          # 默认：四个彩种，入库规模 1k/10k/100k
+    python -m lottery.benchmark --sizes 1000 10000 --games ssq
+    python -m lottery.benchmark --snapshots 快照目录      # 用录制的真实页面快照测解析
+    python -m lottery.benchmark --browser                # 用 Chrome 加载快照（需要本机装有 Chrome）
+
+测三类指标：
+
+- pages：从替身服务器取结果页快照（中彩网“自定义查询”结果表格、体彩网 iFrame1 里的
+  #historyData 表格），提取表格行后用 table_extract 的解析函数解析，得到页/秒、行/秒和
+  每页解析耗时。默认在 Python 端模拟 TABLE_ROWS_JS 提取表格，--browser 时用 Chrome
+  加载页面并执行真实的 fetch_table_rows
+- http：替身服务器模拟两个站点的数据接口，在临时目录里完整运行脚本的 run_http（取页、
+  解析、断点、入库），得到端到端的页/秒和行/秒
+- save：在已有 1k～100k 条历史的数据库上追加一期（原来 append_to_excel 的位置，现在是
+  store.save_draws：入库、增量更新列式文件和统计），另外单独测一次导出 Excel，以及首次
+  批量入库的用时
+
+每次结果追加到 benchmark_results.jsonl（--output 可改），并与同一台机器最近几次结果的
+中位数比较，变差超过 --threshold（默认 20%）的指标标为退化，有退化时退出码为 1。
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from lottery import fixture_server, metrics, table_extract
+from lottery.games import API_URLS, GAMES, build_row, load_script
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+PAGE_SIZE = 30
+SNAPSHOT_PAGES = 20
+HTTP_HISTORY = 3000
+HISTORY_WINDOW = 5  # 与最近几次结果的中位数比较
+
+SNAPSHOT_SELECTORS = {"zhcw": "table", "sporttery": "table"}
+
+
+def synthetic_draws(game, count, seed=0):
+    """生成 count 期格式合法的开奖数据，最新期号在前；每年 365 期，期号按年份递增"""
+    info = GAMES[game]
+    rng = random.Random(seed)
+    first_year = info["first_period"] // 1000
+    rows = []
+    for i in range(count):
+        period = (first_year + i // 365) * 1000 + i % 365 + 1
+        if info["blue_count"]:
+            reds = sorted(rng.sample(range(1, 36 if game == "dlt" else 34), info["red_count"]))
+            blues = sorted(rng.sample(range(1, 13 if game == "dlt" else 17), info["blue_count"]))
+            rows.append(build_row(game, period, [f"{n:02d}" for n in reds], [f"{n:02d}" for n in blues]))
+        else:
+            rows.append(build_row(game, period, [str(rng.randrange(10)) for _ in range(3)]))
+    return rows[::-1]
+
+
+def snapshot_html(game, rows):
+    """按真实页面的表格结构生成一页结果快照"""
+    info = GAMES[game]
+    body = []
+    for row in rows:
+        period, reds, blues = row[0], row[1:1 + info["red_count"]], row[2 + info["red_count"]:]
+        if info["api"] == "zhcw":
+            balls = "".join(f'<span class="jqh">{n}</span>' for n in reds)
+            blue = f'<td><span class="jqh">{blues[0]}</span></td>' if blues else "<td></td>"
+            body.append(f"<tr><td>{period}</td><td>2024-01-01</td><td>{balls}</td>{blue}<td>0</td></tr>")
+        else:
+            cells = "".join(f"<td>{n}</td>" for n in reds) + "".join(f"<td><span>{n}</span></td>" for n in blues)
+            body.append(f"<tr><td>{period}</td><td>2024-01-01</td>{cells}<td>0</td></tr>")
+    if info["api"] == "zhcw":
+        head = "<thead><tr><th>期号</th><th>开奖日期</th><th>开奖号码</th><th></th><th>销售额</th></tr></thead>"
+        return f"<html><body><table>{head}<tbody>{''.join(body)}</tbody></table></body></html>"
+    # 体彩网的表格有两行表头，数据行在 #historyData 里
+    head = "<thead><tr><th>期号</th><th>开奖日期</th><th>开奖号码</th></tr><tr><th>前区</th><th>后区</th></tr></thead>"
+    return (f"<html><body><table>{head}<tbody id=\"historyData\">{''.join(body)}</tbody></table>"
+            f"<ul><li class=\"number active\" onclick=\"kjCommonFun.goNextPage(1)\">1</li></ul></body></html>")
+
+
+class _TableRowsParser(HTMLParser):
+    """在 Python 端按 TABLE_ROWS_JS 的规则提取表格：每个 td 的文本、.jqh 文本、第一个 span 的文本"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.row = None
+        self.cell = None
+        self.spans = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self.row = []
+        elif tag == "td" and self.row is not None:
+            self.cell = {"text": [], "jqh": [], "span": None}
+        elif tag == "span" and self.cell is not None:
+            classes = (dict(attrs).get("class") or "").split()
+            first = self.cell["span"] is None and not any(span["first"] for span in self.spans)
+            self.spans.append({"jqh": "jqh" in classes, "first": first, "text": []})
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell["text"].append(data)
+            for span in self.spans:
+                span["text"].append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "span" and self.spans:
+            span = self.spans.pop()
+            text = "".join(span["text"]).strip()
+            if span["jqh"]:
+                self.cell["jqh"].append(text)
+            if span["first"]:
+                self.cell["span"] = text
+        elif tag == "td" and self.cell is not None:
+            self.cell["text"] = re.sub(r"\s+", " ", "".join(self.cell["text"])).strip()
+            self.row.append(self.cell)
+            self.cell = None
+        elif tag == "tr" and self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+
+def html_table_rows(html):
+    """从页面快照提取表格行，格式与 fetch_table_rows 相同"""
+    parser = _TableRowsParser()
+    parser.feed(html)
+    return parser.rows
+
+
+def parse_page(game, rows):
+    """用脚本使用的解析函数解析一页表格"""
+    parse = getattr(table_extract, f"parse_{game}_rows")
+    if GAMES[game]["api"] == "zhcw":
+        return parse(rows, 0, 10 ** 9)
+    return parse(rows, 0, 10 ** 9, set())
+
+
+def api_payload(game, draws, params):
+    """按请求参数模拟两个站点的数据接口，返回响应正文"""
+    info = GAMES[game]
+    if info["api"] == "zhcw":
+        start, end = params.get("startIssue"), params.get("endIssue")
+        page_no, page_size = int(params["pageNum"]), int(params["pageSize"])
+    else:
+        start, end = params.get("startTerm"), params.get("endTerm")
+        page_no, page_size = int(params["pageNo"]), int(params["pageSize"])
+    rows = [row for row in draws if (not start or int(row[0]) >= int(start)) and (not end or int(row[0]) <= int(end))]
+    chunk = rows[(page_no - 1) * page_size:page_no * page_size]
+    pages = max(1, (len(rows) + page_size - 1) // page_size)
+    red_count = info["red_count"]
+    if info["api"] == "zhcw":
+        items = [{"issue": row[0], "frontWinningNum": " ".join(row[1:1 + red_count]),
+                  "backWinningNum": " ".join(row[2 + red_count:])} for row in chunk]
+        return f"{params.get('callback', 'jQuery')}({json.dumps({'pages': pages, 'data': items})})"
+    items = [{"lotteryDrawNum": row[0], "lotteryDrawResult": " ".join(row[1:1 + red_count] + row[2 + red_count:])}
+             for row in chunk]
+    return json.dumps({"value": {"pages": pages, "list": items}})
+
+
+def serve_stand_in(draws_by_game, snapshots_by_game):
+    """启动替身服务器：/snapshot/<彩种>/<页码>.html 返回页面快照，接口路径返回模拟数据
+
+    借用 fixture_server 的回放服务器，响应由这里按请求生成；返回 (server, base_url)
+    """
+    api_games = {}
+    for game in draws_by_game:
+        api = GAMES[game]["api"]
+        key = GAMES[game]["lottery_id"] if api == "zhcw" else GAMES[game]["game_no"]
+        api_games[(urlsplit(API_URLS[api]).path, key)] = game
+
+    def respond(path, params):
+        match = re.match(r"^/snapshot/(\w+)/(\d+)\.html$", path)
+        if match and match.group(1) in snapshots_by_game:
+            pages = snapshots_by_game[match.group(1)]
+            return pages[(int(match.group(2)) - 1) % len(pages)].encode("utf-8"), "text/html; charset=utf-8"
+        game = api_games.get((path, params.get("lotteryId") or params.get("gameNo")))
+        if game is None:
+            return None
+        return api_payload(game, draws_by_game[game], params).encode("utf-8"), "application/json"
+
+    return fixture_server.serve_fixtures(None, responder=respond)
+
+
+def load_snapshots(snapshot_dir, game):
+    """读取录制的页面快照：目录里的 <彩种>*.html"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(snapshot_dir, f"{game}*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    """在临时目录里运行（数据库、Excel、断点文件都用相对路径），结束后回到原目录"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="lottery-bench-") as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
+
+
+def bench_pages(game, base_url, page_count, driver=None):
+    """取页快照 → 提取表格 → 解析，返回页/秒、行/秒和每页解析耗时（毫秒，中位数）"""
+    import requests
+
+    session = requests.Session()
+    parse_times, rows_total = [], 0
+    started = time.perf_counter()
+    for page in range(1, page_count + 1):
+        url = f"{base_url}/snapshot/{game}/{page}.html"
+        if driver is not None:
+            driver.get(url)
+            rows = table_extract.fetch_table_rows(driver, SNAPSHOT_SELECTORS[GAMES[game]["api"]])
+        else:
+            rows = html_table_rows(session.get(url, timeout=10).text)
+        parse_started = time.perf_counter()
+        rows_total += len(parse_page(game, rows))
+        parse_times.append(time.perf_counter() - parse_started)
+    elapsed = time.perf_counter() - started
+    session.close()
+    return {
+        f"pages.{game}.pages_per_sec": page_count / elapsed,
+        f"pages.{game}.rows_per_sec": rows_total / elapsed,
+        f"pages.{game}.parse_ms_per_page": statistics.median(parse_times) * 1000,
+    }
+
+
+def bench_http(game, base_url, history):
+    """在临时目录里完整运行一次 run_http，返回端到端的页/秒、行/秒和总用时"""
+    script = load_script(game)
+    with scratch_dir():
+        started = time.perf_counter()
+        count = script.run_http(base_url)
+        elapsed = time.perf_counter() - started
+        report_path, _ = metrics.report_paths(game)
+        with open(report_path, encoding="utf-8") as f:
+            report = json.loads(f.readlines()[-1])
+    if count != history:
+        raise RuntimeError(f"{GAMES[game]['name']}应抓取 {history} 条，实际 {count}")
+    pages = report["counters"].get("pages_fetched", 0)
+    return {
+        f"http.{game}.pages_per_sec": pages / elapsed,
+        f"http.{game}.rows_per_sec": count / elapsed,
+        f"http.{game}.total_s": elapsed,
+    }
+
+
+def bench_save(game, size):
+    """在 size 条历史上追加一期的用时、之后导出一次 Excel 的用时，以及首次批量入库的用时"""
+    from lottery import store
+
+    draws = synthetic_draws(game, size + 1)
+    newest, history = draws[:1], draws[1:][::-1]
+    with scratch_dir():
+        started = time.perf_counter()
+        store.save_batches(game, (history[i:i + 500] for i in range(0, len(history), 500)))
+        bulk = time.perf_counter() - started
+
+        run = metrics.RunMetrics(game, "benchmark")
+        previous = metrics.bind(run)
+        try:
+            started = time.perf_counter()
+            if not store.save_draws(game, newest):
+                raise RuntimeError("追加失败")
+            append = time.perf_counter() - started
+            conn = store.connect()
+            try:
+                store.export_excel(conn, game)
+            finally:
+                conn.close()
+        finally:
+            metrics.bind(previous)
+    return {
+        f"save.{game}.{size}.bulk_s": bulk,
+        f"save.{game}.{size}.append_s": append,
+        f"save.{game}.{size}.append_db_s": run.phases.get("save", [0.0])[0],
+        f"save.{game}.{size}.excel_s": run.phases.get("excel_export", [0.0])[0],
+    }
+
+
+def higher_is_better(name):
+    return name.endswith("_per_sec")
+
+
+def compare(results, previous_runs, threshold):
+    """与之前几次结果的中位数比较，返回 {指标: (基线, 变化比例)}，只包含变差超过 threshold 的"""
+    regressions = {}
+    for name, value in results.items():
+        history = [run["results"][name] for run in previous_runs if name in run.get("results", {})]
+        if not history:
+            continue
+        baseline = statistics.median(history[-HISTORY_WINDOW:])
+        if not baseline:
+            continue
+        change = (value - baseline) / baseline
+        if (change < -threshold) if higher_is_better(name) else (change > threshold):
+            regressions[name] = (baseline, change)
+    return regressions
+
+
+def load_results(path):
+    """读取之前的基准结果（同一台机器的）"""
+    runs = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    run = json.loads(line)
+                except ValueError:
+                    continue
+                if run.get("host") == platform.node():
+                    runs.append(run)
+    except OSError:
+        pass
+    return runs
+
+
+def run_benchmarks(games, sizes, save_games, snapshot_dir=None, browser=False):
+    """运行全部基准，返回 {指标: 数值}"""
+    draws_by_game = {game: synthetic_draws(game, HTTP_HISTORY, seed=1) for game in games}
+    snapshots_by_game = {}
+    for game in games:
+        pages = load_snapshots(snapshot_dir, game) if snapshot_dir else []
+        if not pages:
+            draws = draws_by_game[game]
+            pages = [snapshot_html(game, draws[i:i + PAGE_SIZE])
+                     for i in range(0, SNAPSHOT_PAGES * PAGE_SIZE, PAGE_SIZE)]
+        snapshots_by_game[game] = pages
+
+    results = {}
+    server, base_url = serve_stand_in(draws_by_game, snapshots_by_game)
+    driver = None
+    try:
+        if browser:
+            from lottery.browser_session import create_driver
+            driver = create_driver(headless=True)
+        for game in games:
+            print(f"--- {GAMES[game]['name']}：页面快照 ---")
+            results.update(bench_pages(game, base_url, max(SNAPSHOT_PAGES, len(snapshots_by_game[game])), driver))
+            print(f"--- {GAMES[game]['name']}：数据接口端到端 ---")
+            results.update(bench_http(game, base_url, HTTP_HISTORY))
+    finally:
+        if driver is not None:
+            driver.quit()
+        server.shutdown()
+
+    for game in save_games:
+        for size in sizes:
+            print(f"--- {GAMES[game]['name']}：{size} 条历史上追加一期 ---")
+            results.update(bench_save(game, size))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线性能基准（本地替身服务器，不访问真实网站）")
+    parser.add_argument("--games", nargs="+", choices=list(GAMES), default=list(GAMES), help="测页面和接口的彩种，默认全部")
+    parser.add_argument("--save-games", nargs="+", choices=list(GAMES), default=["ssq"], help="测入库的彩种，默认 ssq")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES), help="入库测试的历史条数")
+    parser.add_argument("--snapshots", help="录制的页面快照目录（<彩种>*.html），默认用生成的快照")
+    parser.add_argument("--browser", action="store_true", help="用 Chrome 加载快照并执行真实的表格提取脚本")
+    parser.add_argument("--output", default="benchmark_results.jsonl", help="结果文件，每次运行追加一行")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定退化的变化比例，默认 0.2")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    previous_runs = load_results(output)
+    results = run_benchmarks(args.games, args.sizes, args.save_games, args.snapshots, args.browser)
+    regressions = compare(results, previous_runs, args.threshold)
+
+    print("===== 基准结果 =====")
+    for name, value in results.items():
+        flag = ""
+        if name in regressions:
+            baseline, change = regressions[name]
+            flag = f"  ⚠ 退化 {change:+.0%}（基线 {baseline:.4g}）"
+        print(f"{name:40s} {value:12.4f}{flag}")
+    with open(output, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "browser": args.browser,
+            "results": {name: round(value, 6) for name, value in results.items()},
+            "regressions": sorted(regressions),
+        }, ensure_ascii=False) + "\n")
+    print(f"结果已追加到 {output}；{len(regressions)} 项退化" if regressions else f"结果已追加到 {output}，没有退化")
+    raise SystemExit(1 if regressions else 0)
@@ -0,0 +1,141 @@
+"""浏览器会话管理：一次启动 Chrome，各彩种在同一个浏览器里各用一个标签页
+
+单独运行某个脚本时仍然各自启动、各自关闭浏览器；批量更新时由
+BrowserSession 统一启动一次，脚本只借用其中的标签页。selenium 和
+webdriver_manager 到真正启动浏览器时才导入。
+"""
+import json
+import os
+import time
+
+from lottery import metrics
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124'
+
+# ChromeDriverManager().install() 会检查版本甚至联网，解析结果缓存到磁盘，一周内直接复用
+DRIVER_CACHE = os.path.join(os.path.expanduser("~"), ".wdm", "lottery_chromedriver.json")
+DRIVER_CACHE_DAYS = 7
+
+_driver_path = None
+
+
+def _read_driver_cache():
+    """读取缓存的 chromedriver 路径，缓存过期或文件已不存在时返回 None"""
+    try:
+        with open(DRIVER_CACHE, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = cache.get("path")
+    if not path or not os.path.isfile(path) or time.time() - cache.get("resolved", 0) > DRIVER_CACHE_DAYS * 86400:
+        return None
+    return path
+
+
+def _write_driver_cache(path):
+    try:
+        os.makedirs(os.path.dirname(DRIVER_CACHE), exist_ok=True)
+        with open(DRIVER_CACHE, "w", encoding="utf-8") as f:
+            json.dump({"path": path, "resolved": time.time()}, f)
+    except OSError as e:
+        print(f"无法缓存 chromedriver 路径: {e}")
+
+
+def chromedriver_path(refresh=False):
+    """返回 chromedriver 路径：先用进程内和磁盘上的缓存，refresh=True 时重新解析"""
+    global _driver_path
+    if not refresh:
+        _driver_path = _driver_path or _read_driver_cache()
+    if _driver_path is None or refresh:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        _driver_path = ChromeDriverManager().install()
+        _write_driver_cache(_driver_path)
+    return _driver_path
+
+
+def create_driver(headless=False):
+    """初始化浏览器"""
+    from selenium import webdriver
+    from selenium.common.exceptions import SessionNotCreatedException
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument(f'user-agent={USER_AGENT}')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    options.add_experimental_option('useAutomationExtension', False)
+    # 性能日志里的网络事件用来统计每页的下载量（见 resource_filter）
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+
+    with metrics.phase("chrome_start"):
+        try:
+            driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+        except SessionNotCreatedException:
+            # Chrome 升级后缓存的 chromedriver 版本不匹配，重新解析一次
+            print("chromedriver 与 Chrome 版本不匹配，重新获取")
+            driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=options)
+
+    # 每条 WebDriver 命令都经过 execute，在这里计数，记到发出命令的线程当前的运行上
+    execute = driver.execute
+
+    def counted_execute(driver_command, params=None):
+        metrics.count("webdriver_calls")
+        return execute(driver_command, params)
+
+    driver.execute = counted_execute
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": """Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"""
+    })
+    return driver
+
+
+class BrowserSession:
+    """共享的浏览器会话，每个彩种一个标签页"""
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self.driver = None
+        self.tabs = {}
+
+    def start(self):
+        """启动浏览器，已启动时直接返回"""
+        if self.driver is None:
+            self.driver = create_driver(self.headless)
+            self.tabs = {}
+            print("共享浏览器已启动")
+        return self.driver
+
+    def tab(self, name):
+        """切换到 name 对应的标签页，没有则新开一个，返回 driver"""
+        driver = self.start()
+        handle = self.tabs.get(name)
+        if handle not in driver.window_handles:
+            if self.tabs:
+                driver.switch_to.new_window('tab')
+            handle = driver.current_window_handle  # 第一个彩种直接使用启动时的窗口
+            self.tabs[name] = handle
+            print(f"已为{name}打开标签页")
+        driver.switch_to.window(handle)
+        return driver
+
+    def quit(self):
+        """关闭浏览器"""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                # 浏览器已经失去响应时也要丢掉这个会话，下次重新启动
+                print(f"关闭浏览器出错: {e}")
+            self.driver = None
+            self.tabs = {}
+            print("共享浏览器已关闭")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.quit()
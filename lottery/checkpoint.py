@@ -0,0 +1,149 @@
+"""抓取断点：每抓完一页就把这一页的数据和翻页位置写入断点文件，中途出错后重新运行可以接着抓
+
+断点不能直接写进数据库：抓取是从最新一期往旧的方向翻页的，先保存新的几页会让
+水位清单前移，下次运行就会跳过中间还没抓到的那一段。所以每次运行的数据先逐页
+追加到数据库旁边的 开奖数据.<彩种>.checkpoint.jsonl（每页一行，写完立即 fsync），
+整批保存成功后再删除。断点文件在写入第一页时才创建，没有抓到数据的运行不留下文件。
+
+重新运行时，只要续抓起点没变就沿用断点：已抓到的数据直接带上，按期号查询的
+页面和数据接口把查询范围收窄到已抓到的最早一期之前，按页翻的页面跳到断点记录
+的下一页。断点记录的截止期号也沿用上次的值，期间新开奖的几期留给下一次运行。
+"""
+import glob
+import json
+import os
+
+from lottery import metrics
+from lottery.store import DB_PATH
+
+
+def checkpoint_path(game, name=None, db_path=DB_PATH):
+    """断点文件路径，分片抓取时用 name 区分"""
+    suffix = f".{name}" if name else ""
+    return f"{os.path.splitext(db_path)[0]}.{game}{suffix}.checkpoint.jsonl"
+
+
+class Checkpoint:
+    """一次抓取的断点：起止期号、已抓到的条数和最早一期、最后完成的翻页位置"""
+
+    def __init__(self, game, start_period, end_period, name=None, db_path=DB_PATH):
+        self.game = game
+        self.path = checkpoint_path(game, name, db_path)
+        self.start_period = start_period
+        self.end_period = end_period
+        self.count = 0
+        self.oldest_period = None
+        self.cursor = None
+        self.resumed = False
+        self._load()
+
+    def _load(self):
+        """读取已有断点；起点不同则作废，末尾写了一半的行丢弃"""
+        header, pages, found = None, [], False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                found = True
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if header is None:
+                        header = record
+                    else:
+                        pages.append(record)
+        except OSError:
+            pass
+
+        if header is not None and header.get("start") == self.start_period and pages:
+            self.end_period = header["end"]
+            for page in pages:
+                self._extend(page["cursor"], page["rows"])
+            self.resumed = True
+            print(f"从断点继续：已有 {self.count} 条记录，上次停在第 {self.cursor} 页")
+        elif header is not None and header.get("start") != self.start_period:
+            print("断点与本次抓取范围不符，已作废")
+
+        if self.resumed:
+            # 重写一遍，去掉末尾不完整的行，之后的追加才能正常读取
+            self._rewrite(pages)
+        elif found:
+            os.remove(self.path)
+
+    def _rewrite(self, pages):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"game": self.game, "start": self.start_period, "end": self.end_period}) + "\n")
+            for page in pages:
+                f.write(json.dumps(page, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _extend(self, cursor, rows):
+        """只记住条数、最早一期和翻页位置，数据本身留在文件里"""
+        for row in rows:
+            period = int(row[0])
+            if self.oldest_period is None or period < self.oldest_period:
+                self.oldest_period = period
+        self.count += len(rows)
+        self.cursor = cursor
+
+    def remaining_end(self):
+        """按期号查询时还需要抓取的截止期号；已抓到起始期号时返回 None"""
+        oldest = self.oldest_period
+        if oldest is None:
+            return self.end_period
+        return oldest - 1 if oldest > self.start_period else None
+
+    def write(self, cursor, rows):
+        """一页抓完：追加这一页的数据和翻页位置并落盘（流水线的写入端），第一页时先建文件写表头"""
+        if not os.path.exists(self.path):
+            self._rewrite([])
+        line = (json.dumps({"cursor": cursor, "rows": rows}, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.count("bytes_written", len(line))
+        self._extend(cursor, rows)
+
+    def iter_batches(self, size=500):
+        """按期号从旧到新分批读出已抓到的数据，每批最多 size 条
+
+        文件里各页按从新到旧的顺序排列，这里只记下每页的位置再倒着读，
+        内存里最多只有一批数据。
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.readline()
+            offsets = []
+            while True:
+                offset = f.tell()
+                if not f.readline():
+                    break
+                offsets.append(offset)
+
+            batch = []
+            for offset in reversed(offsets):
+                f.seek(offset)
+                for row in reversed(json.loads(f.readline())["rows"]):
+                    batch.append(row)
+                    if len(batch) >= size:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+
+    def sorted_rows(self):
+        """全部已抓到的数据，最新期号在前（分片抓取时交给 run_sharded 合并）"""
+        rows = [row for batch in self.iter_batches() for row in batch]
+        return rows[::-1]
+
+
+def discard(game, db_path=DB_PATH):
+    """数据保存成功后删除该彩种的全部断点文件（包括各分片的）"""
+    prefix = f"{os.path.splitext(db_path)[0]}.{game}."
+    for path in glob.glob(glob.escape(prefix) + "*checkpoint.jsonl"):
+        os.remove(path)
@@ -0,0 +1,152 @@
+"""列式副本：每个彩种一份 Arrow IPC 文件，供分析时毫秒级加载
+
+期号存为 int32，号码存为 uint8，按期号从旧到新排列。文件不压缩，读取时直接
+内存映射，列数据零拷贝。保存新数据时只把新抓到的几期作为一个记录批次追加到
+已有批次后面；发现文件缺失、行数与数据库不符或写入了更早的期号时，从数据库
+整份重建。Parquet 需要解码、不能零拷贝映射，所以主副本用 Arrow IPC，需要时
+可用 python -m lottery.columnar --parquet 另外导出 Parquet。
+
+    from lottery.columnar import load_table
+    table = load_table("ssq")         # pyarrow.Table
+    df = table.to_pandas()
+"""
+import argparse
+import os
+
+from lottery import metrics
+from lottery.games import GAMES, ball_columns, split_row
+
+# 追加的记录批次太多时合并成一个，避免文件里堆积大量小批次
+MAX_BATCHES = 32
+
+
+def table_path(db_path, game, suffix=".arrow"):
+    """列式文件路径，与数据库放在一起，如 开奖数据.ssq.arrow"""
+    return f"{os.path.splitext(db_path)[0]}.{game}{suffix}"
+
+
+def schema(game):
+    """Arrow 表结构：期号 int32，各号码列 uint8"""
+    import pyarrow as pa
+
+    fields = [pa.field("期号", pa.int32(), nullable=False)]
+    fields += [pa.field(column, pa.uint8(), nullable=False) for column in ball_columns(game)]
+    return pa.schema(fields, metadata={"game": game})
+
+
+def build_table(game, records):
+    """由 (期号, [号码...]) 记录构造 Arrow 表，按期号从旧到新排序"""
+    import pyarrow as pa
+
+    records = sorted(records)
+    columns = [pa.array([period for period, _ in records], pa.int32())]
+    for i in range(len(ball_columns(game))):
+        columns.append(pa.array([numbers[i] for _, numbers in records], pa.uint8()))
+    return pa.Table.from_arrays(columns, schema=schema(game))
+
+
+def rows_to_table(game, data):
+    """把脚本 data 行转成 Arrow 表，同一期号以最后一条为准"""
+    records = {}
+    for row in data:
+        period, red_balls, blue_balls = split_row(game, row)
+        records[int(period)] = [int(n) for n in list(red_balls) + list(blue_balls)]
+    return build_table(game, records.items())
+
+
+def table_from_db(conn, game):
+    """从数据库整份读出该彩种的 Arrow 表"""
+    records = [(period, [int(n) for n in f"{red} {blue}".split()])
+               for period, red, blue in conn.execute("SELECT period, red, blue FROM draws WHERE game = ?", (game,))]
+    return build_table(game, records)
+
+
+def write_table(path, table):
+    """原子地写出 Arrow IPC 文件（先写临时文件再替换）"""
+    import pyarrow as pa
+
+    if table.num_rows and len(table.to_batches()) > MAX_BATCHES:
+        table = table.combine_chunks()
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    metrics.count("bytes_written", os.path.getsize(tmp_path))
+    os.replace(tmp_path, path)
+
+
+def read_table(path):
+    """完整读入内存（不映射），用于更新时读取旧文件，避免 Windows 上替换被映射的文件失败"""
+    import pyarrow as pa
+
+    with pa.OSFile(path, "rb") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def rebuild(conn, game):
+    """从数据库重建该彩种的列式文件，返回行数"""
+    table = table_from_db(conn, game)
+    write_table(table_path(conn.db_path, game), table)
+    return table.num_rows
+
+
+def update(conn, game, data):
+    """保存新数据后调用：能追加就只追加新的几期，否则整份重建；未安装 pyarrow 时跳过"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return False
+
+    path = table_path(conn.db_path, game)
+    new_table = rows_to_table(game, data)
+    row_count = conn.execute("SELECT COUNT(*) FROM draws WHERE game = ?", (game,)).fetchone()[0]
+    try:
+        existing = read_table(path) if os.path.exists(path) else None
+    except (OSError, pa.ArrowInvalid):
+        existing = None
+
+    if existing is not None and existing.schema.equals(new_table.schema) and existing.num_rows and \
+            new_table.num_rows and new_table["期号"][0].as_py() > existing["期号"][-1].as_py() and \
+            existing.num_rows + new_table.num_rows == row_count:
+        write_table(path, pa.concat_tables([existing, new_table]))
+    else:
+        rebuild(conn, game)
+    return True
+
+
+def load_table(game, db_path=None):
+    """内存映射方式加载该彩种的列式文件，返回 pyarrow.Table（列数据零拷贝）"""
+    import pyarrow as pa
+
+    if db_path is None:
+        from lottery.store import DB_PATH
+        db_path = DB_PATH
+    source = pa.memory_map(table_path(db_path, game), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_frame(game, db_path=None):
+    """加载为 pandas DataFrame，期号从旧到新"""
+    return load_table(game, db_path).to_pandas()
+
+
+if __name__ == "__main__":
+    from lottery import store
+
+    parser = argparse.ArgumentParser(description="从数据库重建各彩种的 Arrow 列式文件")
+    parser.add_argument("games", nargs="*", metavar="game", help=f"彩种（{', '.join(GAMES)}），默认全部")
+    parser.add_argument("--parquet", action="store_true", help="同时导出一份 Parquet 文件")
+    args = parser.parse_args()
+
+    conn = store.connect()
+    try:
+        for game in args.games or list(GAMES):
+            count = rebuild(conn, game)
+            print(f"已生成 {table_path(conn.db_path, game)}，共 {count} 条记录")
+            if args.parquet:
+                import pyarrow.parquet as pq
+
+                pq.write_table(load_table(game, conn.db_path), table_path(conn.db_path, game, ".parquet"))
+                print(f"已导出 {table_path(conn.db_path, game, '.parquet')}")
+    finally:
+        conn.close()
@@ -0,0 +1,220 @@
+"""双色球红球、大乐透前区的号码同出统计：两两同出（对子）和三个同出（三连）次数
+
+对子用 N×N 的稠密矩阵（33×33、35×35，对称存储），三连按组合数编号存成长度为
+C(N, 3) 的一维数组（双色球 5456 项，大乐透 6545 项），编号为
+a + C(b, 2) + C(c, 3)（0 起始，a < b < c）。
+
+每加入一期只改动这一期涉及的 15（或 10）个对子和 20（或 10）个三连，与历史长度
+无关。滑动窗口版本在加入新一期的同时减去移出窗口的那一期。全部历史和近 30、
+近 100 期三个版本一起保存在数据库旁边的 开奖数据.<彩种>.cooccur.npz 里，每次保存
+新数据时增量更新。
+
+    from lottery.cooccurrence import CoOccurrenceSet
+    cooc = CoOccurrenceSet.load("ssq")
+    cooc[None].top_pairs(10)       # 全部历史里同出最多的 10 个对子
+    cooc[30].pair(5, 12)           # 近 30 期 5 和 12 同出的次数
+"""
+import os
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from lottery.drawtable import MASK_GAMES, DrawTable
+from lottery.games import GAMES
+
+# 号码个数：双色球红球 33 个，大乐透前区 35 个
+NUMBER_COUNTS = {"ssq": 33, "dlt": 35}
+
+# 一起维护的窗口，None 表示全部历史
+WINDOWS = (None, 30, 100)
+
+
+def triple_rank(a, b, c):
+    """三个从小到大的号码（0 起始）的组合编号，可以是数组"""
+    return a + b * (b - 1) // 2 + c * (c - 1) * (c - 2) // 6
+
+
+def triple_table(size):
+    """编号 -> 三个号码（1 起始）的对照表"""
+    triples = np.array(list(combinations(range(size), 3)), dtype=np.int64)
+    order = np.argsort(triple_rank(triples[:, 0], triples[:, 1], triples[:, 2]))
+    return triples[order] + 1
+
+
+class CoOccurrence:
+    """一个窗口的对子和三连次数，window 为 None 时统计全部历史"""
+
+    def __init__(self, game, window=None):
+        if game not in MASK_GAMES:
+            raise ValueError(f"{game} 不支持号码同出统计")
+        self.game = game
+        self.window = window
+        self.size = NUMBER_COUNTS[game]
+        self.pairs = np.zeros((self.size, self.size), dtype=np.int32)
+        self.triples = np.zeros(comb(self.size, 3), dtype=np.int32)
+        self.draws = 0
+        self.last_period = None
+        # 窗口内各期的前区号码，用于在移出窗口时减去
+        self.recent = np.zeros((0, GAMES[game]["red_count"]), dtype=np.uint8)
+
+    def _apply(self, reds, sign):
+        """把若干期的前区号码加到（sign=1）或减出（sign=-1）计数里"""
+        if not len(reds):
+            return
+        numbers = np.sort(reds.astype(np.int64), axis=1) - 1
+        positions = np.array(list(combinations(range(numbers.shape[1]), 2)))
+        a, b = numbers[:, positions[:, 0]].ravel(), numbers[:, positions[:, 1]].ravel()
+        pair_counts = np.bincount(a * self.size + b, minlength=self.size * self.size).reshape(self.size, self.size)
+        self.pairs += sign * (pair_counts + pair_counts.T).astype(np.int32)
+
+        positions = np.array(list(combinations(range(numbers.shape[1]), 3)))
+        ranks = triple_rank(numbers[:, positions[:, 0]], numbers[:, positions[:, 1]], numbers[:, positions[:, 2]])
+        self.triples += sign * np.bincount(ranks.ravel(), minlength=len(self.triples)).astype(np.int32)
+        self.draws += sign * len(reds)
+
+    def add(self, table):
+        """加入比 last_period 更新的几期；窗口版本同时减去移出窗口的期"""
+        if not len(table):
+            return
+        if self.last_period is not None and table.periods[0] <= self.last_period:
+            raise ValueError(f"期号 {table.periods[0]} 不晚于已统计的 {self.last_period}")
+        reds = table.reds
+        if self.window is None:
+            self._apply(reds, 1)
+        else:
+            # 超过窗口长度的新数据只加入最后 window 期，其余直接跳过
+            reds = reds[-self.window:]
+            self._apply(reds, 1)
+            combined = np.concatenate([self.recent, reds])
+            self._apply(combined[:-self.window], -1)
+            self.recent = combined[-self.window:]
+        self.last_period = int(table.periods[-1])
+
+    def pair(self, a, b):
+        """两个号码同出的次数"""
+        return int(self.pairs[a - 1, b - 1])
+
+    def triple(self, a, b, c):
+        """三个号码同出的次数"""
+        a, b, c = sorted((a - 1, b - 1, c - 1))
+        return int(self.triples[triple_rank(a, b, c)])
+
+    def top_pairs(self, count=10):
+        """同出次数最多的对子 [(号码, 号码, 次数), ...]"""
+        upper = np.triu(self.pairs, k=1)
+        flat = np.argsort(upper, axis=None)[::-1][:count]
+        return [(int(i) + 1, int(j) + 1, int(upper[i, j])) for i, j in zip(*np.unravel_index(flat, upper.shape))]
+
+    def top_triples(self, count=10):
+        """同出次数最多的三连 [(号码, 号码, 号码, 次数), ...]"""
+        table = triple_table(self.size)
+        best = np.argsort(self.triples)[::-1][:count]
+        return [(*map(int, table[rank]), int(self.triples[rank])) for rank in best]
+
+
+class CoOccurrenceSet:
+    """一个彩种全部窗口的同出统计，按窗口取用：cooc[None]、cooc[30]"""
+
+    def __init__(self, game, windows=WINDOWS):
+        self.game = game
+        self.items = {window: CoOccurrence(game, window) for window in windows}
+
+    def __getitem__(self, window):
+        """取某个窗口的统计，None 为全部历史"""
+        return self.items[window]
+
+    @property
+    def total(self):
+        """全部历史的统计"""
+        return self.items[None]
+
+    @classmethod
+    def from_table(cls, table, windows=WINDOWS):
+        """由 DrawTable 全量计算"""
+        cooc = cls(table.game, windows)
+        cooc.add(table)
+        return cooc
+
+    def add(self, table):
+        """各窗口都加入新的几期"""
+        for item in self.items.values():
+            item.add(table)
+
+    def write(self, path):
+        """保存为 npz（先写临时文件再替换）"""
+        arrays = {}
+        for i, (window, item) in enumerate(self.items.items()):
+            arrays[f"window_{i}"] = np.array(-1 if window is None else window)
+            arrays[f"last_period_{i}"] = np.array(-1 if item.last_period is None else item.last_period)
+            arrays[f"draws_{i}"] = np.array(item.draws)
+            arrays[f"pairs_{i}"] = item.pairs
+            arrays[f"triples_{i}"] = item.triples
+            arrays[f"recent_{i}"] = item.recent
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, game, path, windows=WINDOWS):
+        """读取 npz，文件缺失、损坏或窗口设置不同时返回 None"""
+        try:
+            with np.load(path) as arrays:
+                cooc = cls(game, windows)
+                for i, (window, item) in enumerate(cooc.items.items()):
+                    if int(arrays[f"window_{i}"]) != (-1 if window is None else window):
+                        return None
+                    last_period = int(arrays[f"last_period_{i}"])
+                    item.last_period = None if last_period < 0 else last_period
+                    item.draws = int(arrays[f"draws_{i}"])
+                    item.pairs = arrays[f"pairs_{i}"]
+                    item.triples = arrays[f"triples_{i}"]
+                    item.recent = arrays[f"recent_{i}"]
+                    if item.pairs.shape != (item.size, item.size):
+                        return None
+        except (OSError, KeyError, ValueError):
+            return None
+        return cooc
+
+    @classmethod
+    def load(cls, game, db_path=None):
+        """读取保存的同出统计，没有时从数据库计算并保存"""
+        from lottery import store
+
+        db_path = db_path or store.DB_PATH
+        cooc = cls.read(game, cooccurrence_path(db_path, game))
+        if cooc is None:
+            conn = store.connect(db_path)
+            try:
+                cooc = rebuild(conn, game)
+            finally:
+                conn.close()
+        return cooc
+
+
+def cooccurrence_path(db_path, game):
+    """同出统计文件路径，与数据库放在一起，如 开奖数据.ssq.cooccur.npz"""
+    return f"{os.path.splitext(db_path)[0]}.{game}.cooccur.npz"
+
+
+def rebuild(conn, game):
+    """从数据库重新计算并保存该彩种的同出统计"""
+    cooc = CoOccurrenceSet.from_table(DrawTable.from_db(conn, game))
+    cooc.write(cooccurrence_path(conn.db_path, game))
+    return cooc
+
+
+def update(conn, game, data):
+    """保存新数据后调用：新的几期都晚于已统计的期号时增量更新，否则从数据库重算；3D、排列3 跳过"""
+    if game not in MASK_GAMES:
+        return None
+    path = cooccurrence_path(conn.db_path, game)
+    cooc = CoOccurrenceSet.read(game, path)
+    new_table = DrawTable.from_rows(game, data)
+    row_count = conn.execute("SELECT COUNT(*) FROM draws WHERE game = ?", (game,)).fetchone()[0]
+    if cooc is not None and len(new_table) and cooc.total.draws + len(new_table) == row_count and \
+            (cooc.total.last_period is None or new_table.periods[0] > cooc.total.last_period):
+        cooc.add(new_table)
+        cooc.write(path)
+        return cooc
+    return rebuild(conn, game)
@@ -0,0 +1,147 @@
+"""紧凑的开奖数据内存表示：号码矩阵 + 期号数组 + 号码集合位掩码
+
+    periods  int32，按期号从旧到新
+    numbers  uint8 矩阵，每行是一期的全部号码（红球在前、蓝球在后，没有“分隔”列）
+    masks    uint64，双色球 33 个红球、大乐透 35 个前区号码各占一位，号码 n 对应第 n-1 位；
+             3D、排列3 按位置比较，没有位掩码
+
+双色球每期只占 4 + 7 + 8 = 19 字节。两注号码的重合个数就是掩码按位与后的
+置 1 位数，一条 popcount 指令即可算出，不必再比较字符串列表。
+"""
+import numpy as np
+
+from lottery.games import GAMES, build_row, split_row
+
+# 使用位掩码表示前区号码集合的彩种
+MASK_GAMES = {"ssq", "dlt"}
+
+_BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values):
+    """uint64 数组逐个元素的置 1 位数"""
+    values = np.asarray(values, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _BYTE_BITS[values[..., None].view(np.uint8)].sum(axis=-1, dtype=np.uint8)
+
+
+def to_mask(numbers):
+    """号码矩阵（每行一组号码，1 起始）转成 uint64 位掩码，也接受单组号码"""
+    numbers = np.asarray(numbers, dtype=np.uint64)
+    bits = np.left_shift(np.uint64(1), numbers - np.uint64(1))
+    return np.bitwise_or.reduce(bits, axis=-1)
+
+
+def from_mask(mask):
+    """位掩码还原成从小到大的号码列表"""
+    mask = int(mask)
+    return [n + 1 for n in range(64) if mask >> n & 1]
+
+
+class DrawTable:
+    """一个彩种的全部开奖记录，按期号从旧到新"""
+
+    def __init__(self, game, periods, numbers):
+        width = GAMES[game]["red_count"] + GAMES[game]["blue_count"]
+        order = np.argsort(periods, kind="stable")
+        self.game = game
+        self.periods = np.ascontiguousarray(np.asarray(periods, dtype=np.int32)[order])
+        self.numbers = np.ascontiguousarray(np.asarray(numbers, dtype=np.uint8).reshape(len(order), width)[order])
+        self.red_count = GAMES[game]["red_count"]
+        self.masks = to_mask(self.reds) if game in MASK_GAMES else None
+
+    @classmethod
+    def from_rows(cls, game, data):
+        """由脚本 data 行构造（[期号, 红球..., "", 蓝球...]，字符串即可）"""
+        periods, numbers = [], []
+        for row in data:
+            period, red_balls, blue_balls = split_row(game, row)
+            periods.append(int(period))
+            numbers.append([int(n) for n in list(red_balls) + list(blue_balls)])
+        return cls(game, periods, np.array(numbers, dtype=np.uint8))
+
+    @classmethod
+    def from_arrow(cls, game, table):
+        """由 lottery.columnar 的 Arrow 表构造"""
+        columns = table.column_names
+        numbers = np.column_stack([table[c].to_numpy() for c in columns[1:]])
+        return cls(game, table[columns[0]].to_numpy(), numbers)
+
+    @classmethod
+    def from_db(cls, conn, game):
+        """由 SQLite 数据库构造（不需要 pyarrow）"""
+        periods, numbers = [], []
+        for period, red, blue in conn.execute("SELECT period, red, blue FROM draws WHERE game = ?", (game,)):
+            periods.append(period)
+            numbers.append([int(n) for n in f"{red} {blue}".split()])
+        return cls(game, periods, np.array(numbers, dtype=np.uint8))
+
+    @classmethod
+    def load(cls, game, db_path=None):
+        """从保存的数据加载：优先内存映射 Arrow 列式文件，没有时读数据库"""
+        from lottery import columnar, store
+
+        db_path = db_path or store.DB_PATH
+        try:
+            return cls.from_arrow(game, columnar.load_table(game, db_path))
+        except (ImportError, OSError):
+            conn = store.connect(db_path)
+            try:
+                return cls.from_db(conn, game)
+            finally:
+                conn.close()
+
+    def __len__(self):
+        return len(self.periods)
+
+    def __repr__(self):
+        if not len(self):
+            return f"DrawTable({self.game}, 0 期)"
+        return f"DrawTable({self.game}, {len(self)} 期, {self.periods[0]} - {self.periods[-1]})"
+
+    @property
+    def reds(self):
+        """红球（前区）或 3D、排列3 的三位号码"""
+        return self.numbers[:, :self.red_count]
+
+    @property
+    def blues(self):
+        """蓝球（后区），3D、排列3 为空"""
+        return self.numbers[:, self.red_count:]
+
+    @property
+    def nbytes(self):
+        """占用的内存字节数"""
+        return self.periods.nbytes + self.numbers.nbytes + (self.masks.nbytes if self.masks is not None else 0)
+
+    def __getitem__(self, index):
+        """按位置切片或布尔掩码筛选，返回新的 DrawTable"""
+        return DrawTable(self.game, self.periods[index], self.numbers[index])
+
+    def between(self, start_period=None, end_period=None):
+        """按期号范围筛选（含两端）"""
+        lo = 0 if start_period is None else np.searchsorted(self.periods, start_period, side="left")
+        hi = len(self) if end_period is None else np.searchsorted(self.periods, end_period, side="right")
+        return self[lo:hi]
+
+    def append(self, other):
+        """合并另一张表（如新抓到的几期），期号相同时以 other 为准"""
+        keep = ~np.isin(self.periods, other.periods)
+        return DrawTable(self.game, np.concatenate([self.periods[keep], other.periods]),
+                         np.concatenate([self.numbers[keep], other.numbers]))
+
+    def overlap(self, reds):
+        """每期红球（前区）与给定号码的重合个数；双色球、大乐透用位掩码 popcount 计算"""
+        if self.masks is not None:
+            return popcount(self.masks & to_mask(reds))
+        return np.isin(self.reds, np.asarray(reds)).sum(axis=1).astype(np.uint8)
+
+    def to_rows(self):
+        """还原成脚本 data 行格式，最新期号在前"""
+        width = GAMES[self.game]["ball_width"]
+        rows = []
+        for period, numbers in zip(self.periods[::-1], self.numbers[::-1]):
+            numbers = [str(n).zfill(width) for n in numbers]
+            rows.append(build_row(self.game, period, numbers[:self.red_count], numbers[self.red_count:]))
+        return rows
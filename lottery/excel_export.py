@@ -0,0 +1,98 @@
+"""流式导出 Excel：逐行写出，不在内存里建整张工作表
+
+优先用 XlsxWriter 的 constant_memory 模式，居中格式挂在列上，写入的单元格
+直接继承列格式；没有安装 XlsxWriter 时退回 openpyxl 的 write_only 模式，每列
+复用一个带样式的模板单元格。两种方式都不会为每个单元格创建样式对象，导出
+耗时和内存不随历史期数增长而膨胀。
+"""
+import os
+
+
+def column_width(column):
+    """列宽：期号 12，“分隔”空列 5，其余 10"""
+    return 12 if column == "期号" else 5 if column == "分隔" else 10
+
+
+def _write_xlsxwriter(path, columns, rows):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        center = workbook.add_format({"align": "center", "valign": "vcenter"})
+        header = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "vcenter"})
+        worksheet = workbook.add_worksheet("Sheet1")
+        for col_idx, column in enumerate(columns):
+            worksheet.set_column(col_idx, col_idx, column_width(column), center)
+        worksheet.write_row(0, 0, columns, header)
+
+        count = 0
+        for count, row in enumerate(rows, 1):
+            for col_idx, value in enumerate(row):
+                if value != "":
+                    # 期号写成数字，号码按原样写成文本，保留 "02" 这样的前导零
+                    worksheet.write(count, col_idx, value)
+    finally:
+        workbook.close()
+    return count
+
+
+def _write_openpyxl(path, columns, rows):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Sheet1")
+    center = Alignment(horizontal='center', vertical='center')
+    for col_idx, column in enumerate(columns, 1):
+        worksheet.column_dimensions[get_column_letter(col_idx)].width = column_width(column)
+
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(worksheet, value=column)
+        cell.font = Font(bold=True)
+        cell.alignment = center
+        header.append(cell)
+    worksheet.append(header)
+
+    # write_only 模式下 append 会立即写出，所以每列一个模板单元格可以反复使用
+    templates = []
+    for _ in columns:
+        cell = WriteOnlyCell(worksheet)
+        cell.alignment = center
+        templates.append(cell)
+
+    count = 0
+    for count, row in enumerate(rows, 1):
+        cells = []
+        for template, value in zip(templates, row):
+            if value == "":
+                cells.append(None)
+            else:
+                template.value = value
+                cells.append(template)
+        worksheet.append(cells)
+    workbook.save(path)
+    return count
+
+
+def write_rows(path, columns, rows):
+    """把 rows（可迭代的行，数字写成数字、字符串写成文本，空列用 "" 表示）流式写成 Excel，返回写入的行数
+
+    先写临时文件再替换，导出中途出错不会留下半个表格。
+    """
+    base, ext = os.path.splitext(path)
+    tmp_path = f"{base}.tmp{ext}"
+    try:
+        import xlsxwriter  # noqa: F401
+        writer = _write_xlsxwriter
+    except ImportError:
+        writer = _write_openpyxl
+    try:
+        count = writer(tmp_path, columns, rows)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
@@ -0,0 +1,111 @@
+"""本地回放服务器：按请求路径和参数返回录制好的页面或接口响应
+
+录制：用 http 后端加 --record 目录运行一次脚本，每个响应会保存到该目录，
+并在 index.json 里记下请求与文件的对应关系。
+回放：python -m lottery.fixture_server 目录 --port 8765，
+再用 --base-url http://127.0.0.1:8765 运行脚本即可离线抓取。
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# 每次请求都会变化、不影响返回内容的参数
+VOLATILE_PARAMS = {"callback", "tt", "_"}
+
+INDEX_FILE = "index.json"
+
+
+def fixture_key(path, params):
+    """由请求路径和有效参数生成索引键"""
+    items = sorted((k, str(v)) for k, v in params if k not in VOLATILE_PARAMS)
+    return path + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+
+def load_index(fixture_dir):
+    """读取录制索引"""
+    index_path = os.path.join(fixture_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_fixture(fixture_dir, url, params, body, content_type="application/json"):
+    """保存一次响应到录制目录"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    items = params.items() if isinstance(params, dict) else params
+    key = fixture_key(urlsplit(url).path, items)
+    filename = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".txt"
+    with open(os.path.join(fixture_dir, filename), "wb") as f:
+        f.write(body)
+
+    index = load_index(fixture_dir)
+    index[key] = {"file": filename, "content_type": content_type}
+    with open(os.path.join(fixture_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+
+
+def make_handler(fixture_dir, responder=None):
+    """生成绑定到录制目录的请求处理类
+
+    传入 responder(path, params) 时，未录制的请求交给它生成响应，返回 (body, content_type) 或 None
+    """
+    index = load_index(fixture_dir) if fixture_dir else {}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            key = fixture_key(parts.path, parse_qsl(parts.query, keep_blank_values=True))
+            entry = index.get(key)
+            if entry is None and parts.path in index:
+                entry = index[parts.path]  # 静态页面只按路径匹配
+            if entry is not None:
+                with open(os.path.join(fixture_dir, entry["file"]), "rb") as f:
+                    body = f.read()
+                content_type = entry.get("content_type", "application/json")
+            else:
+                response = None
+                if responder is not None:
+                    response = responder(parts.path, dict(parse_qsl(parts.query, keep_blank_values=True)))
+                if response is None:
+                    print(f"未录制的请求: {key}")
+                    self.send_error(404, "Fixture Not Recorded", key)
+                    return
+                body, content_type = response
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def serve_fixtures(fixture_dir, host="127.0.0.1", port=0, responder=None):
+    """在后台线程启动回放服务器，返回 (server, base_url)；fixture_dir 为 None 时只用 responder 生成响应"""
+    server = ThreadingHTTPServer((host, port), make_handler(fixture_dir, responder))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放录制的开奖页面和接口响应")
+    parser.add_argument("fixture_dir", help="录制目录")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(args.fixture_dir))
+    print(f"回放服务器已启动: http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("回放服务器已停止")
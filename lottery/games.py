@@ -0,0 +1,106 @@
+"""各彩种的基础信息：脚本、文件名、首期期号、开奖页面、数据接口和开奖日程"""
+import importlib.util
+import os
+
+GAMES = {
+    "ssq": {
+        "name": "双色球",
+        "script": "双色球历史数据2.0.py",
+        "excel": "双色球历史数据.xlsx",
+        "columns": ["期号", "红球1", "红球2", "红球3", "红球4", "红球5", "红球6", "分隔", "蓝球"],
+        "red_count": 6,
+        "blue_count": 1,
+        "ball_width": 2,
+        "first_period": 2003001,
+        "page_url": "https://www.zhcw.com/kjxx/ssq/",
+        "range_query": True,
+        "api": "zhcw",
+        "lottery_id": "1",
+        "draw_days": (1, 3, 6),  # 周二、四、日开奖（周一为 0）
+        "draw_time": "21:15",  # 北京时间
+    },
+    "dlt": {
+        "name": "大乐透",
+        "script": "大乐透历史数据2.0.py",
+        "excel": "大乐透历史数据.xlsx",
+        "columns": ["期号", "红球1", "红球2", "红球3", "红球4", "红球5", "分隔", "蓝球1", "蓝球2"],
+        "red_count": 5,
+        "blue_count": 2,
+        "ball_width": 2,
+        "first_period": 7001,
+        "page_url": "https://www.lottery.gov.cn/kj/kjlb.html?dlt",
+        "range_query": False,
+        "api": "sporttery",
+        "game_no": "85",
+        "draw_days": (0, 2, 5),  # 周一、三、六开奖（周一为 0）
+        "draw_time": "21:25",  # 北京时间
+    },
+    "3d": {
+        "name": "3D",
+        "script": "3d数据采集.py",
+        "excel": "3D历史数据.xlsx",
+        "columns": ["期号", "号码1", "号码2", "号码3"],
+        "red_count": 3,
+        "blue_count": 0,
+        "ball_width": 1,
+        "first_period": 2003001,
+        "page_url": "https://www.zhcw.com:8443/kjxx/3d/",
+        "range_query": True,
+        "api": "zhcw",
+        "lottery_id": "2",
+        "draw_days": (0, 1, 2, 3, 4, 5, 6),  # 每天开奖（周一为 0）
+        "draw_time": "21:15",  # 北京时间
+    },
+    "pl3": {
+        "name": "排列3",
+        "script": "排列3数据采集.py",
+        "excel": "排列3历史数据.xlsx",
+        "columns": ["期号", "号码1", "号码2", "号码3"],
+        "red_count": 3,
+        "blue_count": 0,
+        "ball_width": 1,
+        "first_period": 4001,
+        "page_url": "https://www.lottery.gov.cn/kj/kjlb.html?pls",
+        "range_query": False,
+        "api": "sporttery",
+        "game_no": "35",
+        "draw_days": (0, 1, 2, 3, 4, 5, 6),  # 每天开奖（周一为 0）
+        "draw_time": "21:25",  # 北京时间
+    },
+}
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+API_URLS = {
+    "zhcw": "https://jc.zhcw.com/port/client_json.php",
+    "sporttery": "https://webapi.sporttery.cn/gateway/lottery/getHistoryPageListV1.qry",
+}
+
+
+def build_row(game, period, red_balls, blue_balls=()):
+    """按脚本里 data 的格式组装一行，红球与蓝球之间插入空的“分隔”列"""
+    row = [str(period)] + list(red_balls)
+    if GAMES[game]["blue_count"]:
+        row += [""] + list(blue_balls)
+    return row
+
+
+def split_row(game, row):
+    """把 data 行拆成 (期号, 红球列表, 蓝球列表)，跳过“分隔”列"""
+    red_count, blue_count = GAMES[game]["red_count"], GAMES[game]["blue_count"]
+    blue_balls = row[2 + red_count:2 + red_count + blue_count] if blue_count else []
+    return row[0], row[1:1 + red_count], blue_balls
+
+
+def ball_columns(game):
+    """号码列名（不含期号和“分隔”列）"""
+    return [c for c in GAMES[game]["columns"] if c not in ("期号", "分隔")]
+
+
+def load_script(game):
+    """按文件路径导入彩种采集脚本（文件名含中文和点号，不能直接 import）"""
+    path = os.path.join(ROOT_DIR, GAMES[game]["script"])
+    spec = importlib.util.spec_from_file_location(f"lottery_script_{game}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
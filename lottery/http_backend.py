@@ -0,0 +1,244 @@
+"""不启动浏览器的抓取后端：直接请求开奖列表页背后的数据接口
+
+中彩网（双色球、3D）和体彩网（大乐透、排列3）的开奖表格都是由页面脚本
+请求 JSON/JSONP 接口后渲染出来的，这里直接请求这些接口并解析成和
+浏览器抓取相同格式的 data 行。
+"""
+import json
+import random
+import re
+from urllib.parse import urlsplit
+
+import requests
+
+from lottery import metrics, store
+from lottery.fixture_server import record_fixture
+from lottery.games import API_URLS, GAMES, build_row
+from lottery.pacing import pacer_for
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124",
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+}
+
+REFERERS = {
+    "zhcw": "https://www.zhcw.com/",
+    "sporttery": "https://www.lottery.gov.cn/",
+}
+
+JSONP_PATTERN = re.compile(r"^\s*[\w$.]+\s*\((.*)\)\s*;?\s*$", re.S)
+
+
+def create_session(base_url=None, record_dir=None):
+    """创建 HTTP 会话；base_url 指向本地回放服务器时可离线运行，record_dir 用于录制响应"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.base_url = base_url.rstrip("/") if base_url else None
+    session.record_dir = record_dir
+    return session
+
+
+def api_url(session, api):
+    """返回接口地址，设置了 base_url 时只保留原接口的路径"""
+    url = API_URLS[api]
+    if session.base_url:
+        return session.base_url + urlsplit(url).path
+    return url
+
+
+def load_json(text):
+    """解析 JSON 或 JSONP 响应"""
+    match = JSONP_PATTERN.match(text)
+    return json.loads(match.group(1) if match else text)
+
+
+def request_json(session, api, params, retry_count=3, timeout=15):
+    """请求数据接口并返回解析后的 JSON，按站点限速，失败时退避重试"""
+    url = api_url(session, api)
+    pacer = pacer_for(url)
+    for attempt in range(retry_count):
+        pacer.wait()
+        try:
+            metrics.count("http_requests")
+            with metrics.phase("http_request"):
+                response = session.get(url, params=params, headers={"Referer": REFERERS[api]}, timeout=timeout)
+            metrics.count("bytes_received", len(response.content))
+            response.raise_for_status()
+            if session.record_dir:
+                record_fixture(session.record_dir, url, params, response.content,
+                               response.headers.get("Content-Type", "application/json"))
+            payload = load_json(response.text)
+        except (requests.RequestException, ValueError) as e:
+            print(f"第 {attempt + 1} 次请求失败: {e}")
+            pacer.failure()
+            if attempt < retry_count - 1:
+                metrics.record_retry(e)
+            if attempt == retry_count - 1:
+                raise
+        else:
+            pacer.success()
+            return payload
+
+
+def page_params(game, page_no, start_period=None, end_period=None, page_size=30):
+    """组装分页查询参数，给出期号范围时按期号查询"""
+    info = GAMES[game]
+    if info["api"] == "zhcw":
+        params = {
+            "callback": "jQuery",
+            "transactionType": "10001001",
+            "lotteryId": info["lottery_id"],
+            "issueCount": "",
+            "startIssue": start_period or "",
+            "endIssue": end_period or "",
+            "startDate": "",
+            "endDate": "",
+            "type": 1 if start_period else 0,
+            "pageNum": page_no,
+            "pageSize": page_size,
+            "tt": random.random(),
+        }
+    else:
+        params = {
+            "gameNo": info["game_no"],
+            "provinceId": 0,
+            "pageSize": page_size,
+            "isVerify": 1,
+            "pageNo": page_no,
+        }
+        if start_period:
+            # 体彩网期号是两位年份加三位序号，2007 年的期号要写成 07001
+            params["startTerm"] = f"{int(start_period):05d}"
+            params["endTerm"] = f"{int(end_period):05d}" if end_period else ""
+    return params
+
+
+def payload_pages(game, payload):
+    """接口返回的 JSON 里的 (开奖记录列表, 总页数)"""
+    if GAMES[game]["api"] == "zhcw":
+        return payload.get("data") or [], int(payload.get("pages") or 1)
+    value = payload.get("value") or {}
+    return value.get("list") or [], int(value.get("pages") or 1)
+
+
+def parse_payload(game, payload):
+    """把接口返回的 JSON 解析为 (data 行, 总页数)"""
+    info = GAMES[game]
+    items, pages = payload_pages(game, payload)
+    rows = []
+    if info["api"] == "zhcw":
+        for item in items:
+            numbers = str(item.get("frontWinningNum", "")).split()
+            blues = str(item.get("backWinningNum", "")).split()
+            rows.append((str(item.get("issue", "")).strip(), numbers, blues))
+    else:
+        for item in items:
+            numbers = str(item.get("lotteryDrawResult", "")).split()
+            red_count = info["red_count"]
+            rows.append((str(item.get("lotteryDrawNum", "")).strip(), numbers[:red_count],
+                         numbers[red_count:red_count + info["blue_count"]]))
+
+    data = []
+    for period, red_balls, blue_balls in rows:
+        if not period.isdigit():
+            continue
+        if len(red_balls) != info["red_count"] or len(blue_balls) != info["blue_count"]:
+            continue
+        if not all(n.isdigit() for n in red_balls + blue_balls):
+            continue
+        data.append(build_row(game, period, red_balls, blue_balls))
+    return data, pages
+
+
+def fetch_page(session, game, page_no, start_period=None, end_period=None, page_size=30):
+    """抓取一页开奖数据，返回 (data 行, 总页数)"""
+    payload = request_json(session, GAMES[game]["api"],
+                           page_params(game, page_no, start_period, end_period, page_size))
+    return parse_payload(game, payload)
+
+
+def get_latest_period(session, game):
+    """获取最新期号"""
+    try:
+        data, _ = fetch_page(session, game, 1, page_size=1)
+        if data:
+            return int(data[0][0])
+        print("接口未返回开奖数据")
+    except Exception as e:
+        print(f"获取最新期号失败: {e}")
+    return None
+
+
+def probe_new_draws(game, base_url=None, timeout=5, session=None, verbose=True):
+    """启动浏览器之前的快速检查：一次只取一条的接口请求对比本地水位清单
+
+    返回 True 表示有新开奖，False 表示没有新数据（不必启动浏览器）；接口不可用时
+    返回 None，由调用方照常启动浏览器抓取。传入 session 时复用其连接，不关闭。
+    """
+    existing_max = store.get_max_period(game)
+    own_session = session is None
+    if own_session:
+        session = create_session(base_url)
+    try:
+        with metrics.phase("probe"):
+            payload = request_json(session, GAMES[game]["api"], page_params(game, 1, page_size=1),
+                                   retry_count=1, timeout=timeout)
+        data, _ = parse_payload(game, payload)
+    except Exception as e:
+        print(f"快速检查最新期号失败，照常抓取: {e}")
+        return None
+    finally:
+        if own_session:
+            session.close()
+    if not data:
+        return None
+    latest_period = int(data[0][0])
+    if existing_max is not None and existing_max >= latest_period:
+        if verbose:
+            print(f"{GAMES[game]['name']}最新期号 {latest_period} 已保存，无需启动浏览器")
+        return False
+    return True
+
+
+def iter_pages(session, game, start_period, end_period, first_page=1, page_size=30, max_pages=500):
+    """流水线的取页端：按页请求 [start_period, end_period] 的查询结果，返回 (页码, 原始 JSON)
+
+    只在这里发请求，解析交给 parse_payload；到最后一页或某页没有记录时停止。
+    """
+    page_no = first_page
+    while page_no < first_page + max_pages:
+        payload = request_json(session, GAMES[game]["api"],
+                               page_params(game, page_no, start_period, end_period, page_size))
+        items, pages = payload_pages(game, payload)
+        yield page_no, payload
+        if not items or page_no >= pages:
+            break
+        page_no += 1
+
+
+def iter_range(session, game, start_period, end_period, page_size=30, max_records=10000):
+    """按页依次返回 [start_period, end_period] 范围内的 data 行，最新期号在前"""
+    seen_periods = set()
+    count = 0
+    for page_no, payload in iter_pages(session, game, start_period, end_period, page_size=page_size):
+        page_data, pages = parse_payload(game, payload)
+        rows = []
+        for row in page_data:
+            period_int = int(row[0])
+            if period_int < start_period or period_int > end_period or row[0] in seen_periods:
+                continue
+            seen_periods.add(row[0])
+            rows.append(row)
+        count += len(rows)
+        print(f"第 {page_no}/{pages} 页获取 {len(rows)} 条记录")
+        yield rows
+        if (page_data and int(page_data[-1][0]) <= start_period) or count >= max_records:
+            break
+
+
+def fetch_range(session, game, start_period, end_period, page_size=30, max_records=10000):
+    """抓取 [start_period, end_period] 范围内的全部开奖数据"""
+    data = []
+    for rows in iter_range(session, game, start_period, end_period, page_size, max_records):
+        data.extend(rows)
+    return data
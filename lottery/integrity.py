@@ -0,0 +1,204 @@
+"""历史数据完整性检查：按期号规则找出中间缺失的期号，只补抓缺失的那几段
+
+    python -m lottery.integrity                # 检查全部彩种
+    python -m lottery.integrity ssq --repair   # 检查双色球并补抓缺失的期号（可疑年末加 --tails）
+
+续抓只从已保存的最大期号往后抓，中间漏掉的期号（例如某一页“表格加载超时，跳过
+当前页”）以后不会再补上。期号由“年份 + 当年序号”组成（2003001、24001），每年
+从 001 连续编号，所以每一年里序号 1 到当年已保存的最大序号之间缺哪几个一查便知；
+整年都没有数据的年份整段算缺失。年末缺几期从序号上看不出来，这里拿相邻完整年份
+实际的最后一期作参照，比参照少两周以上开奖的年份把年末列为可疑区间；可疑区间
+只报告，加 --tails 才一并查询（查不到就说明本来就没有）。
+
+补抓默认用数据接口的按期号查询，相邻的缺口能放进一页（PAGE_SIZE 期）时合并成一次
+查询；只保存原来没有的期号，已有的记录不动。--backend browser 时改用脚本的
+scrape_shard 在一个无头浏览器里逐段抓取：双色球、3D 按期号查询，大乐透、排列3
+二分查找跳到缺口所在的页。
+"""
+import argparse
+import os
+
+from lottery import checkpoint, http_backend, store
+from lottery.games import GAMES, load_script
+
+# 年末比相邻年份少多少周的开奖才算可疑：每年的期数随星期分布和休市安排相差几期
+TAIL_SLACK_WEEKS = 2
+
+# 合并缺口时一次查询最多覆盖的期数，与数据接口的每页条数一致
+PAGE_SIZE = 30
+
+
+def split_period(period):
+    """(年份, 当年序号)，年份保持期号里的写法（2003 或 7）"""
+    return divmod(period, 1000)
+
+
+def tail_bound(game, year, last_seqs):
+    """某一年最后一期序号的保守下限：相邻年份实际最后一期的较小者减去两周的开奖次数
+
+    last_seqs 为 {年份: 当年最后一期序号}，不含还在开奖的最后一年；没有相邻年份可参照时返回 None
+    """
+    neighbours = [last_seqs[other] for other in (year - 1, year + 1) if other in last_seqs]
+    if not neighbours:
+        return None
+    return min(neighbours) - TAIL_SLACK_WEEKS * len(GAMES[game]["draw_days"])
+
+
+def _missing_ranges(year, seqs, first_seq, last_seq):
+    """year 年序号 first_seq 到 last_seq 之间缺失的连续区间，seqs 为已有序号（升序、去重）"""
+    ranges = []
+    expected = first_seq
+    for seq in seqs:
+        if seq > expected:
+            ranges.append((year * 1000 + expected, year * 1000 + seq - 1))
+        expected = max(expected, seq + 1)
+    if expected <= last_seq:
+        ranges.append((year * 1000 + expected, year * 1000 + last_seq))
+    return ranges
+
+
+def scan(game, periods):
+    """检查一组期号，返回 {"holes": 缺失区间, "tails": 可疑的年末区间, "duplicates": 重复期号, "invalid": 非法期号}
+
+    区间都是 (起, 止) 期号；最新一年的年末是还没开奖的期号，不算缺失。
+    """
+    first_year, first_seq = split_period(GAMES[game]["first_period"])
+    by_year, seen = {}, set()
+    report = {"holes": [], "tails": [], "duplicates": [], "invalid": []}
+    for period in sorted(periods):
+        year, seq = split_period(period)
+        if period in seen:
+            report["duplicates"].append(period)
+            continue
+        seen.add(period)
+        if seq == 0 or period < GAMES[game]["first_period"]:
+            report["invalid"].append(period)
+            continue
+        by_year.setdefault(year, []).append(seq)
+    if not by_year:
+        return report
+
+    last_year = max(by_year)
+    # 最后一年还在开奖，不拿来作参照；第一年从首期开始、期数偏少，作参照只会让下限更保守
+    last_seqs = {year: seqs[-1] for year, seqs in by_year.items() if year != last_year}
+    for year in range(first_year, last_year + 1):
+        start_seq = first_seq if year == first_year else 1
+        seqs = by_year.get(year)
+        if not seqs:
+            report["holes"].append((year * 1000 + start_seq, year * 1000 + 999))
+            continue
+        report["holes"] += _missing_ranges(year, seqs, start_seq, seqs[-1])
+        bound = tail_bound(game, year, last_seqs) if year not in (first_year, last_year) else None
+        if bound is not None and seqs[-1] < bound:
+            report["tails"].append((year * 1000 + seqs[-1] + 1, year * 1000 + 999))
+    return report
+
+
+def plan_queries(ranges, page_size=PAGE_SIZE):
+    """把缺失区间合并成尽量少的按期号查询：同一年里合并后不超过 page_size 期的相邻区间并成一次"""
+    queries = []
+    for start, end in sorted(ranges):
+        if queries:
+            last_start, last_end = queries[-1]
+            if split_period(start)[0] == split_period(last_start)[0] and end - last_start < page_size:
+                queries[-1] = (last_start, max(last_end, end))
+                continue
+        queries.append((start, end))
+    return queries
+
+
+def stored_periods(conn, game):
+    """数据库里该彩种的全部期号，从旧到新"""
+    return [period for (period,) in conn.execute("SELECT period FROM draws WHERE game = ? ORDER BY period", (game,))]
+
+
+def print_report(game, report):
+    """打印检查结果，缺失区间最多列出 20 段"""
+    name = GAMES[game]["name"]
+    holes = report["holes"]
+    missing = sum(end - start + 1 for start, end in holes if end % 1000 != 999)
+    print(f"{name}: 缺失 {len(holes)} 段（约 {missing} 期），可疑年末 {len(report['tails'])} 段，"
+          f"重复 {len(report['duplicates'])} 期，非法期号 {len(report['invalid'])} 个")
+    for start, end in holes[:20]:
+        print(f"  缺失 {start} - {end}")
+    if len(holes) > 20:
+        print(f"  …… 另有 {len(holes) - 20} 段")
+    for start, _ in report["tails"]:
+        print(f"  可疑年末 {start} 起（加 --tails 查询）")
+
+
+def refetch(game, queries, backend="http", base_url=None):
+    """按查询区间补抓，返回抓到的 data 行；浏览器方式在同一个无头浏览器里依次抓取各段"""
+    if backend == "browser":
+        from lottery.browser_session import create_driver
+
+        script = load_script(game)
+        driver = create_driver(headless=True)
+        try:
+            return [row for start, end in queries for row in script.scrape_shard(start, end, driver)]
+        finally:
+            driver.quit()
+
+    session = http_backend.create_session(base_url)
+    try:
+        return [row for start, end in queries for row in http_backend.fetch_range(session, game, start, end)]
+    finally:
+        session.close()
+
+
+def repair(game, backend="http", base_url=None, dry_run=False, tails=False):
+    """检查并补抓缺失的期号，返回补上的条数，出错时返回 None；tails 为 True 时可疑的年末区间也一并查询"""
+    try:
+        conn = store.connect()
+        try:
+            store.ensure_imported(conn, game)
+            periods = stored_periods(conn, game)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"读取现有数据失败: {e}")
+        return None
+
+    report = scan(game, periods)
+    print_report(game, report)
+    queries = plan_queries(report["holes"] + (report["tails"] if tails else []))
+    if not queries or dry_run:
+        return 0
+    print(f"需要 {len(queries)} 次按期号查询")
+
+    try:
+        rows = refetch(game, queries, backend, base_url)
+    except Exception as e:
+        print(f"补抓失败: {e}")
+        return None
+    existing = set(periods)
+    found = {int(row[0]): row for row in rows if int(row[0]) not in existing}
+    if not found:
+        print("没有查到缺失的期号")
+        return 0
+    saved = store.save_batches(game, [[found[period] for period in sorted(found)]])
+    if saved is not None:
+        # 只删除补抓各段的断点，别的中断了的抓取还要接着用自己的断点
+        for start, _ in queries:
+            path = checkpoint.checkpoint_path(game, f"shard{start}")
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"✅ 补上 {saved} 期")
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查历史数据中缺失、重复的期号，并只补抓缺失的部分")
+    parser.add_argument("games", nargs="*", metavar="game", help=f"彩种（{', '.join(GAMES)}），默认全部")
+    parser.add_argument("--repair", action="store_true", help="按期号补抓缺失的期号")
+    parser.add_argument("--tails", action="store_true", help="补抓时把可疑的年末区间也一并查询")
+    parser.add_argument("--backend", choices=["http", "browser"], default="http",
+                        help="补抓方式：http 请求数据接口（默认），browser 用无头浏览器")
+    parser.add_argument("--base-url", help="数据接口地址，指向本地回放服务器时可离线运行")
+    args = parser.parse_args()
+    unknown = [game for game in args.games if game not in GAMES]
+    if unknown:
+        parser.error(f"未知的彩种: {', '.join(unknown)}")
+
+    for game in args.games or list(GAMES):
+        repair(game, args.backend, args.base_url, dry_run=not args.repair, tails=args.tails)
@@ -0,0 +1,57 @@
+"""每个彩种的水位清单：最新期号、记录数和内容校验和
+
+清单在数据库的 manifest 表里与开奖数据同一事务更新，同时在数据库旁边写一份
+JSON 副本，脚本启动时只读这个小文件就能知道从哪一期开始续抓，无需打开数据库。
+写入数据库前先把 JSON 标记为 dirty，提交后再写回干净的版本；若进程中途退出，
+下次读取会看到 dirty 标记并回退到数据库。
+"""
+import hashlib
+import json
+import os
+
+# 校验和取各记录哈希之和，与顺序无关，可以随增删改增量维护
+CHECKSUM_MOD = 2 ** 63
+
+
+def record_hash(period, red, blue):
+    """单条记录的 64 位哈希"""
+    digest = hashlib.blake2b(f"{period}|{red}|{blue}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % CHECKSUM_MOD
+
+
+def manifest_path(db_path, game):
+    """JSON 清单文件路径，每个彩种一个文件，避免并发更新时互相覆盖"""
+    return f"{db_path}.{game}.manifest.json"
+
+
+def read_entry(db_path, game):
+    """读取 JSON 清单；文件缺失、损坏、标记为 dirty 或数据库不存在时返回 None"""
+    path = manifest_path(db_path, game)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("dirty") or entry.get("game") != game or not os.path.exists(db_path):
+        return None
+    if not all(key in entry for key in ("last_period", "row_count", "checksum")):
+        return None
+    return entry
+
+
+def write_entry(db_path, game, entry, dirty=False):
+    """原子地写入 JSON 清单（先写临时文件再替换）"""
+    path = manifest_path(db_path, game)
+    data = dict(entry, game=game, dirty=dirty)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def mark_dirty(db_path, game):
+    """即将修改数据库前，把 JSON 清单标记为不可信"""
+    entry = read_entry(db_path, game) or {"last_period": None, "row_count": 0, "checksum": 0}
+    write_entry(db_path, game, entry, dirty=True)
@@ -0,0 +1,154 @@
+"""历史对奖索引：一注或一批号码在每一期会中几个球、中几等奖
+
+双色球、大乐透的前区和后区都用 uint64 位掩码表示，一注号码与全部历史开奖的
+重合个数就是按位与后的 popcount，批量查询时把 (注数 × 期数) 整块向量化计算；
+大批量按注数分块，交给线程池并行（NumPy 的位运算会释放 GIL，可以用满多核）。
+只关心每注各奖级中过几次时用 tier_summary，逐块汇总，不保留整个矩阵。
+3D、排列3 按位置比较：三位全部对上为直选，号码相同但顺序不同为组选。
+
+    from lottery.matching import MatchIndex
+    index = MatchIndex.load("ssq")
+    index.history([1, 5, 9, 12, 20, 33], [7])      # [(期号, 奖级名称), ...]
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lottery.drawtable import DrawTable, popcount, to_mask
+
+# 奖级：{彩种: {(前区中几个, 后区中几个): 奖级}}，0 为未中奖
+PRIZE_TIERS = {
+    "ssq": {
+        (6, 1): 1, (6, 0): 2, (5, 1): 3, (5, 0): 4, (4, 1): 4,
+        (4, 0): 5, (3, 1): 5, (2, 1): 6, (1, 1): 6, (0, 1): 6,
+    },
+    "dlt": {
+        (5, 2): 1, (5, 1): 2, (5, 0): 3, (4, 2): 4, (4, 1): 5, (3, 2): 6, (4, 0): 7,
+        (3, 1): 8, (2, 2): 8, (3, 0): 9, (2, 1): 9, (1, 2): 9, (0, 2): 9,
+    },
+}
+
+TIER_NAMES = {
+    "ssq": ["未中奖", "一等奖", "二等奖", "三等奖", "四等奖", "五等奖", "六等奖"],
+    "dlt": ["未中奖", "一等奖", "二等奖", "三等奖", "四等奖", "五等奖", "六等奖", "七等奖", "八等奖", "九等奖"],
+    "3d": ["未中奖", "直选", "组选3", "组选6"],
+    "pl3": ["未中奖", "直选", "组选3", "组选6"],
+}
+
+# 每块最多多少注，块内矩阵为 (注数 × 期数) 个字节
+CHUNK_TICKETS = 2048
+
+MatchResult = namedtuple("MatchResult", ["red_hits", "blue_hits", "tiers"])
+
+
+def tier_table(game, red_count, blue_count):
+    """(前区中几个, 后区中几个) -> 奖级 的查找表"""
+    table = np.zeros((red_count + 1, blue_count + 1), dtype=np.uint8)
+    for (red_hits, blue_hits), tier in PRIZE_TIERS[game].items():
+        table[red_hits, blue_hits] = tier
+    return table
+
+
+class MatchIndex:
+    """一个彩种全部历史开奖的对奖索引"""
+
+    def __init__(self, table):
+        self.table = table
+        self.game = table.game
+        if self.game in PRIZE_TIERS:
+            self.blue_masks = to_mask(table.blues)
+            self.tiers = tier_table(self.game, table.red_count, table.blues.shape[1])
+        else:
+            # 3D、排列3：三位数字编码成整数比较直选，排序后编码比较组选
+            ordered = np.sort(table.reds, axis=1)
+            self.group = self._encode(ordered)
+            # 开奖号码有两个相同为组选3，三个各不相同为组选6，三个相同（豹子）只有直选
+            self.group_tiers = np.where(ordered[:, 0] == ordered[:, 2], 0,
+                                        np.where(np.diff(ordered, axis=1).all(axis=1), 3, 2)).astype(np.uint8)
+
+    @classmethod
+    def load(cls, game, db_path=None):
+        """从保存的数据建立索引"""
+        return cls(DrawTable.load(game, db_path))
+
+    @staticmethod
+    def _encode(digits):
+        """三位数字编码成 0-999 的整数"""
+        digits = np.asarray(digits, dtype=np.int16)
+        return digits[..., 0] * 100 + digits[..., 1] * 10 + digits[..., 2]
+
+    def _match_chunk(self, reds, blues):
+        """一块号码对全部历史开奖，返回 (注数 × 期数) 的中球数和奖级"""
+        if self.game in PRIZE_TIERS:
+            red_hits = popcount(to_mask(reds)[:, None] & self.table.masks[None, :])
+            blue_hits = popcount(to_mask(blues)[:, None] & self.blue_masks[None, :])
+            codes = red_hits * np.uint8(self.tiers.shape[1]) + blue_hits
+            return red_hits, blue_hits, self.tiers.ravel().take(codes)
+
+        red_hits = (np.asarray(reds, dtype=np.uint8)[:, None, :] == self.table.reds[None, :, :]).sum(axis=2, dtype=np.uint8)
+        same_group = self._encode(np.sort(reds, axis=1))[:, None] == self.group[None, :]
+        tiers = np.where(red_hits == 3, 1, np.where(same_group, self.group_tiers[None, :], 0)).astype(np.uint8)
+        return red_hits, np.zeros_like(red_hits), tiers
+
+    def _run_chunks(self, reds, blues, work, workers):
+        """把号码按 CHUNK_TICKETS 分块，work(起始行, 前区, 后区) 在线程池里并行执行"""
+        reds = np.atleast_2d(np.asarray(reds, dtype=np.uint8))
+        blues = np.asarray(blues, dtype=np.uint8).reshape(len(reds), -1)
+        starts = range(0, len(reds), CHUNK_TICKETS)
+        tasks = [(i, reds[i:i + CHUNK_TICKETS], blues[i:i + CHUNK_TICKETS]) for i in starts]
+        if len(tasks) <= 1:
+            for task in tasks:
+                work(*task)
+        else:
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+                list(pool.map(lambda task: work(*task), tasks))
+        return len(reds)
+
+    def match(self, reds, blues=(), workers=None):
+        """批量对奖：reds 为 (注数 × 前区个数)，blues 为 (注数 × 后区个数)
+
+        返回 MatchResult，三个字段都是 (注数 × 期数) 的 uint8 矩阵，列的顺序与
+        self.table.periods 一致（期号从旧到新）。只需要每注的中奖次数时用
+        tier_summary，不必生成这么大的矩阵。
+        """
+        count = len(np.atleast_2d(reds)) if len(reds) else 0
+        result = MatchResult(*(np.empty((count, len(self.table)), dtype=np.uint8) for _ in range(3)))
+
+        def work(start, chunk_reds, chunk_blues):
+            for out, part in zip(result, self._match_chunk(chunk_reds, chunk_blues)):
+                out[start:start + len(part)] = part
+
+        if count:
+            self._run_chunks(reds, blues, work, workers)
+        return result
+
+    def tier_summary(self, reds, blues=(), workers=None):
+        """批量统计每注在各奖级上的历史中奖次数，返回 (注数 × 奖级数) 矩阵，第 0 列为未中奖次数
+
+        逐块计算后立即汇总，内存只与块大小有关，适合几万注的大批量查询。
+        """
+        levels = len(TIER_NAMES[self.game])
+        count = len(np.atleast_2d(reds)) if len(reds) else 0
+        summary = np.zeros((count, levels), dtype=np.int32)
+
+        def work(start, chunk_reds, chunk_blues):
+            tiers = self._match_chunk(chunk_reds, chunk_blues)[2]
+            summary[start:start + len(tiers)] = self.tier_counts(tiers)
+
+        if count:
+            self._run_chunks(reds, blues, work, workers)
+        return summary
+
+    def tier_counts(self, tiers):
+        """每注在各奖级上的中奖次数，返回 (注数 × 奖级数) 矩阵，第 0 列为未中奖次数"""
+        levels = len(TIER_NAMES[self.game])
+        offsets = np.arange(len(tiers))[:, None] * levels
+        return np.bincount((tiers + offsets).ravel(), minlength=len(tiers) * levels).reshape(len(tiers), levels)
+
+    def history(self, reds, blues=()):
+        """一注号码历史上的全部中奖记录 [(期号, 奖级名称), ...]，最新的在前"""
+        tiers = self.match([reds], [blues] if len(blues) else []).tiers[0]
+        won = np.nonzero(tiers)[0][::-1]
+        return [(int(self.table.periods[i]), TIER_NAMES[self.game][tiers[i]]) for i in won]
@@ -0,0 +1,185 @@
+"""抓取过程的分阶段计时和计数，每次运行结束后写出 JSON 运行报告和 Prometheus 文本文件
+
+各模块在关键位置用 phase() 计时、count() 计数，数据记在当前线程正在进行的那次
+运行上；没有正在进行的运行（例如在交互环境里单独调用某个函数）时什么都不记。
+脚本的 run_browser、run_http 用 @instrumented(彩种, 抓取方式) 装饰，每调用一次就是
+一次运行，结束时写出：
+
+    开奖数据.metrics.jsonl    每次运行追加一行 JSON 报告，用于长期跟踪性能变化
+    开奖数据.<彩种>.prom      该彩种最近一次运行的指标，供 node_exporter 的 textfile 采集
+
+阶段（秒）：chrome_start 启动浏览器、page_load 打开页面、probe 快速检查、query 按期号
+查询、page_flip 翻页、fetch 取页（含翻页和读取表格）、http_request 请求数据接口、
+capture 等待数据接口响应、parse 解析、checkpoint 写断点、save 写入数据库、excel_export 导出 Excel
+计数：pages_fetched、rows_parsed、rows_saved、webdriver_calls、http_requests、retries、
+stale_recoveries、bytes_received、bytes_written，以及浏览器资源过滤的 bytes_loaded、
+requests_blocked、bytes_saved，捕获接口响应的 payloads_captured、capture_misses
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+_local = threading.local()
+
+
+class RunMetrics:
+    """一次运行的各阶段用时和计数，可以被多个线程（预取、分片）同时记录"""
+
+    def __init__(self, game, backend):
+        self.game = game
+        self.backend = backend
+        self.started = time.time()
+        self.duration = None
+        self.status = None
+        self.phases = {}  # 阶段 -> [累计秒数, 次数]
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self, result):
+        """记录结束时间和结果（追加的条数，None 为失败）"""
+        self.duration = time.time() - self.started
+        self.status = "failed" if result is None else "ok"
+        self.count("rows_saved", result or 0)
+
+    def report(self):
+        """JSON 运行报告"""
+        return {
+            "game": self.game,
+            "backend": self.backend,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "duration": round(self.duration or 0.0, 3),
+            "status": self.status,
+            "phases": {name: {"seconds": round(seconds, 3), "calls": calls}
+                       for name, (seconds, calls) in sorted(self.phases.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def prometheus(self):
+        """Prometheus 文本格式"""
+        labels = f'game="{self.game}",backend="{self.backend}"'
+        lines = [
+            "# HELP lottery_run_duration_seconds Wall time of the last scraper run",
+            "# TYPE lottery_run_duration_seconds gauge",
+            f"lottery_run_duration_seconds{{{labels}}} {self.duration or 0.0:.3f}",
+            "# HELP lottery_run_success Whether the last scraper run succeeded",
+            "# TYPE lottery_run_success gauge",
+            f"lottery_run_success{{{labels}}} {1 if self.status == 'ok' else 0}",
+            "# HELP lottery_run_timestamp_seconds Start time of the last scraper run",
+            "# TYPE lottery_run_timestamp_seconds gauge",
+            f"lottery_run_timestamp_seconds{{{labels}}} {self.started:.0f}",
+            "# HELP lottery_phase_seconds Wall time spent in each phase of the last run",
+            "# TYPE lottery_phase_seconds gauge",
+        ]
+        lines += [f'lottery_phase_seconds{{{labels},phase="{name}"}} {seconds:.3f}'
+                  for name, (seconds, _) in sorted(self.phases.items())]
+        lines += [
+            "# HELP lottery_phase_calls Number of times each phase ran in the last run",
+            "# TYPE lottery_phase_calls gauge",
+        ]
+        lines += [f'lottery_phase_calls{{{labels},phase="{name}"}} {calls}'
+                  for name, (_, calls) in sorted(self.phases.items())]
+        lines += [
+            "# HELP lottery_run_count Counters of the last run (pages, rows, calls, retries, bytes)",
+            "# TYPE lottery_run_count gauge",
+        ]
+        lines += [f'lottery_run_count{{{labels},counter="{name}"}} {value}'
+                  for name, value in sorted(self.counters.items())]
+        return "\n".join(lines) + "\n"
+
+
+def current():
+    """当前线程正在记录的运行，没有时返回 None"""
+    return getattr(_local, "run", None)
+
+
+def bind(run):
+    """让当前线程的记录都记到 run 上（预取线程、分片线程启动时调用），返回原来的运行"""
+    previous = current()
+    _local.run = run
+    return previous
+
+
+@contextmanager
+def phase(name):
+    """计时一个阶段：with metrics.phase("page_load"): ..."""
+    run = current()
+    if run is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_time(name, time.perf_counter() - started)
+
+
+def count(name, n=1):
+    """计数加 n"""
+    run = current()
+    if run is not None:
+        run.count(name, n)
+
+
+def record_retry(error):
+    """记一次重试；页面元素失效（StaleElementReferenceException）导致的另记一次失效恢复"""
+    count("retries")
+    if type(error).__name__ == "StaleElementReferenceException":
+        count("stale_recoveries")
+
+
+def report_paths(game, db_path=None):
+    """(JSON 报告路径, Prometheus 文本文件路径)，与数据库放在一起"""
+    if db_path is None:
+        from lottery.store import DB_PATH as db_path
+    base = os.path.splitext(db_path)[0]
+    return f"{base}.metrics.jsonl", f"{base}.{game}.prom"
+
+
+def write_reports(run, db_path=None):
+    """追加 JSON 报告并原子地替换 Prometheus 文本文件；写不出来只提示，不影响抓取结果"""
+    report_path, prom_path = report_paths(run.game, db_path)
+    try:
+        with open(report_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run.report(), ensure_ascii=False) + "\n")
+        tmp_path = prom_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(run.prometheus())
+        os.replace(tmp_path, prom_path)
+    except OSError as e:
+        print(f"写入运行指标失败: {e}")
+
+
+def instrumented(game, backend):
+    """装饰脚本的 run_browser / run_http：每次调用记录为一次运行，结束后写出报告"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = RunMetrics(game, backend)
+            previous = bind(run)
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            finally:
+                bind(previous)
+                run.finish(result)
+                write_reports(run)
+                phases = ", ".join(f"{name} {seconds:.1f}s" for name, (seconds, _) in
+                                   sorted(run.phases.items(), key=lambda item: -item[1][0])[:5])
+                print(f"运行用时 {run.duration:.1f} 秒{'：' + phases if phases else ''}")
+        return wrapper
+    return decorator
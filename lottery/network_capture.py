@@ -0,0 +1,151 @@
+"""从浏览器的网络日志里直接取开奖数据接口的响应，不再等表格渲染、也不再遍历 DOM
+
+体彩网翻页（kjCommonFun.goNextPage）和中彩网按期号查询都是页面脚本先请求数据
+接口、再用返回的 JSON/JSONP 渲染表格，所以每一页的数据在渲染之前就已经以结构化
+的形式经过了网络。这里从 Chrome 的性能日志（create_driver 已打开）里找到数据接口
+的响应，用 Network.getResponseBody 取出响应体，交给 http_backend 按接口格式解析。
+
+取页时先调用 wait_payload()，超时没看到响应才退回到等待表格渲染、解析 DOM 的老办法；
+同一个浏览器连续 MAX_MISSES 次没捕获到就不再等待，直接解析 DOM。
+"""
+import base64
+import json
+import time
+from urllib.parse import urlsplit
+
+from lottery import http_backend, metrics
+from lottery.games import API_URLS, GAMES
+
+# 为 False 时始终解析渲染后的表格
+ENABLED = True
+
+# 连续几次没捕获到接口响应后，这个浏览器不再尝试捕获
+MAX_MISSES = 2
+
+
+class NetworkLog:
+    """一个浏览器的性能日志：读出的事件既用于统计下载量，也用于找数据接口的响应"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.events = []  # 还没被 take_events 取走的网络事件
+        self.responses = {}  # requestId -> [url, 是否已下载完]，按收到响应的先后排列
+        self.misses = 0
+
+    def poll(self):
+        """读出并清空 Chrome 的性能日志，读不到时返回 False"""
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            return False
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            self.events.append(message)
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.responseReceived":
+                self.responses[params.get("requestId")] = [params.get("response", {}).get("url", ""), False]
+            elif method == "Network.loadingFinished" and params.get("requestId") in self.responses:
+                self.responses[params["requestId"]][1] = True
+            elif method == "Network.loadingFailed":
+                self.responses.pop(params.get("requestId"), None)
+        return True
+
+    def take_events(self):
+        """取走目前为止的全部网络事件"""
+        self.poll()
+        events, self.events = self.events, []
+        return events
+
+    def take_response(self, path, keep=False):
+        """取走地址路径为 path 的最近一个已下载完的响应的 requestId，较早的同类响应一并丢弃；keep 为 True 时只查看不取走"""
+        matched = [request_id for request_id, (url, finished) in self.responses.items()
+                   if finished and urlsplit(url).path == path]
+        if keep:
+            return matched[-1] if matched else None
+        for request_id in matched:
+            del self.responses[request_id]
+        return matched[-1] if matched else None
+
+    def discard_responses(self):
+        """丢弃已收到的全部响应，之后只认新发出的请求"""
+        self.poll()
+        self.responses = {}
+
+
+def network_log(driver):
+    """driver 对应的 NetworkLog，第一次用时创建"""
+    log = getattr(driver, "network_log", None)
+    if log is None:
+        log = driver.network_log = NetworkLog(driver)
+    return log
+
+
+def active(driver):
+    """这个浏览器是否还在捕获接口响应"""
+    return ENABLED and network_log(driver).misses < MAX_MISSES
+
+
+def expect_response(driver):
+    """翻页、查询之前调用：丢弃之前的响应，保证接下来取到的是这次操作的结果"""
+    if active(driver):
+        network_log(driver).discard_responses()
+
+
+def response_body(driver, request_id):
+    """取出响应体文本，取不到（已被浏览器释放、不在当前标签页等）时返回 None"""
+    try:
+        body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+    except Exception:
+        return None
+    if body.get("base64Encoded"):
+        return base64.b64decode(body["body"]).decode("utf-8", errors="replace")
+    return body.get("body")
+
+
+def wait_payload(driver, game, timeout=10, interval=0.2, keep=False):
+    """等待当前页的数据接口响应并解析成 JSON，超时或不在捕获时返回 None（调用方改为解析 DOM）
+
+    keep 为 True 时只查看（例如读总页数），响应留给之后取页时再用
+    """
+    if not active(driver):
+        return None
+    log = network_log(driver)
+    path = urlsplit(API_URLS[GAMES[game]["api"]]).path
+    deadline = time.monotonic() + timeout
+    with metrics.phase("capture"):
+        while log.poll():
+            request_id = log.take_response(path, keep)
+            if request_id is not None:
+                text = response_body(driver, request_id)
+                try:
+                    payload = http_backend.load_json(text) if text else None
+                except ValueError:
+                    payload = None
+                if isinstance(payload, dict):
+                    log.misses = 0
+                    if not keep:
+                        metrics.count("payloads_captured")
+                    return payload
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(interval)
+    log.misses += 1
+    metrics.count("capture_misses")
+    print("没有捕获到数据接口的响应，改为解析页面表格")
+    return None
+
+
+def payload_min_period(game, payload):
+    """接口响应里最早的期号，没有记录时返回 None"""
+    rows, _ = http_backend.parse_payload(game, payload)
+    return min((int(row[0]) for row in rows), default=None)
+
+
+def parse_page(game, raw, parse_rows, *args):
+    """流水线的解析端：捕获到的接口响应按接口格式解析，表格行交给 parse_rows(raw, *args)"""
+    if isinstance(raw, dict):
+        return http_backend.parse_payload(game, raw)[0]
+    return parse_rows(raw, *args)
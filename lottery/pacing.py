@@ -0,0 +1,122 @@
+"""按站点控制访问节奏：令牌桶限速，响应正常时逐步提速，超时或出错时退避
+
+取代脚本里固定的 time.sleep(随机秒数)。页面是否就绪由 WebDriverWait 等待真实
+信号（旧表格失效、分页激活标记出现）判断，这里只负责对站点的礼貌间隔。
+同一进程内同一站点共用一个令牌桶，并发的彩种和回填分片也受同一限速约束。
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+from lottery import metrics
+
+# 本地回放服务器不限速
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+
+class HostPacer:
+    """单个站点的令牌桶，rate 为每秒允许的请求数"""
+
+    def __init__(self, rate=0.5, min_rate=0.1, max_rate=2.0, burst=2, step=0.05):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.step = step
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self):
+        """取得一个令牌，必要时阻塞等待"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def success(self):
+        """响应正常，缓慢提速"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def failure(self):
+        """超时或出错，速率减半并清空令牌"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+        print(f"访问节奏已放慢到每秒 {self.rate:.2f} 次")
+
+
+class UnlimitedPacer:
+    """不限速，用于本地回放服务器"""
+
+    def wait(self):
+        pass
+
+    def success(self):
+        pass
+
+    def failure(self):
+        pass
+
+
+_pacers = {}
+_pacers_lock = threading.Lock()
+
+
+def pacer_for(url_or_host):
+    """返回站点对应的共享限速器，参数可以是网址或主机名"""
+    host = urlsplit(url_or_host).hostname if "//" in url_or_host else url_or_host.split(":")[0]
+    with _pacers_lock:
+        if host not in _pacers:
+            _pacers[host] = UnlimitedPacer() if host in LOCAL_HOSTS else HostPacer()
+        return _pacers[host]
+
+
+def wait_until(driver, pacer, condition, timeout=10):
+    """等待页面就绪信号，并把结果反馈给限速器；超时照常抛出 TimeoutException"""
+    # selenium 只在真正操作浏览器时才导入，HTTP 后端和快速检查用不到
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    try:
+        result = WebDriverWait(driver, timeout).until(condition)
+    except TimeoutException:
+        pacer.failure()
+        raise
+    pacer.success()
+    return result
+
+
+def click_when_ready(driver, pacer, locator, timeout=10, attempts=3, skip_disabled=False):
+    """等元素可以点击后按站点节奏点击；点击前页面恰好重新渲染、元素失效时重新查找再点，记一次失效恢复
+
+    skip_disabled 为 True 时元素带 disabled 样式就不点击，返回 False；找不到元素时照常抛出 TimeoutException
+    """
+    from selenium.common.exceptions import StaleElementReferenceException
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    for attempt in range(attempts):
+        try:
+            element = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(locator))
+            if skip_disabled and "disabled" in (element.get_attribute("class") or ""):
+                return False
+            pacer.wait()
+            element.click()
+            return True
+        except StaleElementReferenceException as e:
+            if attempt == attempts - 1:
+                raise
+            metrics.record_retry(e)
+            print("元素已失效，重新查找")
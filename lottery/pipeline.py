@@ -0,0 +1,163 @@
+"""流式抓取流水线：取页 → 解析 → 校验去重 → 写入
+
+    pages = iter_pages(...)                  # 取页生成器，逐页返回 (翻页位置, 原始内容)
+    pages = prefetch(pages)                  # 后台线程提前取下一页，缓冲区有上限
+    rows = parse_pages(pages, parse)         # 逐页解析成 data 行
+    rows = validate(rows, game, start, end)  # 校验号码格式和期号范围，去掉重复的期号
+    drain(rows, [progress, PageCounter()])   # 交给各个写入端（断点、进度统计）
+
+每一步都是生成器，任何时候内存里只有正在处理的一两页。两个站点都是按期号从新到旧
+分页的，所以去重只需记住上一条的期号。全部抓完后再由 Checkpoint.iter_batches 从断点
+文件里按期号从旧到新分批读出，交给 store.save_batches 写入数据库。
+"""
+import queue
+import threading
+import time
+
+from lottery import metrics
+from lottery.games import GAMES
+
+_DONE = object()
+
+
+def prefetch(pages, depth=1):
+    """在后台线程里运行取页生成器，最多提前取好 depth 页
+
+    当前页在解析、写入的同时，下一页已经在加载。消费端提前结束时通知后台线程
+    停止并等它退出，保证浏览器不会同时被两个线程操作。
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    run = metrics.current()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        metrics.bind(run)
+        try:
+            for page in pages:
+                if not put((page, None)):
+                    return
+        except Exception as e:
+            put((_DONE, e))
+        else:
+            put((_DONE, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            page, error = buffer.get()
+            if page is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield page
+    finally:
+        stop.set()
+        thread.join()
+        close = getattr(pages, "close", None)
+        if close:
+            close()
+
+
+def timed_pages(pages):
+    """统计取页生成器每一页的用时（翻页、读取表格或请求接口）"""
+    pages = iter(pages)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            run = metrics.current()
+            if run is not None:
+                run.add_time("fetch", time.perf_counter() - started)
+            yield page
+    finally:
+        close = getattr(pages, "close", None)
+        if close:
+            close()
+
+
+def parse_pages(pages, parse):
+    """逐页把原始内容解析成 data 行，返回 (翻页位置, data 行)"""
+    for cursor, raw in pages:
+        with metrics.phase("parse"):
+            rows = parse(raw)
+        metrics.count("rows_parsed", len(rows))
+        yield cursor, rows
+
+
+def valid_row(game, row):
+    """号码个数和格式是否正确"""
+    info = GAMES[game]
+    width = 1 + info["red_count"] + (1 + info["blue_count"] if info["blue_count"] else 0)
+    if len(row) != width or not str(row[0]).isdigit():
+        return False
+    return all(str(n).isdigit() for i, n in enumerate(row[1:], 1) if i != info["red_count"] + 1)
+
+
+def validate(pages, game, start_period, end_period, below=None):
+    """去掉格式不对、超出 [start_period, end_period] 或重复的行
+
+    数据按期号从新到旧到达，只保留比上一条更早的期号；below 为断点里已有的
+    最早一期，续抓时比它新的行都已经抓过。
+    """
+    last_period = below
+    for cursor, rows in pages:
+        kept = []
+        for row in rows:
+            if not valid_row(game, row):
+                print(f"跳过格式不正确的行: {row}")
+                continue
+            period = int(row[0])
+            if period < start_period or period > end_period:
+                continue
+            if last_period is not None and period >= last_period:
+                continue
+            last_period = period
+            kept.append(row)
+        yield cursor, kept
+
+
+class PageCounter:
+    """进度统计写入端：记录页数和条数并打印进度"""
+
+    def __init__(self):
+        self.pages = 0
+        self.rows = 0
+
+    def write(self, cursor, rows):
+        self.pages += 1
+        self.rows += len(rows)
+        print(f"第 {cursor} 页获取 {len(rows)} 条记录，本次累计 {self.rows} 条")
+
+
+def drain(pages, sinks):
+    """把每一页依次交给全部写入端（带 write(翻页位置, data 行) 方法），返回写入的条数"""
+    count = 0
+    for cursor, rows in pages:
+        with metrics.phase("checkpoint"):
+            for sink in sinks:
+                sink.write(cursor, rows)
+        metrics.count("pages_fetched")
+        count += len(rows)
+    return count
+
+
+def run(game, pages, parse, start_period, end_period, progress, depth=1):
+    """组装整条流水线并运行到底，每页写入断点 progress，返回本次新抓到的条数"""
+    stream = timed_pages(pages)
+    stream = prefetch(stream, depth) if depth else stream
+    stream = parse_pages(stream, parse)
+    stream = validate(stream, game, start_period, end_period, progress.oldest_period)
+    return drain(stream, [progress, PageCounter()])
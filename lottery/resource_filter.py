@@ -0,0 +1,120 @@
+"""浏览器资源过滤：按站点用 CDP 拦截图片、字体、样式表和第三方统计脚本，只加载抓取用得到的部分
+
+开奖页面里真正需要的只有文档本身、体彩网的开奖列表 iframe，以及驱动翻页和渲染
+开奖表格的脚本（jQuery、站点自己的 kjCommonFun 等）和它们请求的数据接口。其余
+资源按各站点的 RESOURCE_PROFILES 用 Network.setBlockedURLs 拦截，在每个标签页
+打开页面之前调用 apply()。
+
+每加载或翻完一页，record_page() 从 Chrome 的性能日志里统计这一页实际下载的字节数
+和被拦截的请求数，并与该站点完整页面的基线比较，报告省下的字节数。基线在关闭
+过滤（脚本加 --no-block）运行时自动记录到数据库旁边的 开奖数据.resources.json。
+"""
+import json
+import os
+import threading
+
+from lottery import metrics
+from lottery.network_capture import network_log
+from lottery.store import DB_PATH
+
+# 为 False 时不拦截任何资源，各页的下载量记为完整页面的基线
+ENABLED = True
+
+# 两个站点都要拦截的资源：图片、字体、样式表、音视频和常见的统计、广告脚本
+COMMON_BLOCKED = (
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.bmp*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.css*",
+    "*.mp4*", "*.flv*", "*.mp3*",
+    "*hm.baidu.com*", "*cnzz.com*", "*51.la*", "*growingio.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+)
+
+# 站点 -> 额外拦截的 URL 模式（通配符 *），站点名与 GAMES 的 api 一致
+RESOURCE_PROFILES = {
+    # 中彩网：开奖表格和分页都由本站的 jQuery 脚本请求 jc.zhcw.com 接口后渲染
+    "zhcw": COMMON_BLOCKED + ("*share.baidu.com*", "*bdimg.share.baidu.com*"),
+    # 体彩网：开奖列表在 iframe 里，翻页脚本 kjCommonFun 和接口请求都来自本站和 sporttery.cn
+    "sporttery": COMMON_BLOCKED + ("*zz.bdstatic.com*", "*push.zhanzhang.baidu.com*"),
+}
+
+_baseline_lock = threading.Lock()
+
+
+def baseline_path(db_path=DB_PATH):
+    """各站点完整页面基线的保存路径，与数据库放在一起"""
+    return f"{os.path.splitext(db_path)[0]}.resources.json"
+
+
+def load_baseline(db_path=DB_PATH):
+    """{站点: {"load"/"flip": [平均字节数, 页数]}}，没有记录过时返回空字典"""
+    try:
+        with open(baseline_path(db_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_baseline(site, kind, loaded, db_path=DB_PATH):
+    """把一页完整页面的下载量计入基线（累计平均），返回新的平均值"""
+    with _baseline_lock:
+        baseline = load_baseline(db_path)
+        average, pages = baseline.setdefault(site, {}).get(kind, [0, 0])
+        average = (average * pages + loaded) / (pages + 1)
+        baseline[site][kind] = [round(average), pages + 1]
+        path = baseline_path(db_path)
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(baseline, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"保存资源基线失败: {e}")
+        return average
+
+
+def apply(driver, site):
+    """在当前标签页按站点拦截资源；关闭过滤时清空拦截列表。要在打开页面之前调用"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(RESOURCE_PROFILES[site]) if ENABLED else []})
+    except Exception as e:
+        print(f"设置资源拦截失败，照常加载完整页面: {e}")
+    network_usage(driver)  # 丢掉打开页面之前的事件，下一次统计只算这个站点的页面
+
+
+def network_usage(driver):
+    """取走性能日志里的网络事件，返回 (下载字节数, 完成的请求数, 被拦截的请求数)；读不到日志时返回 None"""
+    log = network_log(driver)
+    if not log.poll():
+        return None
+    loaded = requests = blocked = 0
+    for message in log.take_events():
+        params = message.get("params", {})
+        if message.get("method") == "Network.loadingFinished":
+            loaded += int(params.get("encodedDataLength") or 0)
+            requests += 1
+        elif message.get("method") == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked += 1
+    return loaded, requests, blocked
+
+
+def record_page(driver, site, kind):
+    """统计刚加载（kind="load"）或刚翻完（kind="flip"）的一页的下载量，报告比完整页面省下的字节数"""
+    usage = network_usage(driver)
+    if usage is None:
+        return
+    loaded, requests, blocked = usage
+    metrics.count("bytes_loaded", loaded)
+    metrics.count("requests_blocked", blocked)
+    if not ENABLED:
+        update_baseline(site, kind, loaded)
+        print(f"本页下载 {loaded / 1024:.1f} KB（{requests} 个请求），已计入完整页面基线")
+        return
+
+    message = f"本页下载 {loaded / 1024:.1f} KB，拦截 {blocked} 个请求"
+    average = load_baseline().get(site, {}).get(kind, [None])[0]
+    if average:
+        saved = max(0, average - loaded)
+        metrics.count("bytes_saved", saved)
+        message += f"，比完整页面少 {saved / 1024:.1f} KB"
+    print(message)
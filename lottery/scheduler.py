@@ -0,0 +1,191 @@
+"""常驻调度：按各彩种的开奖日程，只在开奖后的公布窗口内轮询，查到新一期就抓取保存
+
+    python -m lottery.scheduler                       # 全部彩种，浏览器方式
+    python -m lottery.scheduler ssq dlt --backend http
+
+开奖日（双色球周二、四、日，大乐透周一、三、六，3D、排列3 每天，见 GAMES 的
+draw_days、draw_time）开奖 PUBLISH_DELAY 分钟后进入公布窗口。窗口内用数据接口
+查询最新期号（一次只取一条），间隔从 POLL_MIN 秒逐步放宽到 POLL_MAX 秒，查到
+新一期就只抓取新增的期号并保存，然后休眠到下一个窗口；窗口外不发任何请求。
+
+浏览器在第一次需要抓取时启动，之后各次抓取一直复用（出错时关闭，下次重新
+启动）；查询用的 HTTP 连接也一直保持。启动时先对每个彩种查一次，补上停机
+期间错过的开奖。
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from lottery import http_backend, store
+from lottery.browser_session import BrowserSession
+from lottery.games import GAMES, load_script
+
+BEIJING = timezone(timedelta(hours=8))
+
+# 开奖后多久开始查询、最多查询多久（分钟）
+PUBLISH_DELAY = 5
+PUBLISH_WINDOW = 180
+
+# 窗口内的查询间隔（秒）：从 POLL_MIN 起每次放宽 POLL_BACKOFF 倍，不超过 POLL_MAX，
+# 保证结果公布后一分钟内能查到；查询或抓取出错时按 ERROR_MAX 封顶翻倍
+POLL_MIN = 15
+POLL_MAX = 60
+POLL_BACKOFF = 1.5
+ERROR_MAX = 300
+
+# 窗口外单次最长休眠（秒），防止系统休眠或调整时间后错过窗口
+MAX_SLEEP = 600
+
+
+def publish_window(game, day):
+    """某一天（date）的公布窗口 (开始, 结束)，不是开奖日时返回 None"""
+    info = GAMES[game]
+    if day.weekday() not in info["draw_days"]:
+        return None
+    hour, minute = map(int, info["draw_time"].split(":"))
+    start = datetime(day.year, day.month, day.day, hour, minute, tzinfo=BEIJING) + timedelta(minutes=PUBLISH_DELAY)
+    return start, start + timedelta(minutes=PUBLISH_WINDOW)
+
+
+def next_window(game, now):
+    """now 所在的或之后第一个公布窗口"""
+    day = now.astimezone(BEIJING).date()
+    for offset in range(8):
+        window = publish_window(game, day + timedelta(days=offset))
+        if window and window[1] > now:
+            return window
+    raise ValueError(f"{GAMES[game]['name']}没有开奖日")
+
+
+class GameSchedule:
+    """一个彩种的轮询状态：下次查询时间和当前的查询间隔"""
+
+    def __init__(self, game, now):
+        self.game = game
+        self.next_poll = now  # 启动时立即查一次，补上停机期间错过的开奖
+        self.interval = POLL_MIN
+        self.error_interval = POLL_MIN
+        self.catching_up = True
+
+    def found(self, now):
+        """抓到了新数据：这个窗口的开奖已经到手，休眠到下一个窗口"""
+        window = next_window(self.game, now)
+        if not self.catching_up and window[0] <= now:
+            window = next_window(self.game, window[1])
+        self._schedule(now, window)
+
+    def not_found(self, now):
+        """还没有新数据：窗口内按退避间隔再查，窗口外休眠到下一个窗口"""
+        self._schedule(now, next_window(self.game, now))
+
+    def failed(self, now):
+        """查询或抓取出错，间隔翻倍后重试"""
+        self.next_poll = now + timedelta(seconds=self.error_interval)
+        self.error_interval = min(ERROR_MAX, self.error_interval * 2)
+
+    def _schedule(self, now, window):
+        self.catching_up = False
+        self.error_interval = POLL_MIN
+        if now < window[0]:
+            self.next_poll = window[0]
+            self.interval = POLL_MIN
+        else:
+            self.next_poll = now + timedelta(seconds=self.interval)
+            self.interval = min(POLL_MAX, self.interval * POLL_BACKOFF)
+
+
+class Scheduler:
+    """常驻进程：各彩种共用一个浏览器会话（或 HTTP 抓取）和一个查询用的 HTTP 会话"""
+
+    def __init__(self, games, backend="browser", headless=True, base_url=None):
+        self.games = games
+        self.backend = backend
+        self.base_url = base_url
+        self.browser = BrowserSession(headless=headless) if backend == "browser" else None
+        self.http = http_backend.create_session(base_url)
+        self.scripts = {}
+        now = datetime.now(BEIJING)
+        self.states = {game: GameSchedule(game, now) for game in games}
+
+    def fetch(self, game):
+        """抓取并保存新数据，返回追加的记录数，出错时返回 None"""
+        if game not in self.scripts:
+            self.scripts[game] = load_script(game)
+        script = self.scripts[game]
+        if self.browser is None:
+            return script.run_http(session=self.http)
+        count = script.run_browser(self.browser, probe=False)
+        if count is None:
+            # 浏览器可能已经失去响应，关掉后下次抓取时重新启动
+            self.browser.quit()
+        return count
+
+    def poll(self, game):
+        """查询一次最新期号，有新开奖就抓取"""
+        state = self.states[game]
+        name = GAMES[game]["name"]
+        has_new = http_backend.probe_new_draws(game, session=self.http, verbose=False)
+        if has_new is None:
+            state.failed(datetime.now(BEIJING))
+            return
+        if not has_new:
+            state.not_found(datetime.now(BEIJING))
+            return
+
+        print(f"===== {name}有新开奖，开始抓取 =====")
+        try:
+            count = self.fetch(game)
+        except Exception as e:
+            # 启动浏览器、打开标签页或读取出错页面时的异常不能让常驻进程退出
+            print(f"{name}抓取出错: {e}")
+            count = None
+            if self.browser is not None:
+                self.browser.quit()
+        if count is None:
+            print(f"❌ {name}抓取失败")
+            state.failed(datetime.now(BEIJING))
+        else:
+            print(f"✅ {name}追加 {count} 条记录")
+            state.found(datetime.now(BEIJING))
+
+    def run_once(self):
+        """查询所有到期的彩种，返回距离下一次查询的秒数"""
+        now = datetime.now(BEIJING)
+        for game, state in self.states.items():
+            if state.next_poll <= now:
+                self.poll(game)
+        game, state = min(self.states.items(), key=lambda item: item[1].next_poll)
+        delay = (state.next_poll - datetime.now(BEIJING)).total_seconds()
+        if delay > POLL_MAX:
+            print(f"下次查询：{GAMES[game]['name']} {state.next_poll:%m-%d %H:%M:%S}")
+        return max(0.0, delay)
+
+    def run(self):
+        """一直运行，直到 Ctrl+C"""
+        print(f"调度已启动：{', '.join(GAMES[game]['name'] for game in self.games)}")
+        try:
+            while True:
+                time.sleep(min(self.run_once(), MAX_SLEEP))
+        except KeyboardInterrupt:
+            print("调度已停止")
+        finally:
+            if self.browser is not None:
+                self.browser.quit()
+            self.http.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按开奖日程常驻运行，开奖结果公布后自动抓取")
+    parser.add_argument("games", nargs="*", metavar="game", help=f"彩种（{', '.join(GAMES)}），默认全部")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser",
+                        help="抓取方式：browser 用浏览器，http 直接请求数据接口")
+    parser.add_argument("--show-browser", action="store_true", help="显示浏览器窗口（默认无头模式）")
+    parser.add_argument("--base-url", help="数据接口地址，指向本地回放服务器时可离线运行")
+    parser.add_argument("--export", action="store_true", help="每次抓到新数据保存后从数据库重新导出 Excel")
+    args = parser.parse_args()
+    store.EXPORT_EXCEL = args.export
+    unknown = [game for game in args.games if game not in GAMES]
+    if unknown:
+        parser.error(f"未知的彩种: {', '.join(unknown)}")
+
+    Scheduler(args.games or list(GAMES), args.backend, not args.show_browser, args.base_url).run()
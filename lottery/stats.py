@@ -0,0 +1,221 @@
+"""号码统计：出现次数、近期次数（冷热号）、当前遗漏和最大遗漏
+
+双色球分红球、蓝球，大乐透分前区、后区，3D 和排列3 既按号码统计（任一位置
+出现即算），也按百位、十位、个位分别统计。全部用 NumPy 按号码列向量化计算。
+
+统计状态保存在数据库旁边的 开奖数据.<彩种>.stats.npz 里。每次保存新数据时只把
+新的几期累加进去（出现次数相加、最近出现位置取最大、最大遗漏取最大），不必
+重新扫描整个历史；发现期号不连续或记录数对不上时才从数据库重新计算。
+
+    from lottery.stats import GameStats
+    stats = GameStats.load("ssq")
+    stats.frame("红球")          # 每个号码的出现次数、近 30 期次数、当前遗漏、最大遗漏
+"""
+import os
+
+import numpy as np
+
+from lottery.drawtable import DrawTable
+
+# 每个彩种的统计区：(名称, 号码矩阵中的列, 最小号码, 最大号码)
+ZONES = {
+    "ssq": [("红球", [0, 1, 2, 3, 4, 5], 1, 33), ("蓝球", [6], 1, 16)],
+    "dlt": [("前区", [0, 1, 2, 3, 4], 1, 35), ("后区", [5, 6], 1, 12)],
+    "3d": [("号码", [0, 1, 2], 0, 9), ("百位", [0], 0, 9), ("十位", [1], 0, 9), ("个位", [2], 0, 9)],
+    "pl3": [("号码", [0, 1, 2], 0, 9), ("百位", [0], 0, 9), ("十位", [1], 0, 9), ("个位", [2], 0, 9)],
+}
+
+# 保留最近多少期的命中矩阵，用于计算近期次数
+RECENT_DRAWS = 100
+
+# 默认的近期窗口
+DEFAULT_WINDOW = 30
+
+
+def hit_matrix(numbers, columns, low, high):
+    """命中矩阵：第 i 期开出号码 low + j 时 hits[i, j] 为 True"""
+    hits = np.zeros((len(numbers), high - low + 1), dtype=bool)
+    rows = np.repeat(np.arange(len(numbers)), len(columns))
+    hits[rows, numbers[:, columns].ravel().astype(np.intp) - low] = True
+    return hits
+
+
+def rolling_frequency(table, zone, window=DEFAULT_WINDOW):
+    """整个历史上每个号码的滑动窗口出现次数，第 i 行是截至第 window + i 期的近 window 期次数"""
+    _, columns, low, high = next(z for z in ZONES[table.game] if z[0] == zone)
+    hits = hit_matrix(table.numbers, columns, low, high)
+    totals = np.concatenate([np.zeros((1, hits.shape[1]), dtype=np.int32), np.cumsum(hits, axis=0, dtype=np.int32)])
+    return totals[window:] - totals[:-window]
+
+
+class ZoneStats:
+    """一个统计区的累计状态"""
+
+    def __init__(self, name, columns, low, high):
+        self.name = name
+        self.columns = columns
+        self.low = low
+        self.high = high
+        size = high - low + 1
+        self.draws = 0
+        self.counts = np.zeros(size, dtype=np.int32)
+        self.last_hit = np.full(size, -1, dtype=np.int32)      # 最近一次开出的期序号，从未开出为 -1
+        self.max_omission = np.zeros(size, dtype=np.int32)
+        self.recent = np.zeros((0, size), dtype=bool)
+
+    @property
+    def numbers(self):
+        """本区的全部号码"""
+        return np.arange(self.low, self.high + 1)
+
+    @property
+    def current_omission(self):
+        """当前遗漏：距最近一次开出已过去的期数"""
+        return self.draws - 1 - self.last_hit
+
+    def add(self, numbers):
+        """累加新的若干期（号码矩阵，按期号从旧到新）"""
+        if not len(numbers):
+            return
+        hits = hit_matrix(numbers, self.columns, self.low, self.high)
+        index = np.arange(self.draws, self.draws + len(hits), dtype=np.int32)[:, None]
+
+        # 每一期之后各号码最近一次开出的位置，与之前的状态接续
+        last = np.maximum.accumulate(np.where(hits, index, -1), axis=0)
+        last = np.maximum(last, self.last_hit)
+        self.max_omission = np.maximum(self.max_omission, (index - last).max(axis=0))
+
+        self.counts += hits.sum(axis=0, dtype=np.int32)
+        self.last_hit = last[-1]
+        self.draws += len(hits)
+        self.recent = np.concatenate([self.recent, hits])[-RECENT_DRAWS:]
+
+    def window_counts(self, window=DEFAULT_WINDOW):
+        """近 window 期（不超过 RECENT_DRAWS）各号码的出现次数"""
+        return self.recent[-window:].sum(axis=0, dtype=np.int32)
+
+    def frame(self, window=DEFAULT_WINDOW):
+        """汇总成 DataFrame，每行一个号码"""
+        import pandas as pd
+
+        return pd.DataFrame({
+            "号码": self.numbers,
+            "出现次数": self.counts,
+            f"近{window}期次数": self.window_counts(window),
+            "当前遗漏": self.current_omission,
+            "最大遗漏": self.max_omission,
+        })
+
+
+class GameStats:
+    """一个彩种全部统计区的累计状态"""
+
+    def __init__(self, game):
+        self.game = game
+        self.last_period = None
+        self.zones = {name: ZoneStats(name, columns, low, high) for name, columns, low, high in ZONES[game]}
+
+    @property
+    def draws(self):
+        """已统计的期数"""
+        return next(iter(self.zones.values())).draws
+
+    @classmethod
+    def from_table(cls, table):
+        """由 DrawTable 全量计算"""
+        stats = cls(table.game)
+        stats.add(table)
+        return stats
+
+    def add(self, table):
+        """累加比 last_period 更新的几期"""
+        if not len(table):
+            return
+        if self.last_period is not None and table.periods[0] <= self.last_period:
+            raise ValueError(f"期号 {table.periods[0]} 不晚于已统计的 {self.last_period}")
+        for zone in self.zones.values():
+            zone.add(table.numbers)
+        self.last_period = int(table.periods[-1])
+
+    def frame(self, zone, window=DEFAULT_WINDOW):
+        """某个统计区的汇总表"""
+        return self.zones[zone].frame(window)
+
+    def hot_cold(self, zone, window=DEFAULT_WINDOW, count=5):
+        """近 window 期出现最多的 count 个热号和最少的 count 个冷号"""
+        df = self.frame(zone, window).sort_values([f"近{window}期次数", "当前遗漏"], ascending=[False, True])
+        return df["号码"].head(count).tolist(), df["号码"].tail(count).tolist()[::-1]
+
+    def write(self, path):
+        """保存为 npz（先写临时文件再替换）"""
+        arrays = {"last_period": np.array(-1 if self.last_period is None else self.last_period)}
+        for i, zone in enumerate(self.zones.values()):
+            arrays[f"draws_{i}"] = np.array(zone.draws)
+            arrays[f"counts_{i}"] = zone.counts
+            arrays[f"last_hit_{i}"] = zone.last_hit
+            arrays[f"max_omission_{i}"] = zone.max_omission
+            arrays[f"recent_{i}"] = zone.recent
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, game, path):
+        """读取 npz，文件缺失或损坏时返回 None"""
+        try:
+            with np.load(path) as arrays:
+                stats = cls(game)
+                last_period = int(arrays["last_period"])
+                stats.last_period = None if last_period < 0 else last_period
+                for i, zone in enumerate(stats.zones.values()):
+                    zone.draws = int(arrays[f"draws_{i}"])
+                    zone.counts = arrays[f"counts_{i}"]
+                    zone.last_hit = arrays[f"last_hit_{i}"]
+                    zone.max_omission = arrays[f"max_omission_{i}"]
+                    zone.recent = arrays[f"recent_{i}"]
+                    if len(zone.counts) != zone.high - zone.low + 1:
+                        return None
+        except (OSError, KeyError, ValueError):
+            return None
+        return stats
+
+    @classmethod
+    def load(cls, game, db_path=None):
+        """脚本和看板用：读取保存的统计，没有时从数据库计算并保存"""
+        from lottery import store
+
+        db_path = db_path or store.DB_PATH
+        stats = cls.read(game, stats_path(db_path, game))
+        if stats is None:
+            conn = store.connect(db_path)
+            try:
+                stats = rebuild(conn, game)
+            finally:
+                conn.close()
+        return stats
+
+
+def stats_path(db_path, game):
+    """统计文件路径，与数据库放在一起，如 开奖数据.ssq.stats.npz"""
+    return f"{os.path.splitext(db_path)[0]}.{game}.stats.npz"
+
+
+def rebuild(conn, game):
+    """从数据库重新计算并保存该彩种的统计"""
+    stats = GameStats.from_table(DrawTable.from_db(conn, game))
+    stats.write(stats_path(conn.db_path, game))
+    return stats
+
+
+def update(conn, game, data):
+    """保存新数据后调用：新的几期都晚于已统计的期号时增量累加，否则从数据库重算"""
+    path = stats_path(conn.db_path, game)
+    stats = GameStats.read(game, path)
+    new_table = DrawTable.from_rows(game, data)
+    row_count = conn.execute("SELECT COUNT(*) FROM draws WHERE game = ?", (game,)).fetchone()[0]
+    if stats is not None and len(new_table) and stats.draws + len(new_table) == row_count and \
+            (stats.last_period is None or new_table.periods[0] > stats.last_period):
+        stats.add(new_table)
+        stats.write(path)
+        return stats
+    return rebuild(conn, game)
@@ -0,0 +1,315 @@
+"""开奖数据的主存储：SQLite 数据库，按 (彩种, 期号) 建主键
+
+每次保存只在一个事务里 upsert 新抓到的几行，不再读取并重写整个 Excel。
+Excel 文件改为从数据库导出：导出要读出整个历史，不随每次保存进行，需要时运行
+python -m lottery.store export，或给抓取脚本加 --export 在保存后导出一次。
+数据库为空而旧的 Excel 存在时，会先把 Excel 导入数据库，之后就以数据库为准。
+续抓起点由 lottery.manifest 维护的水位清单给出，不必扫描整个历史。
+"""
+import argparse
+import os
+import sqlite3
+
+from lottery import columnar, excel_export, manifest, metrics
+from lottery.games import GAMES, split_row
+
+DB_PATH = "开奖数据.db"
+
+# 为 True 时每次保存后都从数据库重新导出 Excel（要读出整个历史），脚本加 --export 时打开
+EXPORT_EXCEL = False
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS draws (
+    game TEXT NOT NULL,
+    period INTEGER NOT NULL,
+    red TEXT NOT NULL,
+    blue TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (game, period)
+) WITHOUT ROWID
+"""
+
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    game TEXT PRIMARY KEY,
+    last_period INTEGER,
+    row_count INTEGER NOT NULL,
+    checksum INTEGER NOT NULL
+)
+"""
+
+UPSERT_SQL = """
+INSERT INTO draws (game, period, red, blue) VALUES (?, ?, ?, ?)
+ON CONFLICT (game, period) DO UPDATE SET red = excluded.red, blue = excluded.blue
+"""
+
+
+class StoreConnection(sqlite3.Connection):
+    """记住数据库路径的连接，用于定位对应的 JSON 水位清单"""
+
+    def __init__(self, path, *args, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        self.db_path = path
+
+
+def connect(path=DB_PATH):
+    """打开数据库并确保表结构存在；每个线程应使用自己的连接"""
+    conn = sqlite3.connect(path, timeout=30, factory=StoreConnection)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(SCHEMA)
+    conn.execute(MANIFEST_SCHEMA)
+    return conn
+
+
+def format_number(game, number):
+    """统一号码格式：双色球、大乐透补足两位，3D、排列3为一位"""
+    return str(int(number)).zfill(GAMES[game]["ball_width"])
+
+
+def row_to_record(game, row):
+    """把脚本 data 行 [期号, 红球..., (分隔, 蓝球...)] 转成数据库记录"""
+    period, red_balls, blue_balls = split_row(game, row)
+    return (game, int(period),
+            " ".join(format_number(game, n) for n in red_balls),
+            " ".join(format_number(game, n) for n in blue_balls))
+
+
+def record_to_row(game, period, red, blue):
+    """把数据库记录还原成脚本 data 行"""
+    row = [str(period)] + red.split()
+    if GAMES[game]["blue_count"]:
+        row += [""] + blue.split()
+    return row
+
+
+def scan_manifest(conn, game):
+    """全量扫描该彩种的数据，计算水位清单"""
+    entry = {"last_period": None, "row_count": 0, "checksum": 0}
+    for period, red, blue in conn.execute("SELECT period, red, blue FROM draws WHERE game = ?", (game,)):
+        entry["row_count"] += 1
+        entry["checksum"] = (entry["checksum"] + manifest.record_hash(period, red, blue)) % manifest.CHECKSUM_MOD
+        if entry["last_period"] is None or period > entry["last_period"]:
+            entry["last_period"] = period
+    return entry
+
+
+def read_db_manifest(conn, game):
+    """读取数据库里的水位清单，没有时返回 None"""
+    found = conn.execute("SELECT last_period, row_count, checksum FROM manifest WHERE game = ?", (game,)).fetchone()
+    if found is None:
+        return None
+    return {"last_period": found[0], "row_count": found[1], "checksum": found[2]}
+
+
+def write_db_manifest(conn, game, entry):
+    """写入数据库里的水位清单"""
+    conn.execute("INSERT OR REPLACE INTO manifest (game, last_period, row_count, checksum) VALUES (?, ?, ?, ?)",
+                 (game, entry["last_period"], entry["row_count"], entry["checksum"]))
+
+
+def upsert_draws(conn, game, data):
+    """在一个事务里写入多行并增量更新水位清单，期号已存在时覆盖，返回写入的行数"""
+    records = {}
+    for row in data:
+        record = row_to_record(game, row)
+        records[record[1]] = record  # 同一批里重复的期号以最后一条为准
+
+    manifest.mark_dirty(conn.db_path, game)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        entry = read_db_manifest(conn, game) or scan_manifest(conn, game)
+
+        # 只查本批涉及的期号，覆盖已有记录时先从校验和里减去旧值
+        periods = list(records)
+        for i in range(0, len(periods), 500):
+            chunk = periods[i:i + 500]
+            sql = f"SELECT period, red, blue FROM draws WHERE game = ? AND period IN ({','.join('?' * len(chunk))})"
+            for period, red, blue in conn.execute(sql, [game] + chunk):
+                entry["checksum"] -= manifest.record_hash(period, red, blue)
+                entry["row_count"] -= 1
+
+        conn.executemany(UPSERT_SQL, list(records.values()))
+        for _, period, red, blue in records.values():
+            entry["checksum"] += manifest.record_hash(period, red, blue)
+            entry["row_count"] += 1
+            if entry["last_period"] is None or period > entry["last_period"]:
+                entry["last_period"] = period
+        entry["checksum"] %= manifest.CHECKSUM_MOD
+        write_db_manifest(conn, game, entry)
+    manifest.write_entry(conn.db_path, game, entry)
+    return len(records)
+
+
+def rebuild_manifest(conn, game):
+    """全量扫描后重写数据库和 JSON 里的水位清单，返回清单"""
+    with conn:
+        entry = scan_manifest(conn, game)
+        write_db_manifest(conn, game, entry)
+    manifest.write_entry(conn.db_path, game, entry)
+    return entry
+
+
+def verify_manifest(conn, game):
+    """全量校验水位清单，不一致时重建，返回是否一致"""
+    expected = scan_manifest(conn, game)
+    consistent = read_db_manifest(conn, game) == expected and \
+        {k: v for k, v in (manifest.read_entry(conn.db_path, game) or {}).items() if k in expected} == expected
+    if not consistent:
+        rebuild_manifest(conn, game)
+    return consistent
+
+
+def max_period(conn, game):
+    """数据库中该彩种的最大期号，没有数据时返回 None"""
+    return conn.execute("SELECT MAX(period) FROM draws WHERE game = ?", (game,)).fetchone()[0]
+
+
+def count_draws(conn, game):
+    """数据库中该彩种的记录数"""
+    return conn.execute("SELECT COUNT(*) FROM draws WHERE game = ?", (game,)).fetchone()[0]
+
+
+def iter_rows(conn, game, start_period=None, end_period=None):
+    """按期号从新到旧逐行读出 data 行，可限定期号范围"""
+    sql = "SELECT period, red, blue FROM draws WHERE game = ?"
+    params = [game]
+    if start_period is not None:
+        sql += " AND period >= ?"
+        params.append(start_period)
+    if end_period is not None:
+        sql += " AND period <= ?"
+        params.append(end_period)
+    sql += " ORDER BY period DESC"
+    for record in conn.execute(sql, params):
+        yield record_to_row(game, *record)
+
+
+def load_rows(conn, game, start_period=None, end_period=None):
+    """按期号从新到旧读出 data 行列表，可限定期号范围"""
+    return list(iter_rows(conn, game, start_period, end_period))
+
+
+def import_excel(conn, game, path=None):
+    """把旧版脚本生成的 Excel 导入数据库，返回导入的行数"""
+    import pandas as pd
+
+    path = path or GAMES[game]["excel"]
+    df = pd.read_excel(path)
+    columns = [c for c in GAMES[game]["columns"] if c != "分隔"]
+    df = df.dropna(subset=columns)
+    data = []
+    for values in df[columns].itertuples(index=False):
+        values = [str(int(v)) for v in values]
+        row = values[:1 + GAMES[game]["red_count"]]
+        if GAMES[game]["blue_count"]:
+            row += [""] + values[1 + GAMES[game]["red_count"]:]
+        data.append(row)
+    count = upsert_draws(conn, game, data)
+    print(f"已从 {path} 导入 {count} 条记录到数据库")
+    return count
+
+
+def ensure_imported(conn, game):
+    """数据库里还没有该彩种的数据、但旧 Excel 存在时，先导入 Excel"""
+    if count_draws(conn, game) == 0 and os.path.exists(GAMES[game]["excel"]):
+        try:
+            import_excel(conn, game)
+        except Exception as e:
+            print(f"导入现有 Excel 失败: {e}")
+
+
+def export_excel(conn, game, path=None):
+    """从数据库流式导出 Excel，最新期号在顶部，红球与蓝球之间空一列，返回导出的行数"""
+    path = path or GAMES[game]["excel"]
+    # 期号写成数字，号码保持补零后的文本，与原来 pandas 导出的格式一致
+    rows = ([int(row[0])] + row[1:] for row in iter_rows(conn, game))
+    with metrics.phase("excel_export"):
+        count = excel_export.write_rows(path, GAMES[game]["columns"], rows)
+    metrics.count("bytes_written", os.path.getsize(path))
+    return count
+
+
+def get_max_period(game, db_path=DB_PATH):
+    """脚本用：返回已保存的最大期号
+
+    优先读 JSON 水位清单；清单缺失或不可信时打开数据库（首次运行会先导入旧
+    Excel），并用数据库里的清单或全量扫描结果重写 JSON。
+    """
+    entry = manifest.read_entry(db_path, game)
+    if entry is not None:
+        return entry["last_period"]
+    try:
+        conn = connect(db_path)
+        try:
+            ensure_imported(conn, game)
+            entry = read_db_manifest(conn, game)
+            if entry is None or entry["last_period"] != max_period(conn, game):
+                entry = rebuild_manifest(conn, game)
+            else:
+                manifest.write_entry(db_path, game, entry)
+            return entry["last_period"]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"读取现有数据失败: {e}")
+        return None
+
+
+def save_batches(game, batches, export=None):
+    """把一批批按期号从旧到新排好的数据依次写入数据库，每批之后增量更新列式文件、号码统计
+    和同出统计；export 为 True（默认取 EXPORT_EXCEL）时全部写完再导出一次 Excel。
+    返回保存的条数，出错时返回 None"""
+    # 号码统计和同出统计依赖 NumPy，只在真正有数据要保存时才导入
+    from lottery import cooccurrence, stats
+
+    total = 0
+    try:
+        conn = connect()
+        try:
+            ensure_imported(conn, game)
+            for data in batches:
+                if not data:
+                    continue
+                with metrics.phase("save"):
+                    upsert_draws(conn, game, data)
+                    columnar.update(conn, game, data)
+                    stats.update(conn, game, data)
+                    cooccurrence.update(conn, game, data)
+                total += len(data)
+            if (EXPORT_EXCEL if export is None else export) and total:
+                export_excel(conn, game)
+        finally:
+            conn.close()
+        return total
+    except Exception as e:
+        print(f"保存数据失败: {e}")
+        return None
+
+
+def save_draws(game, data, export=None):
+    """脚本用：把新抓到的数据写入数据库，增量更新列式文件、号码统计和同出统计，成功返回 True"""
+    if not data:
+        return False
+    return bool(save_batches(game, [data], export))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="开奖数据库维护")
+    parser.add_argument("action", choices=["export", "import", "verify"],
+                        help="export 导出 Excel，import 导入旧 Excel，verify 全量校验并修复水位清单")
+    parser.add_argument("games", nargs="*", metavar="game", help=f"彩种（{', '.join(GAMES)}），默认全部")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        for game in args.games or list(GAMES):
+            if args.action == "export":
+                count = export_excel(conn, game)
+                print(f"已导出 {GAMES[game]['excel']}，共 {count} 条记录")
+            elif args.action == "import":
+                import_excel(conn, game)
+            else:
+                consistent = verify_manifest(conn, game)
+                print(f"{GAMES[game]['name']}水位清单{'一致' if consistent else '不一致，已重建'}")
+    finally:
+        conn.close()
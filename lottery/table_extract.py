@@ -0,0 +1,172 @@
+"""一次 execute_script 取回整张结果表格，再在 Python 端解析
+
+逐个单元格调用 find_elements / .text 时，每次都是一次 WebDriver 往返，
+一页 30 行就要几百次调用。这里在浏览器里把表格序列化成 JSON 一次带回。
+"""
+
+# 每个单元格带回三样东西：可见文本、.jqh 号码球文本、第一个 <span> 的文本
+TABLE_ROWS_JS = """
+var root = document.querySelector(arguments[0]);
+if (!root) { return null; }
+var rows = root.querySelectorAll('tr');
+var out = [];
+for (var i = 0; i < rows.length; i++) {
+    var cells = rows[i].querySelectorAll('td');
+    var row = [];
+    for (var j = 0; j < cells.length; j++) {
+        var cell = cells[j];
+        var balls = cell.querySelectorAll('.jqh');
+        var span = cell.querySelector('span');
+        row.push({
+            text: cell.innerText.trim(),
+            jqh: Array.prototype.map.call(balls, function (b) { return b.innerText.trim(); }),
+            span: span ? span.innerText.trim() : null
+        });
+    }
+    out.push(row);
+}
+return out;
+"""
+
+
+def fetch_table_rows(driver, selector="table"):
+    """通过一次脚本调用取回表格所有行，每行是单元格字典的列表"""
+    rows = driver.execute_script(TABLE_ROWS_JS, selector)
+    return rows or []
+
+
+def preview_rows(rows, limit=5):
+    """生成表格前几行的文本预览，用于调试输出"""
+    return " | ".join(" ".join(cell["text"] for cell in cols) for cols in rows[:limit])
+
+
+def _split_numbers(cell, width):
+    """优先取 .jqh 号码球，否则按固定宽度切分单元格文本"""
+    if cell["jqh"]:
+        return list(cell["jqh"])
+    text = cell["text"].replace("\n", "")
+    return [text[i:i + width] for i in range(0, len(text), width) if i + width <= len(text)]
+
+
+def _zhcw_period(cols, start_period, end_period):
+    """校验中彩网表格行的期号，不符合条件时返回 None"""
+    if len(cols) < 4:
+        return None
+    period = cols[0]["text"]
+    if not period.startswith("20"):
+        return None
+    try:
+        period_int = int(period)
+    except ValueError:
+        return None
+    if period_int < start_period or period_int > end_period:
+        return None
+    return period
+
+
+def min_period(rows):
+    """表格里最早的期号（第一格为纯数字的行），没有数据行时返回 None"""
+    periods = [int(cols[0]["text"]) for cols in rows if cols and cols[0]["text"].isdigit()]
+    return min(periods) if periods else None
+
+
+def max_period(rows):
+    """表格里最新的期号（第一格为纯数字的行），没有数据行时返回 None"""
+    periods = [int(cols[0]["text"]) for cols in rows if cols and cols[0]["text"].isdigit()]
+    return max(periods) if periods else None
+
+
+def parse_ssq_rows(rows, start_period, end_period):
+    """解析中彩网双色球结果表格：[期号, 红球1-6, 分隔, 蓝球]"""
+    data = []
+    for cols in rows:
+        period = _zhcw_period(cols, start_period, end_period)
+        if period is None:
+            continue
+        red_balls = _split_numbers(cols[2], 2)
+        blue_ball = cols[3]["text"]
+        if len(red_balls) == 6 and blue_ball.isdigit():
+            data.append([period] + red_balls + [""] + [blue_ball])  # 插入空列
+    return data
+
+
+def parse_3d_rows(rows, start_period, end_period):
+    """解析中彩网 3D 结果表格：[期号, 号码1-3]"""
+    data = []
+    for cols in rows:
+        period = _zhcw_period(cols, start_period, end_period)
+        if period is None:
+            continue
+        numbers = _split_numbers(cols[2], 1)
+        if len(numbers) == 3:
+            data.append([period] + numbers)
+    return data
+
+
+def parse_dlt_rows(rows, start_period, end_period, seen_periods):
+    """解析体彩网大乐透 #historyData 表格：[期号, 红球1-5, 分隔, 蓝球1-2]"""
+    data = []
+    for cols in rows[2:]:  # 跳过表头
+        if len(cols) < 9:
+            continue
+
+        period = cols[0]["text"]
+        if not period.isdigit():
+            continue
+
+        period_int = int(period)
+        if period_int < start_period or period_int > end_period or period in seen_periods:
+            continue
+        seen_periods.add(period)
+
+        red_balls = []
+        for i in range(2, 7):  # 前区红球 td[2] 到 td[6]
+            red_ball = cols[i]["text"]
+            if red_ball.isdigit():
+                red_balls.append(red_ball)
+            else:
+                break
+        if len(red_balls) != 5:
+            continue
+
+        blue_balls = []
+        for i in range(7, 9):  # 后区蓝球 td[7] 到 td[8]
+            blue_ball = cols[i]["span"] if cols[i]["span"] is not None else cols[i]["text"]
+            if blue_ball.isdigit():
+                blue_balls.append(blue_ball)
+            else:
+                break
+        if len(blue_balls) != 2:
+            continue
+
+        data.append([period] + red_balls + [""] + blue_balls)  # 插入空列
+    return data
+
+
+def parse_pl3_rows(rows, start_period, end_period, seen_periods):
+    """解析体彩网排列3 #historyData 表格：[期号, 号码1-3]"""
+    data = []
+    for cols in rows[2:]:  # 跳过表头
+        if len(cols) < 5:  # 确保有足够的列
+            print(f"列数不足: {len(cols)}")
+            continue
+
+        period = cols[0]["text"]
+        if not period.isdigit():
+            print(f"期号非数字，跳过: '{period}'")
+            continue
+
+        period_int = int(period)
+        if period_int < start_period or period_int > end_period or period in seen_periods:
+            print(f"期号超出范围或已抓取: {period_int}")
+            continue
+        seen_periods.add(period)
+
+        # 从 cols[2]、cols[3]、cols[4] 提取三个号码
+        numbers = [cols[2]["text"], cols[3]["text"], cols[4]["text"]]
+        if not all(num.isdigit() for num in numbers):
+            print(f"号码数量或格式不正确: {numbers}")
+            continue
+
+        data.append([period] + numbers)
+    return data
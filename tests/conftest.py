@@ -0,0 +1,20 @@
+"""公共夹具：每个测试在自己的临时目录里运行（数据库、断点、报告文件都用相对路径）"""
+import pytest
+
+from lottery import benchmark
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def stand_in():
+    """本地替身服务器，模拟双色球、大乐透各 100 期的数据接口，返回 (开奖数据, base_url)"""
+    draws = {game: benchmark.synthetic_draws(game, 100) for game in ("ssq", "dlt")}
+    server, base_url = benchmark.serve_stand_in(draws, {})
+    yield draws, base_url
+    server.shutdown()
+    server.server_close()
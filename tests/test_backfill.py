@@ -0,0 +1,47 @@
+import pytest
+
+from lottery.backfill import run_sharded, split_period_range
+
+
+def covered(ranges, periods):
+    """每个期号落在几段里"""
+    return {period: sum(start <= period <= end for start, end in ranges) for period in periods}
+
+
+@pytest.mark.parametrize("start, end, shards", [
+    (2003001, 2024150, 4),   # 双色球七位期号，年数不能整除分片数
+    (2023150, 2025010, 3),   # 跨年，首尾两年都只有一部分
+    (23100, 24020, 2),       # 大乐透五位期号
+    (2024010, 2024090, 5),   # 只有一年时不分片
+])
+def test_shards_cover_the_range_without_gaps_or_overlaps(start, end, shards):
+    ranges = split_period_range(start, end, shards)
+    assert len(ranges) == min(shards, end // 1000 - start // 1000 + 1)
+    assert ranges[0][1] == end and ranges[-1][0] == start
+    # 较新的在前，相邻两段首尾相接于年份边界
+    for newer, older in zip(ranges, ranges[1:]):
+        assert older[1] < newer[0] and older[1] // 1000 + 1 == newer[0] // 1000
+    periods = [year * 1000 + n for year in range(start // 1000, end // 1000 + 1) for n in range(1, 366)]
+    counts = covered(ranges, [p for p in periods if start <= p <= end])
+    assert set(counts.values()) == {1}
+
+
+def test_sharded_results_are_merged_newest_first():
+    def scrape_shard(start, end):
+        # 分片边界多返回一期，模拟网站返回范围外的数据
+        return [[str(period)] for period in range(end, start - 2, -1) if period % 1000 and period % 1000 <= 5]
+
+    rows = run_sharded(scrape_shard, 2022001, 2024005, 3)
+    periods = [int(row[0]) for row in rows]
+    assert periods == sorted(set(periods), reverse=True)
+    assert periods[:5] == [2024005, 2024004, 2024003, 2024002, 2024001]
+
+
+def test_a_failed_shard_fails_the_whole_backfill():
+    def scrape_shard(start, end):
+        if start // 1000 == 2023:
+            raise RuntimeError("分片失败")
+        return [[str(end)]]
+
+    with pytest.raises(RuntimeError):
+        run_sharded(scrape_shard, 2022001, 2024005, 3)
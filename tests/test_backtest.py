@@ -0,0 +1,58 @@
+from math import comb
+
+import pytest
+
+from lottery import benchmark
+from lottery.backtest import PRIZE_AMOUNTS, TICKET_PRICE, expand, run_backtest
+from lottery.drawtable import DrawTable
+
+
+def test_single_ticket():
+    reds, blues = expand("ssq", {"red": [33, 1, 5, 9, 12, 20], "blue": [7]})
+    assert reds.tolist() == [[1, 5, 9, 12, 20, 33]] and blues.tolist() == [[7]]
+
+
+def test_multiple_selection_expands_every_combination():
+    reds, blues = expand("ssq", {"red": [1, 5, 9, 12, 20, 28, 33], "blue": [7, 16]})
+    assert len(reds) == comb(7, 6) * 2
+    assert len({tuple(r) + tuple(b) for r, b in zip(reds.tolist(), blues.tolist())}) == len(reds)
+
+
+def test_dan_tuo_always_includes_the_bankers():
+    reds, blues = expand("dlt", {"red_dan": [5, 9], "red": [1, 12, 20, 28, 33],
+                                 "blue_dan": [3], "blue": [7, 11, 12]})
+    assert len(reds) == comb(5, 3) * comb(3, 1)
+    assert all({5, 9} <= set(row) for row in reds.tolist())
+    assert all(3 in row for row in blues.tolist())
+
+
+def test_tickets_are_split_into_zones():
+    reds, blues = expand("ssq", {"tickets": [[1, 2, 3, 4, 5, 6, 7], [8, 9, 10, 11, 12, 13, 14]]})
+    assert reds.tolist() == [[1, 2, 3, 4, 5, 6], [8, 9, 10, 11, 12, 13]]
+    assert blues.tolist() == [[7], [14]]
+
+
+@pytest.mark.parametrize("spec", [{"red_dan": [1, 2, 3, 4, 5, 6], "red": [7], "blue": [1]},
+                                  {"red": [1, 2, 3, 4, 5], "blue": [1]}])
+def test_invalid_selections_are_rejected(spec):
+    with pytest.raises(ValueError):
+        expand("ssq", spec)
+
+
+def test_parallel_results_match_sequential():
+    rows = benchmark.synthetic_draws("ssq", 400)
+    table = DrawTable.from_rows("ssq", rows)
+    latest = rows[0]
+    strategies = [
+        {"name": "最新一期", "red": [int(n) for n in latest[1:7]], "blue": [int(latest[8])]},
+        {"name": "复式", "red": [1, 5, 9, 12, 20, 28, 33], "blue": [7, 16]},
+        {"name": "胆拖", "red_dan": [5, 9], "red": [1, 12, 20, 28, 33], "blue": [7]},
+    ]
+    sequential = run_backtest("ssq", strategies, table=table, workers=1)
+    assert run_backtest("ssq", strategies, table=table, workers=2) == sequential
+
+    first = sequential[0]
+    assert first["期数"] == 400 and first["一等奖"] >= 1
+    assert first["投入"] == 400 * TICKET_PRICE
+    assert first["奖金"] >= PRIZE_AMOUNTS["ssq"][1]
+    assert run_backtest("ssq", strategies[:1], table=table, start_period=int(rows[99][0]))[0]["期数"] == 100
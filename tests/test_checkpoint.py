@@ -0,0 +1,53 @@
+import os
+
+from lottery import checkpoint
+
+PAGE_1 = [["2024100", "01"], ["2024099", "02"]]
+PAGE_2 = [["2024098", "03"], ["2024097", "04"]]
+
+
+def test_no_file_until_the_first_page():
+    progress = checkpoint.Checkpoint("ssq", 2024001, 2024100)
+    assert not os.path.exists(progress.path)
+    assert progress.sorted_rows() == []
+    progress.write(1, PAGE_1)
+    assert os.path.exists(progress.path)
+
+
+def test_resume_continues_below_the_oldest_period():
+    progress = checkpoint.Checkpoint("ssq", 2024001, 2024100)
+    progress.write(1, PAGE_1)
+    progress.write(2, PAGE_2)
+
+    resumed = checkpoint.Checkpoint("ssq", 2024001, 2024105)
+    assert resumed.resumed and resumed.count == 4 and resumed.cursor == 2
+    # 截止期号沿用上次的值，新开奖的几期留给下一次运行
+    assert resumed.end_period == 2024100
+    assert resumed.remaining_end() == 2024096
+    assert list(resumed.iter_batches(size=3)) == [PAGE_2[::-1] + [PAGE_1[1]], [PAGE_1[0]]]
+
+
+def test_half_written_line_is_dropped():
+    progress = checkpoint.Checkpoint("ssq", 2024001, 2024100)
+    progress.write(1, PAGE_1)
+    with open(progress.path, "a", encoding="utf-8") as f:
+        f.write('{"cursor": 2, "rows": [["2024')
+
+    resumed = checkpoint.Checkpoint("ssq", 2024001, 2024100)
+    assert resumed.count == 2
+    resumed.write(2, PAGE_2)
+    assert resumed.sorted_rows() == PAGE_1 + PAGE_2
+
+
+def test_different_start_discards_the_checkpoint():
+    checkpoint.Checkpoint("ssq", 2024001, 2024100).write(1, PAGE_1)
+    progress = checkpoint.Checkpoint("ssq", 2024050, 2024100)
+    assert not progress.resumed and progress.count == 0
+    assert not os.path.exists(progress.path)
+
+
+def test_discard_removes_shard_checkpoints():
+    checkpoint.Checkpoint("ssq", 2024001, 2024100).write(1, PAGE_1)
+    checkpoint.Checkpoint("ssq", 2023001, 2023100, name="shard2023001").write(1, PAGE_1)
+    checkpoint.discard("ssq")
+    assert not [name for name in os.listdir() if name.endswith(".checkpoint.jsonl")]
@@ -0,0 +1,72 @@
+import pytest
+
+from lottery import benchmark, columnar, store
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """记录 update 走了几次整份重建"""
+    calls = []
+    rebuild = columnar.rebuild
+
+    def counting(conn, game):
+        calls.append(game)
+        return rebuild(conn, game)
+
+    monkeypatch.setattr(columnar, "rebuild", counting)
+    return calls
+
+
+def columnar_rows(game):
+    """把列式文件读回成 (期号, [号码...])，从旧到新"""
+    table = columnar.load_table(game).to_pydict()
+    periods = table.pop("期号")
+    return [(period, [column[i] for column in table.values()]) for i, period in enumerate(periods)]
+
+
+def db_rows(game):
+    conn = store.connect()
+    try:
+        rows = store.load_rows(conn, game)
+    finally:
+        conn.close()
+    return sorted((int(row[0]), [int(n) for n in row[1:] if n]) for row in rows)
+
+
+@pytest.mark.parametrize("game", ["ssq", "pl3"])
+def test_newer_draws_are_appended(game, rebuilds):
+    rows = benchmark.synthetic_draws(game, 30)[::-1]
+    assert store.save_batches(game, [rows[:20]]) == 20
+    assert rebuilds == [game]  # 第一次没有文件，整份生成
+    for start in range(20, 30, 5):
+        assert store.save_batches(game, [rows[start:start + 5]]) == 5
+    assert rebuilds == [game]
+    assert len(columnar.load_table(game).to_batches()) == 3
+    assert columnar_rows(game) == db_rows(game)
+
+
+def test_older_or_overwritten_draws_rebuild(rebuilds):
+    rows = benchmark.synthetic_draws("ssq", 30)[::-1]
+    assert store.save_batches("ssq", [rows[10:]]) == 20
+
+    # 补抓更早的期号：不能追加到末尾，要整份重建
+    assert store.save_batches("ssq", [rows[:10]]) == 10
+    assert len(rebuilds) == 2
+    assert columnar_rows("ssq") == db_rows("ssq")
+
+    # 覆盖已有的最新一期：期号不比文件末尾新，同样重建
+    changed = list(rows[-1])
+    changed[-1] = "16" if changed[-1] != "16" else "15"
+    assert store.save_batches("ssq", [[changed]]) == 1
+    assert len(rebuilds) == 3
+    assert columnar_rows("ssq")[-1] == (int(changed[0]), [int(n) for n in changed[1:] if n])
+    assert columnar_rows("ssq") == db_rows("ssq")
+
+
+def test_too_many_batches_are_combined(monkeypatch):
+    monkeypatch.setattr(columnar, "MAX_BATCHES", 2)
+    rows = benchmark.synthetic_draws("3d", 12)[::-1]
+    for start in range(0, 12, 3):
+        store.save_batches("3d", [rows[start:start + 3]])
+    assert len(columnar.load_table("3d").to_batches()) <= 2
+    assert columnar_rows("3d") == db_rows("3d")
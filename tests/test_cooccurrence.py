@@ -0,0 +1,62 @@
+from collections import Counter
+from itertools import combinations
+from math import comb
+
+import numpy as np
+import pytest
+
+from lottery import benchmark, cooccurrence, store
+from lottery.cooccurrence import CoOccurrence, CoOccurrenceSet, triple_rank, triple_table
+from lottery.drawtable import DrawTable
+
+
+def brute_force(rows, game):
+    """逐期逐组合直接数出对子和三连次数"""
+    red_count = 6 if game == "ssq" else 5
+    pairs, triples = Counter(), Counter()
+    for row in rows:
+        reds = sorted(int(n) for n in row[1:1 + red_count])
+        pairs.update(combinations(reds, 2))
+        triples.update(combinations(reds, 3))
+    return pairs, triples
+
+
+def test_triple_rank_numbers_every_combination_once():
+    size = 33
+    triples = np.array(list(combinations(range(size), 3)))
+    ranks = triple_rank(triples[:, 0], triples[:, 1], triples[:, 2])
+    assert sorted(ranks.tolist()) == list(range(comb(size, 3)))
+    table = triple_table(size)
+    assert table[triple_rank(4, 11, 32)].tolist() == [5, 12, 33]
+
+
+@pytest.mark.parametrize("game, window", [("ssq", 30), ("dlt", 30), ("ssq", None)])
+def test_incremental_window_matches_a_recount(game, window):
+    rows = benchmark.synthetic_draws(game, 120)[::-1]
+    item = CoOccurrence(game, window)
+    start = 0
+    # 批次大小不一，有的跨过窗口边界，有的比整个窗口还长
+    for size in (7, 25, 1, 40, 3, 44):
+        item.add(DrawTable.from_rows(game, rows[start:start + size]))
+        start += size
+        recent = rows[:start] if window is None else rows[max(0, start - window):start]
+        pairs, triples = brute_force(recent, game)
+        assert item.draws == len(recent)
+        for a, b in combinations(range(1, item.size + 1), 2):
+            assert item.pair(a, b) == item.pair(b, a) == pairs[(a, b)]
+        assert int(item.triples.sum()) == sum(triples.values())
+        for (a, b, c), count in triples.items():
+            assert item.triple(c, a, b) == count
+
+
+def test_saved_statistics_match_a_full_recount():
+    rows = benchmark.synthetic_draws("ssq", 150)[::-1]
+    for start in range(0, 150, 35):
+        store.save_batches("ssq", [rows[start:start + 35]])
+    saved = CoOccurrenceSet.read("ssq", cooccurrence.cooccurrence_path(store.DB_PATH, "ssq"))
+    full = CoOccurrenceSet.from_table(DrawTable.from_rows("ssq", rows))
+    for window in cooccurrence.WINDOWS:
+        assert np.array_equal(saved[window].pairs, full[window].pairs)
+        assert np.array_equal(saved[window].triples, full[window].triples)
+    best = saved[None].top_pairs(1)[0]
+    assert best[2] == max(brute_force(rows, "ssq")[0].values())
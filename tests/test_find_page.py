@@ -0,0 +1,57 @@
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from lottery.games import load_script
+
+PAGES = 5
+PAGE_SIZE = 10
+NEWEST = 24060
+
+
+class Site:
+    """5 页的开奖列表，每页 10 期，第 5 页从 24020 起；超出末页时跳页超时或显示空表格"""
+
+    def __init__(self, past_end):
+        self.page = 1
+        self.past_end = past_end
+        self.jumps = []
+
+    def go_to_page(self, driver, page):
+        self.jumps.append(page)
+        if page > PAGES and self.past_end == "timeout":
+            raise TimeoutException()
+        self.page = page
+
+    def fetch_table_rows(self, driver, selector):
+        if self.page > PAGES:
+            return [[{"text": "期号"}]]
+        first = NEWEST - (self.page - 1) * PAGE_SIZE
+        return [[{"text": str(period)}] for period in range(first, first - PAGE_SIZE, -1)]
+
+
+@pytest.mark.parametrize("game", ["dlt", "pl3"])
+@pytest.mark.parametrize("past_end", ["timeout", "empty"])
+def test_find_page_without_page_count_stops_at_the_last_page(game, past_end, monkeypatch):
+    script = load_script(game)
+    site = Site(past_end)
+    monkeypatch.setattr(script, "page_count", lambda driver: None)
+    monkeypatch.setattr(script, "go_to_page", site.go_to_page)
+    monkeypatch.setattr(script, "fetch_table_rows", site.fetch_table_rows)
+
+    # 翻倍试探到第 8 页才越过末页，二分时第 6、7 页也在末页之后
+    assert script.find_page(None, 24020) == 5
+    assert site.page == 5
+    assert max(site.jumps) == 8
+
+
+@pytest.mark.parametrize("game", ["dlt", "pl3"])
+def test_find_page_with_page_count(game, monkeypatch):
+    script = load_script(game)
+    site = Site("timeout")
+    monkeypatch.setattr(script, "page_count", lambda driver: PAGES)
+    monkeypatch.setattr(script, "go_to_page", site.go_to_page)
+    monkeypatch.setattr(script, "fetch_table_rows", site.fetch_table_rows)
+
+    assert script.find_page(None, 24045) == 2
+    assert site.page == 2
+    assert max(site.jumps) <= PAGES
@@ -0,0 +1,65 @@
+"""端到端：对本地替身服务器完整运行脚本的 run_http（取页、解析、断点、入库）"""
+import os
+
+import pytest
+
+from lottery import http_backend, store
+from lottery.games import GAMES, load_script
+
+
+def checkpoint_files():
+    return [name for name in os.listdir() if name.endswith(".checkpoint.jsonl")]
+
+
+def stored(game):
+    conn = store.connect()
+    try:
+        return store.load_rows(conn, game)
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("game", ["ssq", "dlt"])
+def test_run_http_saves_all_draws_once(stand_in, game):
+    draws, base_url = stand_in
+    script = load_script(game)
+    assert script.run_http(base_url) == 100
+    assert sorted(int(row[0]) for row in stored(game)) == sorted(int(row[0]) for row in draws[game])
+
+    # 没有新数据时不留下断点文件，Excel 默认也不导出
+    assert script.run_http(base_url) == 0
+    assert checkpoint_files() == []
+    assert not os.path.exists(GAMES[game]["excel"])
+
+
+
+def test_run_http_resumes_after_a_failed_request(stand_in, monkeypatch):
+    draws, base_url = stand_in
+    script = load_script("ssq")
+    request_json = http_backend.request_json
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 4:  # 最新期号查询之后的第三页
+            raise RuntimeError("模拟断网")
+        return request_json(*args, **kwargs)
+
+    monkeypatch.setattr(http_backend, "request_json", flaky)
+    assert script.run_http(base_url) is None
+    assert checkpoint_files() == ["开奖数据.ssq.checkpoint.jsonl"]
+
+    monkeypatch.setattr(http_backend, "request_json", request_json)
+    assert script.run_http(base_url) == 100
+    periods = [int(row[0]) for row in stored("ssq")]
+    assert len(periods) == len(set(periods)) == 100
+    assert checkpoint_files() == []
+
+
+def test_run_http_keeps_a_borrowed_session_open(stand_in):
+    _, base_url = stand_in
+    session = http_backend.create_session(base_url)
+    closed = []
+    session.close = lambda: closed.append(True)
+    assert load_script("ssq").run_http(session=session) == 100
+    assert closed == []
@@ -0,0 +1,51 @@
+from lottery import integrity, store
+
+
+def ssq_periods(counts, skip=()):
+    """按 {年份: 当年期数} 生成双色球期号，skip 里的期号不生成"""
+    return [year * 1000 + seq for year, count in sorted(counts.items())
+            for seq in range(1, count + 1) if year * 1000 + seq not in skip]
+
+
+def test_scan_finds_holes_and_missing_years():
+    periods = ssq_periods({2003: 89, 2004: 122, 2006: 154}, skip={2004005, 2004006, 2006100})
+    report = integrity.scan("ssq", periods)
+    assert report["holes"] == [(2004005, 2004006), (2005001, 2005999), (2006100, 2006100)]
+    assert report["duplicates"] == [] and report["invalid"] == []
+
+
+def test_scan_reports_duplicates_and_invalid_periods():
+    report = integrity.scan("ssq", [2003001, 2003001, 2003002, 2002500, 2004000])
+    assert report["duplicates"] == [2003001]
+    assert report["invalid"] == [2002500, 2004000]
+
+
+def test_complete_years_are_not_suspicious_tails():
+    # 实际各年期数相差几期，都不应当算作年末缺失
+    periods = ssq_periods({2003: 89, 2004: 122, 2005: 153, 2006: 154, 2007: 153, 2008: 154, 2009: 40})
+    assert integrity.scan("ssq", periods)["tails"] == []
+
+
+def test_short_year_is_a_suspicious_tail():
+    periods = ssq_periods({2003: 89, 2004: 122, 2005: 153, 2006: 120, 2007: 153, 2008: 30})
+    assert integrity.scan("ssq", periods)["tails"] == [(2006121, 2006999)]
+
+
+def test_plan_queries_merges_nearby_holes_within_a_year():
+    ranges = [(2004005, 2004006), (2004010, 2004012), (2004050, 2004050), (2005001, 2005002)]
+    assert integrity.plan_queries(ranges, page_size=30) == [(2004005, 2004012), (2004050, 2004050), (2005001, 2005002)]
+
+
+def test_repair_refetches_only_the_holes(stand_in):
+    draws, base_url = stand_in
+    missing = {2003010, 2003011, 2003050}
+    rows = [row for row in draws["ssq"][::-1] if int(row[0]) not in missing]
+    assert store.save_batches("ssq", [rows]) == 97
+
+    assert integrity.repair("ssq", base_url=base_url) == 3
+    conn = store.connect()
+    try:
+        assert integrity.stored_periods(conn, "ssq") == [int(row[0]) for row in draws["ssq"][::-1]]
+    finally:
+        conn.close()
+    assert integrity.repair("ssq", base_url=base_url) == 0
@@ -0,0 +1,58 @@
+import pytest
+
+from lottery import benchmark, manifest, store
+
+
+@pytest.fixture
+def saved():
+    """已入库 20 期双色球，JSON 清单是干净的"""
+    rows = benchmark.synthetic_draws("ssq", 20)[::-1]
+    assert store.save_batches("ssq", [rows]) == 20
+    return rows
+
+
+def test_clean_manifest_answers_without_opening_the_database(saved, monkeypatch):
+    def no_database(*args, **kwargs):
+        raise AssertionError("不应打开数据库")
+
+    monkeypatch.setattr(store, "connect", no_database)
+    assert store.get_max_period("ssq") == int(saved[-1][0])
+
+
+def test_dirty_manifest_falls_back_to_the_database(saved):
+    # 模拟写入数据库后、写回 JSON 前进程退出：JSON 停在 dirty，数据库里已有新的一期
+    newer = benchmark.synthetic_draws("ssq", 21)[0]
+    manifest.mark_dirty(store.DB_PATH, "ssq")
+    conn = store.connect()
+    with conn:
+        conn.execute(store.UPSERT_SQL, store.row_to_record("ssq", newer))
+    conn.close()
+    assert manifest.read_entry(store.DB_PATH, "ssq") is None
+
+    assert store.get_max_period("ssq") == int(newer[0])
+    entry = manifest.read_entry(store.DB_PATH, "ssq")
+    assert entry["last_period"] == int(newer[0]) and entry["row_count"] == 21
+
+
+def test_incremental_checksum_matches_a_full_scan(saved):
+    changed = list(saved[3])
+    changed[-1] = "16" if changed[-1] != "16" else "15"  # 覆盖已有一期的蓝球
+    assert store.save_draws("ssq", [changed])
+    conn = store.connect()
+    try:
+        assert store.read_db_manifest(conn, "ssq") == store.scan_manifest(conn, "ssq")
+        assert store.verify_manifest(conn, "ssq")
+    finally:
+        conn.close()
+
+
+def test_verify_rebuilds_a_stale_manifest(saved):
+    entry = manifest.read_entry(store.DB_PATH, "ssq")
+    manifest.write_entry(store.DB_PATH, "ssq", dict(entry, row_count=5, checksum=1))
+    conn = store.connect()
+    try:
+        assert store.verify_manifest(conn, "ssq") is False
+        assert manifest.read_entry(store.DB_PATH, "ssq")["row_count"] == 20
+        assert store.verify_manifest(conn, "ssq") is True
+    finally:
+        conn.close()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from lottery.drawtable import DrawTable
+from lottery.games import build_row
+from lottery.matching import TIER_NAMES, MatchIndex
+
+
+def ssq_index():
+    rows = [
+        build_row("ssq", 2024001, ["01", "02", "03", "04", "05", "06"], ["07"]),
+        build_row("ssq", 2024002, ["01", "02", "03", "04", "05", "33"], ["07"]),
+        build_row("ssq", 2024003, ["10", "11", "12", "13", "14", "15"], ["16"]),
+    ]
+    return MatchIndex(DrawTable.from_rows("ssq", rows))
+
+
+def digits_index(game):
+    rows = [build_row(game, 2024001, ["1", "2", "3"]), build_row(game, 2024002, ["3", "1", "1"]),
+            build_row(game, 2024003, ["5", "5", "5"])]
+    return MatchIndex(DrawTable.from_rows(game, rows))
+
+
+def test_ssq_tiers():
+    result = ssq_index().match([[1, 2, 3, 4, 5, 6]], [[7]])
+    assert result.red_hits[0].tolist() == [6, 5, 0]
+    assert result.blue_hits[0].tolist() == [1, 1, 0]
+    assert [TIER_NAMES["ssq"][tier] for tier in result.tiers[0]] == ["一等奖", "三等奖", "未中奖"]
+
+
+def test_ssq_blue_only_wins_sixth_prize():
+    assert ssq_index().history([20, 21, 22, 23, 24, 25], [16]) == [(2024003, "六等奖")]
+
+
+@pytest.mark.parametrize("game", ["3d", "pl3"])
+def test_digit_games_direct_and_group(game):
+    index = digits_index(game)
+    assert index.history([1, 2, 3]) == [(2024001, "直选")]
+    assert index.history([3, 2, 1]) == [(2024001, "组选6")]
+    assert index.history([1, 3, 1]) == [(2024002, "组选3")]
+    # 豹子只有直选
+    assert index.history([5, 5, 5]) == [(2024003, "直选")]
+
+
+def test_tier_summary_matches_full_matrix(monkeypatch):
+    monkeypatch.setattr("lottery.matching.CHUNK_TICKETS", 2)
+    index = ssq_index()
+    rng = np.random.default_rng(0)
+    reds = np.sort(np.array([rng.choice(np.arange(1, 34), 6, replace=False) for _ in range(7)]), axis=1)
+    blues = rng.integers(1, 17, size=(7, 1))
+    reds[0], blues[0] = [1, 2, 3, 4, 5, 6], [7]
+    summary = index.tier_summary(reds, blues, workers=2)
+    assert summary.tolist() == index.tier_counts(index.match(reds, blues).tiers).tolist()
+    assert summary[0, 1] == 1 and summary[0, 3] == 1
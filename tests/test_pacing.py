@@ -0,0 +1,71 @@
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+
+from lottery import metrics
+from lottery.pacing import click_when_ready
+
+
+class Pacer:
+    def wait(self):
+        pass
+
+
+class Element:
+    def __init__(self, page, css_class=""):
+        self.page = page
+        self.css_class = css_class
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def get_attribute(self, name):
+        return self.css_class
+
+    def click(self):
+        # 第一次点击时页面恰好重新渲染，元素已失效
+        self.page.clicks += 1
+        if self.page.clicks == 1:
+            raise StaleElementReferenceException("stale")
+
+
+class Page:
+    def __init__(self, css_class=""):
+        self.clicks = 0
+        self.css_class = css_class
+
+    def find_element(self, by, value):
+        return Element(self, self.css_class)
+
+
+@pytest.fixture
+def run():
+    run = metrics.RunMetrics("ssq", "browser")
+    previous = metrics.bind(run)
+    yield run
+    metrics.bind(previous)
+
+
+def test_stale_click_is_retried_and_counted(run):
+    page = Page()
+    assert click_when_ready(page, Pacer(), ("xpath", "//a[@title='2']"))
+    assert page.clicks == 2
+    assert run.counters["stale_recoveries"] == 1
+
+
+def test_disabled_element_is_not_clicked(run):
+    page = Page("disabled")
+    assert click_when_ready(page, Pacer(), ("xpath", "//a"), skip_disabled=True) is False
+    assert page.clicks == 0
+
+
+def test_missing_element_times_out():
+    class Empty:
+        def find_element(self, by, value):
+            from selenium.common.exceptions import NoSuchElementException
+            raise NoSuchElementException()
+
+    with pytest.raises(TimeoutException):
+        click_when_ready(Empty(), Pacer(), ("xpath", "//a"), timeout=0.1)
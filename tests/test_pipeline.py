@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from lottery import pipeline
+
+
+def numbered_pages(log, count=100, fail_at=None):
+    """取页生成器：记录取到第几页、是否被关闭"""
+    try:
+        for page in range(1, count + 1):
+            if page == fail_at:
+                raise RuntimeError("模拟翻页失败")
+            log["fetched"] = page
+            yield page, [page]
+    finally:
+        log["closed_by"] = threading.current_thread()
+
+
+def test_prefetch_yields_every_page_in_order():
+    log = {}
+    assert [page for page, _ in pipeline.prefetch(numbered_pages(log, 5), depth=2)] == [1, 2, 3, 4, 5]
+
+
+def test_prefetch_stops_the_producer_when_the_consumer_stops():
+    log = {}
+    threads = threading.active_count()
+    stream = pipeline.prefetch(numbered_pages(log), depth=1)
+    for page, _ in stream:
+        if page == 3:
+            break
+    stream.close()
+    # 后台线程已经退出，取页生成器在当前线程里关闭，最多多取了缓冲区加一页
+    assert threading.active_count() == threads
+    assert log["closed_by"] is threading.main_thread()
+    assert log["fetched"] <= 5
+
+
+def test_producer_error_reaches_the_consumer():
+    log = {}
+    seen = []
+    with pytest.raises(RuntimeError, match="模拟翻页失败"):
+        for page, _ in pipeline.prefetch(numbered_pages(log, fail_at=4)):
+            seen.append(page)
+    assert seen == [1, 2, 3]
+
+
+def test_validate_drops_bad_out_of_range_and_repeated_rows():
+    good = ["2024005", "01", "02", "03", "04", "05", "06", "", "07"]
+    pages = [
+        (1, [good, ["2024004", "01", "02"], list(good)]),
+        (2, [["2024003"] + good[1:], ["2024009"] + good[1:], ["2024001"] + good[1:]]),
+    ]
+    kept = list(pipeline.validate(pages, "ssq", 2024002, 2024008))
+    assert [[row[0] for row in rows] for _, rows in kept] == [["2024005"], ["2024003"]]
+
+    # 续抓时断点里已有 2024004 及更新的期号
+    kept = list(pipeline.validate(pages, "ssq", 2024001, 2024008, below=2024004))
+    assert [[row[0] for row in rows] for _, rows in kept] == [[], ["2024003", "2024001"]]
@@ -0,0 +1,86 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from lottery import scheduler
+from lottery.scheduler import BEIJING, GameSchedule, next_window, publish_window
+
+
+def at(day, hour, minute=0):
+    return datetime(2024, 6, day, hour, minute, tzinfo=BEIJING)
+
+
+def test_publish_window_only_on_draw_days():
+    # 2024-06-03 是周一，双色球周二、四、日开奖
+    assert publish_window("ssq", date(2024, 6, 3)) is None
+    start, end = publish_window("ssq", date(2024, 6, 4))
+    assert start == at(4, 21, 15) + timedelta(minutes=scheduler.PUBLISH_DELAY)
+    assert end == start + timedelta(minutes=scheduler.PUBLISH_WINDOW)
+
+
+def test_next_window_skips_to_the_next_draw_day():
+    assert next_window("ssq", at(3, 12))[0] == publish_window("ssq", date(2024, 6, 4))[0]
+    # 窗口内返回当前窗口，窗口结束后才换到下一个开奖日
+    inside = at(4, 22)
+    assert next_window("ssq", inside) == publish_window("ssq", date(2024, 6, 4))
+    assert next_window("ssq", at(5, 1))[0] == publish_window("ssq", date(2024, 6, 6))[0]
+
+
+def test_daily_games_have_a_window_every_day():
+    assert next_window("3d", at(3, 12))[0].date() == date(2024, 6, 3)
+
+
+@pytest.fixture
+def schedule():
+    state = GameSchedule("ssq", at(3, 12))
+    state.not_found(at(3, 12))
+    return state
+
+
+def test_outside_window_sleeps_until_the_window(schedule):
+    assert schedule.next_poll == publish_window("ssq", date(2024, 6, 4))[0]
+
+
+def test_inside_window_polls_with_backoff(schedule):
+    now = at(4, 21, 30)
+    schedule.not_found(now)
+    assert schedule.next_poll == now + timedelta(seconds=scheduler.POLL_MIN)
+    for _ in range(10):
+        schedule.not_found(now)
+    assert schedule.interval == scheduler.POLL_MAX
+
+
+def test_found_sleeps_until_the_next_draw(schedule):
+    schedule.found(at(4, 21, 30))
+    assert schedule.next_poll == publish_window("ssq", date(2024, 6, 6))[0]
+    assert schedule.interval == scheduler.POLL_MIN
+
+
+def test_failures_back_off_up_to_the_limit(schedule):
+    now = at(4, 21, 30)
+    schedule.failed(now)
+    assert schedule.next_poll == now + timedelta(seconds=scheduler.POLL_MIN)
+    for _ in range(10):
+        schedule.failed(now)
+    assert schedule.error_interval == scheduler.ERROR_MAX
+
+
+def test_fetch_error_backs_off_and_restarts_the_browser(monkeypatch):
+    class Driver:
+        def quit(self):
+            raise RuntimeError("浏览器已失去响应")
+
+    def broken_fetch(game):
+        raise RuntimeError("无法打开标签页")
+
+    daemon = scheduler.Scheduler(["ssq"])
+    daemon.browser.driver = Driver()
+    monkeypatch.setattr(scheduler.http_backend, "probe_new_draws", lambda *args, **kwargs: True)
+    monkeypatch.setattr(daemon, "fetch", broken_fetch)
+    before = datetime.now(BEIJING)
+    daemon.poll("ssq")
+    state = daemon.states["ssq"]
+    assert state.next_poll >= before + timedelta(seconds=scheduler.POLL_MIN)
+    assert state.error_interval == scheduler.POLL_MIN * 2
+    assert daemon.browser.driver is None
+    daemon.http.close()
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from lottery import benchmark, stats, store
+from lottery.drawtable import DrawTable
+
+
+@pytest.mark.parametrize("game", ["ssq", "dlt", "3d"])
+def test_incremental_update_matches_rebuild(game):
+    rows = benchmark.synthetic_draws(game, 250)[::-1]
+    for start in range(0, len(rows), 60):
+        assert store.save_batches(game, [rows[start:start + 60]]) == len(rows[start:start + 60])
+
+    incremental = stats.GameStats.read(game, stats.stats_path(store.DB_PATH, game))
+    rebuilt = stats.GameStats.from_table(DrawTable.from_rows(game, rows))
+    assert incremental.last_period == rebuilt.last_period == int(rows[-1][0])
+    for name, zone in rebuilt.zones.items():
+        other = incremental.zones[name]
+        assert other.draws == zone.draws
+        for field in ("counts", "last_hit", "max_omission", "recent"):
+            assert np.array_equal(getattr(other, field), getattr(zone, field)), field
+
+
+def test_adding_older_draws_is_rejected():
+    rows = benchmark.synthetic_draws("ssq", 10)[::-1]
+    game_stats = stats.GameStats.from_table(DrawTable.from_rows("ssq", rows[5:]))
+    with pytest.raises(ValueError):
+        game_stats.add(DrawTable.from_rows("ssq", rows[:5]))
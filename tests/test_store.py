@@ -0,0 +1,25 @@
+import os
+
+from openpyxl import load_workbook
+
+from lottery import benchmark, store
+from lottery.games import GAMES
+
+
+def test_export_keeps_zero_padded_balls_as_text():
+    rows = benchmark.synthetic_draws("ssq", 3)
+    assert store.save_batches("ssq", [rows[::-1]], export=True) == 3
+    sheet = load_workbook(GAMES["ssq"]["excel"]).active
+    exported = [[cell.value for cell in row] for row in sheet.iter_rows(min_row=2)]
+    assert exported == [[int(row[0])] + [value or None for value in row[1:]] for row in rows]
+    assert isinstance(exported[0][1], str)
+
+
+def test_export_is_opt_in(monkeypatch):
+    rows = benchmark.synthetic_draws("3d", 3)[::-1]
+    assert store.save_batches("3d", [rows]) == 3
+    assert not os.path.exists(GAMES["3d"]["excel"])
+
+    monkeypatch.setattr(store, "EXPORT_EXCEL", True)
+    assert store.save_batches("3d", [benchmark.synthetic_draws("3d", 4)[:1]]) == 1
+    assert os.path.exists(GAMES["3d"]["excel"])
@@ -0,0 +1,50 @@
+from lottery import table_extract
+
+
+def cell(text, jqh=(), span=None):
+    return {"text": text, "jqh": list(jqh), "span": span}
+
+
+HEADER = [[cell("期号")], [cell("")]]
+
+
+def test_parse_ssq_rows_uses_balls_or_fixed_width_text():
+    rows = [
+        [cell("2024002"), cell("2024-01-04"), cell("", jqh=["01", "02", "03", "04", "05", "06"]), cell("07")],
+        [cell("2024001"), cell("2024-01-02"), cell("010203040506"), cell("16")],
+        [cell("2023153"), cell("2023-12-31"), cell("010203040506"), cell("16")],
+        [cell("合计"), cell(""), cell(""), cell("")],
+    ]
+    assert table_extract.parse_ssq_rows(rows, 2024001, 2024002) == [
+        ["2024002", "01", "02", "03", "04", "05", "06", "", "07"],
+        ["2024001", "01", "02", "03", "04", "05", "06", "", "16"],
+    ]
+
+
+def test_parse_3d_rows():
+    rows = [[cell("2024100"), cell("2024-04-10"), cell("123"), cell("")],
+            [cell("2024099"), cell("2024-04-09"), cell("12"), cell("")]]
+    assert table_extract.parse_3d_rows(rows, 2024001, 2024999) == [["2024100", "1", "2", "3"]]
+
+
+def test_parse_dlt_rows_skips_header_and_seen_periods():
+    row = [cell("24050"), cell("2024-05-06")] + [cell(n) for n in ("01", "05", "12", "20", "33")] \
+        + [cell("", span="03"), cell("11")]
+    rows = HEADER + [row, row, [cell("24049")] + [cell("")] * 8]
+    seen = set()
+    assert table_extract.parse_dlt_rows(rows, 24001, 24999, seen) == [
+        ["24050", "01", "05", "12", "20", "33", "", "03", "11"]]
+    assert "24050" in seen
+
+
+def test_parse_pl3_rows():
+    rows = HEADER + [[cell("24120"), cell("2024-05-06"), cell("4"), cell("0"), cell("9")],
+                     [cell("24119"), cell("2024-05-05"), cell("4"), cell("-"), cell("9")]]
+    assert table_extract.parse_pl3_rows(rows, 24001, 24999, set()) == [["24120", "4", "0", "9"]]
+
+
+def test_min_and_max_period_ignore_non_numeric_rows():
+    rows = HEADER + [[cell("24120")], [cell("24101")], []]
+    assert table_extract.min_period(rows) == 24101
+    assert table_extract.max_period(rows) == 24120
+    assert table_extract.min_period(HEADER) is None
@@ -0,0 +1,115 @@
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from lottery import http_backend, network_capture, resource_filter, store
+from lottery.browser_session import BrowserSession
+from lottery.games import GAMES, load_script
+
+
+def probe_games(games, base_url=None):
+    """并发用数据接口快速检查各彩种，返回没有新数据、可以直接跳过的彩种"""
+    with ThreadPoolExecutor(max_workers=max(1, len(games))) as pool:
+        probes = list(pool.map(lambda game: http_backend.probe_new_draws(game, base_url), games))
+    return {game for game, has_new in zip(games, probes) if has_new is False}
+
+
+def update_all(games, backend="browser", headless=True, base_url=None, workers=4, shards=1, probe=True):
+    """并发更新各彩种，返回 {彩种: 追加的记录数或 None}
+
+    每个工作线程持有自己的浏览器会话（或 HTTP 会话），会话在该线程处理的
+    各彩种之间复用；一个彩种出错不会影响其他彩种。workers=1 时退化为
+    所有彩种依次共用一个浏览器。shards 大于 1 时，支持按期号查询的彩种
+    （双色球、3D）会分片并发回填，分片总数受 lottery.backfill 的全局上限约束。
+
+    probe 为 True 时先并发查询各彩种的最新期号，没有新数据的彩种直接跳过，
+    不导入抓取脚本也不启动浏览器；全部跳过时整个运行不到一秒。
+    """
+    results = {}
+    skipped = probe_games(games, base_url) if probe else set()
+    for game in skipped:
+        results[game] = 0
+    pending = [game for game in games if game not in skipped]
+
+    scripts = {game: load_script(game) for game in pending}
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def worker_session():
+        """取得当前工作线程的浏览器会话，没有则新建"""
+        if not hasattr(local, "session"):
+            local.session = BrowserSession(headless=headless)
+            with sessions_lock:
+                sessions.append(local.session)
+        return local.session
+
+    def update_game(game):
+        """更新一个彩种，返回 (追加的记录数, 用时)"""
+        print(f"===== 开始更新{GAMES[game]['name']} =====")
+        started = time.time()
+        if backend == "browser":
+            if GAMES[game]["range_query"]:
+                count = scripts[game].run_browser(worker_session(), shards, probe=False)
+            else:
+                count = scripts[game].run_browser(worker_session(), probe=False)
+        else:
+            count = scripts[game].run_http(base_url)
+        return count, time.time() - started
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(update_game, game): game for game in pending}
+            for future in as_completed(futures):
+                game = futures[future]
+                name = GAMES[game]["name"]
+                try:
+                    count, elapsed = future.result()
+                except Exception as e:
+                    print(f"❌ {name}更新出错: {e}")
+                    results[game] = None
+                    continue
+                results[game] = count
+                status = f"追加 {count} 条记录" if count is not None else "失败"
+                print(f"===== {name}更新结束：{status}，用时 {elapsed:.1f} 秒 =====")
+    finally:
+        for session in sessions:
+            session.quit()
+
+    print("更新结果汇总:")
+    for game in games:
+        count = results.get(game)
+        print(f"  {GAMES[game]['name']}: {'❌ 失败' if count is None else f'✅ 追加 {count} 条'}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一次更新全部彩种的历史开奖数据")
+    parser.add_argument("games", nargs="*", metavar="game",
+                        help=f"要更新的彩种（{', '.join(GAMES)}），默认全部")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser",
+                        help="抓取方式：browser 用浏览器，http 直接请求数据接口")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="同时更新的彩种数，每个并发各用一个浏览器，默认 4；1 表示依次更新并共用一个浏览器")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="双色球、3D 回填时按年份分成几段并发抓取，默认 1（不分片）")
+    parser.add_argument("--show-browser", action="store_true", help="显示浏览器窗口（默认无头模式）")
+    parser.add_argument("--base-url", help="http 后端的接口地址，指向本地回放服务器时可离线运行")
+    parser.add_argument("--no-probe", action="store_true", help="不做启动前的最新期号快速检查，每个彩种都照常抓取")
+    parser.add_argument("--no-block", action="store_true",
+                        help="浏览器不拦截图片、样式表等资源，加载完整页面并记录为省流量统计的基线")
+    parser.add_argument("--no-capture", action="store_true",
+                        help="浏览器不捕获数据接口的响应，每页都等表格渲染后解析页面")
+    parser.add_argument("--export", action="store_true", help="保存后从数据库重新导出 Excel")
+    args = parser.parse_args()
+    resource_filter.ENABLED = not args.no_block
+    network_capture.ENABLED = not args.no_capture
+    store.EXPORT_EXCEL = args.export
+    unknown = [game for game in args.games if game not in GAMES]
+    if unknown:
+        parser.error(f"未知的彩种: {', '.join(unknown)}")
+
+    results = update_all(args.games or list(GAMES), args.backend, not args.show_browser, args.base_url, args.workers,
+                         args.shards, not args.no_probe)
+    sys.exit(0 if all(count is not None for count in results.values()) else 1)
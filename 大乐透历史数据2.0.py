@@ -1,32 +1,21 @@
-import time
-import random
-import pandas as pd
-import os
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, ElementNotInteractableException, \
-    StaleElementReferenceException
-from openpyxl.styles import Alignment
-
-# 初始化浏览器
-options = webdriver.ChromeOptions()
-options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124')
-options.add_argument('--disable-blink-features=AutomationControlled')
-options.add_experimental_option('excludeSwitches', ['enable-automation'])
-options.add_experimental_option('useAutomationExtension', False)
-
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-    "source": """Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"""
-})
-
-
-def switch_to_iframe():
+import argparse
+from lottery import checkpoint, http_backend, metrics, network_capture, pipeline, resource_filter, store
+from lottery.browser_session import create_driver
+from lottery.pacing import pacer_for, wait_until
+from lottery.table_extract import fetch_table_rows, max_period, min_period, parse_dlt_rows
+
+# 站点访问节奏，同一进程内各彩种、各分片共用
+pacer = pacer_for("www.lottery.gov.cn")
+
+
+def switch_to_iframe(driver):
     """切换到 iframe 框架"""
+    # selenium 只在真正操作浏览器时才导入，定时运行探测到没有新数据时不必加载
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     try:
         iframe = WebDriverWait(driver, 30).until(
             EC.presence_of_element_located((By.ID, "iFrame1"))
@@ -40,6 +29,10 @@ def switch_to_iframe():
 
 def get_latest_period(driver):
     """获取页面上的最新期号，使用用户提供的最新 XPath"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     try:
         period_element = WebDriverWait(driver, 30).until(
             EC.visibility_of_element_located((By.XPATH, "//*[@id='historyData']/tr[1]/td[1]"))
@@ -57,204 +50,297 @@ def get_latest_period(driver):
 
 
 def get_existing_max_period():
-    """获取现有 Excel 文件中的最大期号"""
-    if os.path.exists("大乐透历史数据.xlsx"):
-        try:
-            df = pd.read_excel("大乐透历史数据.xlsx")
-            max_period = df["期号"].max() if not df.empty else None
-            print(f"现有 Excel 文件中的最大期号: {max_period}")
-            return max_period
-        except Exception as e:
-            print(f"读取现有文件失败: {e}")
-            return None
-    print("未找到现有 Excel 文件")
-    return None
+    """获取已保存数据中的最大期号"""
+    return store.get_max_period("dlt")
 
 
-def append_to_excel(data):
-    """将数据追加到 Excel，确保格式清晰，最新期号在顶部，前区与后区之间空一列"""
-    if not data:
-        return False
-    try:
-        df_new = pd.DataFrame(data,
-                              columns=["期号", "红球1", "红球2", "红球3", "红球4", "红球5", "分隔", "蓝球1", "蓝球2"])
-        df_new["期号"] = df_new["期号"].astype(int)
-        df_new["分隔"] = ""
-
-        if os.path.exists("大乐透历史数据.xlsx"):
-            df_existing = pd.read_excel("大乐透历史数据.xlsx")
-            if "分隔" not in df_existing.columns:
-                df_existing.insert(6, "分隔", "")
-            df_combined = pd.concat([df_new, df_existing]).drop_duplicates(subset=["期号"]).sort_values(by="期号",
-                                                                                                        ascending=False)
-        else:
-            df_combined = df_new.sort_values(by="期号", ascending=False)
-
-        with pd.ExcelWriter("大乐透历史数据.xlsx", engine='openpyxl') as writer:
-            df_combined.to_excel(writer, index=False, sheet_name='Sheet1')
-            worksheet = writer.sheets['Sheet1']
-            column_widths = {
-                "期号": 12,
-                "红球1": 10, "红球2": 10, "红球3": 10, "红球4": 10, "红球5": 10,
-                "分隔": 5,
-                "蓝球1": 10, "蓝球2": 10
-            }
-            for col_name, width in column_widths.items():
-                col_idx = df_combined.columns.get_loc(col_name) + 1
-                worksheet.column_dimensions[chr(65 + col_idx - 1)].width = width
-            for row in worksheet.rows:
-                for cell in row:
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-        return True
-    except Exception as e:
-        print(f"保存数据失败: {e}")
-        return False
+def go_to_page(driver, page):
+    """直接调用页面的翻页函数 kjCommonFun.goNextPage 跳到第 page 页，不必逐页点击"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
 
+    old_row = driver.find_element(By.XPATH, "//*[@id='historyData']/tr")
+    network_capture.expect_response(driver)
+    pacer.wait()
+    driver.execute_script(f"kjCommonFun.goNextPage({page})")
+    wait_until(driver, pacer, EC.all_of(
+        EC.staleness_of(old_row),
+        EC.presence_of_element_located((By.XPATH, f"//li[@class='number active' and @onclick=\"kjCommonFun.goNextPage({page})\"]"))
+    ))
+    print(f"已跳到第 {page} 页")
 
-try:
-    driver.get("https://www.lottery.gov.cn/kj/kjlb.html?dlt")
-    print("页面已加载")
-    time.sleep(3)
 
-    switch_to_iframe()
-    latest_period = get_latest_period(driver)
-    if latest_period is None:
-        raise Exception("无法获取最新期号")
+def page_count(driver):
+    """总页数，取自当前页捕获到的数据接口响应（pages 字段）；没有捕获到时返回 None"""
+    payload = network_capture.wait_payload(driver, "dlt", keep=True)
+    return http_backend.payload_pages("dlt", payload)[1] if payload is not None else None
 
-    existing_max = get_existing_max_period()
-    start_period = existing_max + 1 if existing_max is not None else 7001  # 修改为 07001，去掉 20 前缀
 
-    print(f"检测到最新期号: {latest_period}")
-    print(f"现有数据最新期号: {existing_max if existing_max is not None else '无'}")
-    print(f"计划从 {start_period} 期开始追加")
+def find_page(driver, period, current_page=1):
+    """二分查找含 period 的页并跳过去，返回页码；要求当前在第 current_page 页
 
-    # 添加额外调试信息
-    print(f"start_period 类型: {type(start_period)}, 值: {start_period}")
-    print(f"latest_period 类型: {type(latest_period)}, 值: {latest_period}")
-    print(f"比较结果: start_period > latest_period = {start_period > latest_period}")
+    开奖列表从新到旧排列，各页第一行的期号随页码递减，含 period 的页就是第一行
+    期号不小于 period 的最后一页，只需跳转 log2(总页数) 次。不知道总页数时先把页码
+    逐次翻倍试探上界，直到跳到的页第一行已早于 period，或跳不过去（超出末页）为止。
+    """
+    from selenium.common.exceptions import TimeoutException
 
-    # 条件判断逻辑
-    if start_period > latest_period:
-        print(f"条件判断: {start_period} > {latest_period}，没有新数据需要追加")
-        driver.quit()
-        exit()
-    else:
-        print(f"条件判断: {start_period} <= {latest_period}，开始抓取数据")
+    low, high = 1, page_count(driver)
+    if high is None:
+        probe = 2
+        while True:
+            try:
+                go_to_page(driver, probe)
+            except TimeoutException:
+                break
+            current_page = probe
+            first = max_period(fetch_table_rows(driver, "table"))
+            if first is None or first < period:
+                break
+            low, probe = probe, probe * 2
+        high = probe - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if middle != current_page:
+            try:
+                go_to_page(driver, middle)
+            except TimeoutException:
+                # 试探出的上界可能超出末页，跳不过去的页和空表格一样当作在末页之后
+                high = middle - 1
+                continue
+            current_page = middle
+        first = max_period(fetch_table_rows(driver, "table"))
+        if first is not None and first >= period:
+            low = middle
+        else:
+            high = middle - 1
+    if current_page != low:
+        go_to_page(driver, low)
+    print(f"期号 {period} 在第 {low} 页")
+    return low
 
-    data = []
-    seen_periods = set()
-    max_records = 10000
-    page = 1
 
-    while len(data) < max_records:
-        print(f"正在爬取第 {page} 页...")
-        try:
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.XPATH, "//table//tr"))
-            )
-            table = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "table"))
-            )
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            print(f"找到 {len(rows)} 行数据")
-
-            for _ in range(3):  # 重试3次以处理陈旧元素
-                try:
-                    for row in rows[2:]:  # 跳过表头
-                        cols = row.find_elements(By.TAG_NAME, "td")
-                        if len(cols) < 9:
-                            continue
-
-                        period = cols[0].text.strip()
-                        if not period.isdigit():
-                            continue
-
-                        period_int = int(period)
-                        if period_int < start_period or period_int > latest_period or period in seen_periods:
-                            continue
-                        seen_periods.add(period)
-
-                        red_balls = []
-                        for i in range(2, 7):  # 前区红球 td[2] 到 td[6]
-                            red_ball = cols[i].text.strip()
-                            if red_ball.isdigit():
-                                red_balls.append(red_ball)
-                            else:
-                                break
-                        if len(red_balls) != 5:
-                            continue
-
-                        blue_balls = []
-                        for i in range(7, 9):  # 后区蓝球 td[7] 到 td[8]
-                            blue_ball = cols[i].text.strip()
-                            if "<span>" in cols[i].get_attribute('outerHTML'):
-                                blue_ball = cols[i].find_element(By.TAG_NAME, "span").text.strip()
-                            if blue_ball.isdigit():
-                                blue_balls.append(blue_ball)
-                            else:
-                                break
-                        if len(blue_balls) != 2:
-                            continue
-
-                        data.append([period] + red_balls + [""] + blue_balls)  # 插入空列
-                    break
-                except StaleElementReferenceException:
-                    print("遇到陈旧元素引用，重新定位表格...")
-                    table = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "table"))
-                    )
-                    rows = table.find_elements(By.TAG_NAME, "tr")
-
-            print(f"当前已抓取 {len(data)} 条记录")
-
-            if data and int(data[-1][0]) <= start_period:
-                print("已到达目标起始期号，停止抓取")
-                break
+def iter_pages(driver, start_period, first_page=1, max_pages=500):
+    """取页生成器：从第 first_page 页起逐页返回 (页码, 接口响应或表格行)，翻到含起始期号的一页为止
+
+    捕获到数据接口的响应时直接返回响应 JSON，不必等表格重新渲染；捕获不到才读取表格；翻页用 go_to_page
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
 
+    page = first_page
+    while page < first_page + max_pages:
+        print(f"正在爬取第 {page} 页...")
+        payload = network_capture.wait_payload(driver, "dlt")
+        if payload is not None:
+            raw, oldest = payload, network_capture.payload_min_period("dlt", payload)
+            print(f"从数据接口响应取得第 {page} 页")
+        else:
             try:
-                next_page = page + 1
-                page_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, f"//li[@onclick=\"kjCommonFun.goNextPage({next_page})\"]"))
-                )
-                page_button.click()
-                print(f"成功翻页到第 {next_page} 页")
-                time.sleep(random.uniform(3, 5))
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH,
-                                                    f"//li[@class='number active' and @onclick=\"kjCommonFun.goNextPage({next_page})\"]"))
+                WebDriverWait(driver, 30).until(
+                    EC.presence_of_element_located((By.XPATH, "//table//tr"))
                 )
-                page += 1
+                table_rows = fetch_table_rows(driver, "table")
             except TimeoutException:
-                try:
-                    next_button = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.XPATH, "//li[contains(text(), '下一页')]"))
-                    )
-                    if "disabled" in next_button.get_attribute("class"):
-                        print("已到最后一页")
-                        break
-                    next_button.click()
-                    print("成功翻页到下一页")
-                    time.sleep(random.uniform(3, 5))
-                    WebDriverWait(driver, 10).until(EC.staleness_of(next_button))
-                    page += 1
-                except TimeoutException:
-                    print("无法翻页，停止抓取")
-                    break
-
-        except TimeoutException:
-            print("表格加载超时，跳过当前页")
-            break
-
-    if data:
-        success = append_to_excel(data)
-        print(f"✅ 成功追加 {len(data)} 条记录" if success else "❌ 数据保存失败")
-    else:
+                print("表格加载超时，跳过当前页")
+                return
+            print(f"找到 {len(table_rows)} 行数据")
+            raw, oldest = table_rows, min_period(table_rows)
+        resource_filter.record_page(driver, "sporttery", "flip")
+        yield page, raw
+
+        if oldest is not None and oldest <= start_period:
+            print("已到达目标起始期号，停止抓取")
+            return
+
+        with metrics.phase("page_flip"):
+            if payload is not None and page >= http_backend.payload_pages("dlt", payload)[1]:
+                print("已到最后一页")
+                return
+            try:
+                # go_to_page 等旧表格失效、分页栏激活新页码后才返回，下一次翻页不会点到旧页面上的元素
+                go_to_page(driver, page + 1)
+            except TimeoutException:
+                print("无法翻页，停止抓取")
+                return
+            page += 1
+
+
+def scrape_shard(start_period, end_period, driver=None):
+    """只抓取 [start_period, end_period] 这一段：二分查找跳到含截止期号的页，从那里往后读到起始期号为止
+
+    用于补抓缺失的期号，断点按分段单独记录；传入 driver 时借用，不关闭
+    """
+    progress = checkpoint.Checkpoint("dlt", start_period, end_period, name=f"shard{start_period}")
+    remaining_end = progress.remaining_end()
+    if remaining_end is None:
+        return progress.sorted_rows()
+
+    own_driver = driver is None
+    if own_driver:
+        driver = create_driver(headless=True)
+    resource_filter.apply(driver, "sporttery")
+    try:
+        pacer.wait()
+        with metrics.phase("page_load"):
+            driver.get("https://www.lottery.gov.cn/kj/kjlb.html?dlt")
+        resource_filter.record_page(driver, "sporttery", "load")
+        switch_to_iframe(driver)
+        with metrics.phase("page_flip"):
+            first_page = find_page(driver, remaining_end)
+        pipeline.run("dlt", iter_pages(driver, start_period, first_page),
+                     lambda raw: network_capture.parse_page("dlt", raw, parse_dlt_rows, start_period, remaining_end, set()),
+                     start_period, remaining_end, progress)
+        return progress.sorted_rows()
+    finally:
+        if own_driver:
+            driver.quit()
+
+
+@metrics.instrumented("dlt", "browser")
+def run_browser(session=None, probe=True):
+    """用浏览器抓取开奖页面；传入共享会话时借用其中的标签页，不关闭浏览器
+
+    probe 为 True 时先用数据接口查一次最新期号，没有新数据就不启动浏览器
+
+    返回追加的记录数，出错时返回 None
+    """
+    if probe and http_backend.probe_new_draws("dlt") is False:
         print("没有新数据需要追加")
+        return 0
+
+    driver = session.tab("大乐透") if session else create_driver()
+    resource_filter.apply(driver, "sporttery")
+    try:
+        pacer.wait()
+        with metrics.phase("page_load"):
+            driver.get("https://www.lottery.gov.cn/kj/kjlb.html?dlt")
+        resource_filter.record_page(driver, "sporttery", "load")
+        print("页面已加载")
+
+        switch_to_iframe(driver)
+        latest_period = get_latest_period(driver)
+        if latest_period is None:
+            raise Exception("无法获取最新期号")
+
+        existing_max = get_existing_max_period()
+        start_period = existing_max + 1 if existing_max is not None else 7001  # 修改为 07001，去掉 20 前缀
+
+        print(f"检测到最新期号: {latest_period}")
+        print(f"现有数据最新期号: {existing_max if existing_max is not None else '无'}")
+        print(f"计划从 {start_period} 期开始追加")
+
+        # 添加额外调试信息
+        print(f"start_period 类型: {type(start_period)}, 值: {start_period}")
+        print(f"latest_period 类型: {type(latest_period)}, 值: {latest_period}")
+        print(f"比较结果: start_period > latest_period = {start_period > latest_period}")
+
+        # 条件判断逻辑
+        if start_period > latest_period:
+            print(f"条件判断: {start_period} > {latest_period}，没有新数据需要追加")
+            return 0
+        else:
+            print(f"条件判断: {start_period} <= {latest_period}，开始抓取数据")
+
+        # 逐页写入断点，出错后重新运行从断点的下一页继续
+        progress = checkpoint.Checkpoint("dlt", start_period, latest_period)
+        latest_period = progress.end_period
+        if progress.remaining_end() is not None:
+            first_page = 1
+            if progress.cursor:
+                first_page = progress.cursor + 1
+                with metrics.phase("page_flip"):
+                    go_to_page(driver, first_page)
+            # 体彩网的解析按页去重，跨页的重复期号由流水线的校验一步去掉
+            pipeline.run("dlt", iter_pages(driver, start_period, first_page),
+                         lambda raw: network_capture.parse_page("dlt", raw, parse_dlt_rows, start_period, latest_period, set()),
+                         start_period, latest_period, progress)
+
+        if progress.count:
+            saved = store.save_batches("dlt", progress.iter_batches())
+            if saved is not None:
+                checkpoint.discard("dlt")
+            print(f"✅ 成功追加 {saved} 条记录" if saved is not None else "❌ 数据保存失败")
+            return saved
+        else:
+            print("没有新数据需要追加")
+            return 0
 
-except Exception as e:
-    print(f"程序出错: {e}")
-    print("当前页面源代码片段（前2000字符）:")
-    print(driver.page_source[:2000])
-finally:
-    driver.quit()
-    print("浏览器已关闭")
\ No newline at end of file
+    except Exception as e:
+        print(f"程序出错: {e}")
+        print("当前页面源代码片段（前2000字符）:")
+        print(driver.page_source[:2000])
+    finally:
+        if session is None:
+            driver.quit()
+            print("浏览器已关闭")
+
+
+@metrics.instrumented("dlt", "http")
+def run_http(base_url=None, record_dir=None, session=None):
+    """不启动浏览器，直接请求开奖数据接口，返回追加的记录数，出错时返回 None
+
+    传入 session 时借用这个已建立的连接（例如常驻调度保持的连接），不关闭
+    """
+    own_session = session is None
+    if own_session:
+        session = http_backend.create_session(base_url, record_dir)
+    try:
+        latest_period = http_backend.get_latest_period(session, "dlt")
+        if latest_period is None:
+            raise Exception("无法获取最新期号")
+
+        existing_max = get_existing_max_period()
+        start_period = existing_max + 1 if existing_max is not None else 7001
+
+        print(f"检测到最新期号: {latest_period}")
+        print(f"现有数据最新期号: {existing_max if existing_max else '无'}")
+        if start_period > latest_period:
+            print("没有新数据需要追加")
+            return 0
+        print(f"将从 {start_period} 期开始追加")
+
+        progress = checkpoint.Checkpoint("dlt", start_period, latest_period)
+        remaining_end = progress.remaining_end()
+        if remaining_end is not None:
+            pages = http_backend.iter_pages(session, "dlt", start_period, remaining_end)
+            pipeline.run("dlt", pages, lambda payload: http_backend.parse_payload("dlt", payload)[0],
+                         start_period, remaining_end, progress)
+        if progress.count:
+            saved = store.save_batches("dlt", progress.iter_batches())
+            if saved is not None:
+                checkpoint.discard("dlt")
+            print(f"✅ 成功追加 {saved} 条记录" if saved is not None else "❌ 数据保存失败")
+            return saved
+        else:
+            print("没有新数据需要追加")
+            return 0
+    except Exception as e:
+        print(f"程序出错: {e}")
+    finally:
+        if own_session:
+            session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="抓取大乐透历史开奖数据")
+    parser.add_argument("--backend", choices=["browser", "http"], default="browser",
+                        help="抓取方式：browser 用浏览器渲染页面，http 直接请求数据接口")
+    parser.add_argument("--base-url", help="http 后端的接口地址，指向本地回放服务器时可离线运行")
+    parser.add_argument("--record", help="http 后端把每个响应录制到该目录")
+    parser.add_argument("--no-block", action="store_true",
+                        help="浏览器不拦截图片、样式表等资源，加载完整页面并记录为省流量统计的基线")
+    parser.add_argument("--no-capture", action="store_true",
+                        help="浏览器不捕获数据接口的响应，每页都等表格渲染后解析页面")
+    parser.add_argument("--export", action="store_true", help="保存后从数据库重新导出 Excel")
+    args = parser.parse_args()
+    resource_filter.ENABLED = not args.no_block
+    network_capture.ENABLED = not args.no_capture
+    store.EXPORT_EXCEL = args.export
+
+    if args.backend == "http":
+        run_http(args.base_url, args.record)
+    else:
+        run_browser()